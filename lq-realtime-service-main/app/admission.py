@@ -0,0 +1,227 @@
+"""
+Admission control module.
+Rejects WebSocket handshakes early when the instance is over capacity or
+handshakes arrive faster than it can authenticate them.
+"""
+
+import logging
+import random
+import time
+
+from fastapi import WebSocket
+
+from app.utils.metrics import handshakes_rejected
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code 1013: "Try Again Later"
+ADMISSION_CLOSE_CODE = 1013
+
+# Tenant buckets kept before idle (full) ones are pruned
+_MAX_TENANT_BUCKETS = 10000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a handshake is turned away by admission control."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}; retry_after={retry_after:.1f}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second."""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last update."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, now: float | None = None) -> float:
+        """
+        Take one token if available.
+
+        Args:
+            now: Monotonic time (defaults to now)
+
+        Returns:
+            0.0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled completely (i.e. is idle)."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class AdmissionController:
+    """
+    Gatekeeper for new WebSocket handshakes.
+
+    The capacity check and the per-instance handshake bucket run before the
+    socket is accepted or the token decoded, so a reconnect storm after a
+    deploy is shed at almost no cost. The per-tenant bucket needs the
+    verified tenant ID and runs after authentication but still before
+    accept; keying it on unverified claims would let one client drain
+    another tenant's budget. Rejections carry a retry hint with random
+    jitter so turned-away clients do not all come back at the same moment.
+    A rate of 0 disables the corresponding bucket.
+
+    A handshake that passes the instance check holds a reserved slot until
+    it is registered or fails, so handshakes still authenticating count
+    against capacity and a burst cannot overshoot ``max_connections``.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int,
+        instance_rate: float,
+        instance_burst: int,
+        tenant_rate: float,
+        tenant_burst: int,
+        retry_after: float,
+        retry_jitter: float,
+    ):
+        self.max_connections = max_connections
+        self.tenant_rate = tenant_rate
+        self.tenant_burst = tenant_burst
+        self.retry_after = retry_after
+        self.retry_jitter = retry_jitter
+
+        self.instance_bucket = (
+            TokenBucket(instance_rate, instance_burst) if instance_rate > 0 else None
+        )
+        self.tenant_buckets: dict[str, TokenBucket] = {}
+        # Admitted handshakes not yet registered as connections
+        self.reserved = 0
+
+        # Statistics
+        self.total_admitted = 0
+        self.total_rejected = 0
+
+    def _retry_hint(self, wait: float = 0.0) -> float:
+        """Retry delay for a rejected client, spread by random jitter."""
+        return max(self.retry_after, wait) + random.uniform(0, self.retry_jitter)
+
+    def _reject(self, reason: str, wait: float = 0.0):
+        """Count a rejection and raise it."""
+        self.total_rejected += 1
+        handshakes_rejected.inc(reason)
+        raise AdmissionRejected(reason, self._retry_hint(wait))
+
+    def check_instance(self, active_connections: int, draining: bool = False):
+        """
+        Admit a handshake against instance capacity and handshake rate,
+        reserving a slot for it. Runs before accept and authentication; every
+        admitted handshake must call ``release`` once it is registered or fails.
+
+        Args:
+            active_connections: Connections currently open on this instance
+            draining: Whether the instance is draining before shutdown
+
+        Raises:
+            AdmissionRejected: If the instance is draining, full, or handshakes
+                are too fast
+        """
+        if draining:
+            self._reject("draining")
+
+        if active_connections + self.reserved >= self.max_connections:
+            self._reject("capacity")
+
+        if self.instance_bucket is not None:
+            wait = self.instance_bucket.try_acquire()
+            if wait:
+                self._reject("instance_rate", wait)
+
+        self.reserved += 1
+
+    def release(self):
+        """Return the slot reserved by ``check_instance``."""
+        self.reserved = max(0, self.reserved - 1)
+
+    def check_tenant(self, tenant_id: str):
+        """
+        Admit an authenticated handshake against its tenant's handshake rate.
+
+        Args:
+            tenant_id: Verified tenant ID
+
+        Raises:
+            AdmissionRejected: If the tenant is handshaking too fast
+        """
+        if self.tenant_rate > 0:
+            bucket = self.tenant_buckets.get(tenant_id)
+            if bucket is None:
+                if len(self.tenant_buckets) >= _MAX_TENANT_BUCKETS:
+                    self._prune()
+                bucket = self.tenant_buckets[tenant_id] = TokenBucket(
+                    self.tenant_rate, self.tenant_burst
+                )
+
+            wait = bucket.try_acquire()
+            if wait:
+                self._reject("tenant_rate", wait)
+
+        self.total_admitted += 1
+
+    def _prune(self):
+        """Drop tenant buckets that have refilled, i.e. saw no recent handshakes."""
+        now = time.monotonic()
+        for tenant_id in [t for t, bucket in self.tenant_buckets.items() if bucket.is_full(now)]:
+            del self.tenant_buckets[tenant_id]
+
+    def get_stats(self) -> dict:
+        """
+        Get admission statistics.
+
+        Returns:
+            Dictionary with admitted and rejected handshake counters and
+            reserved slots
+        """
+        return {
+            "total_admitted": self.total_admitted,
+            "total_rejected": self.total_rejected,
+            "reserved": self.reserved,
+            "tenant_buckets": len(self.tenant_buckets),
+        }
+
+
+async def reject_handshake(
+    websocket: WebSocket, rejection: AdmissionRejected, subprotocol: str | None = None
+):
+    """
+    Turn a handshake away with a retry hint.
+
+    The socket is accepted only to close it with 1013 ("Try Again Later"):
+    browsers do not expose the HTTP status of a refused upgrade, but they do
+    expose the close code and reason, e.g.
+    ``"capacity; retry_after=3.7"``.
+
+    Args:
+        websocket: Handshaking WebSocket
+        rejection: Admission decision
+        subprotocol: Negotiated subprotocol; a client that offered one fails
+            the handshake (hiding the close reason) unless it is echoed back
+    """
+    try:
+        await websocket.accept(subprotocol=subprotocol)
+        await websocket.close(code=ADMISSION_CLOSE_CODE, reason=str(rejection))
+    except Exception as e:
+        logger.debug(f"Error rejecting handshake: {e}")
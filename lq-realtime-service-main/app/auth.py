@@ -3,14 +3,23 @@ JWT Authentication module.
 Handles token validation, decoding, and scope verification.
 """
 
+import hashlib
+import hmac
 import logging
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Any
 
 import jwt
+import orjson
 from fastapi import HTTPException, status
+from jwt.algorithms import get_default_algorithms
 
 from app.config import get_settings
 from app.schemas import TokenPayload
+from app.utils.metrics import token_verifications
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -22,13 +31,238 @@ class AuthenticationError(Exception):
     pass
 
 
+def _read_pem(value: str) -> str:
+    """
+    Resolve a PEM setting that holds either the key itself or a file path.
+
+    Args:
+        value: PEM text (escaped ``\\n`` newlines allowed) or path to a PEM file
+
+    Returns:
+        PEM text
+    """
+    if value.lstrip().startswith("-----BEGIN"):
+        return value.replace("\\n", "\n")
+    with open(value) as pem_file:
+        return pem_file.read()
+
+
+class KeyStore:
+    """
+    Signing and verification keys, parsed once and reused for every token.
+
+    HS256 uses the shared secret. RS256/ES256 verify with ``jwt_public_key``
+    and, when ``jwt_jwks_file`` is set, with the JWKS key whose ``kid``
+    matches the token header. The JWKS file is re-read when its mtime
+    changes, checked at most every ``refresh_interval`` seconds, so keys can
+    be rotated by replacing the file without a restart. ``version`` is bumped
+    on every reload.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        *,
+        secret: str = "",
+        public_key: str = "",
+        private_key: str = "",
+        key_id: str = "",
+        jwks_file: str = "",
+        refresh_interval: float = 30.0,
+    ):
+        implementation = get_default_algorithms().get(algorithm)
+        if implementation is None:
+            raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+
+        self.algorithm = algorithm
+        self.key_id = key_id or None
+        self.jwks_file = jwks_file
+        self.refresh_interval = refresh_interval
+        self.version = 0
+
+        if algorithm.startswith("HS"):
+            self.verification_key = implementation.prepare_key(secret)
+            self.signing_key = self.verification_key
+        else:
+            self.verification_key = (
+                implementation.prepare_key(_read_pem(public_key)) if public_key else None
+            )
+            self.signing_key = (
+                implementation.prepare_key(_read_pem(private_key)) if private_key else None
+            )
+
+        self._jwks: dict[str, Any] = {}
+        self._jwks_mtime: int | None = None
+        self._next_check = 0.0
+        if jwks_file:
+            self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        """
+        Reload the JWKS file if it changed since the last load.
+
+        Args:
+            force: Check the file now instead of waiting for the refresh interval
+        """
+        if not self.jwks_file:
+            return
+
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + self.refresh_interval
+
+        try:
+            mtime = os.stat(self.jwks_file).st_mtime_ns
+            if mtime == self._jwks_mtime:
+                return
+            with open(self.jwks_file, "rb") as jwks:
+                document = orjson.loads(jwks.read())
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.error(f"Failed to load JWKS file {self.jwks_file}: {e!s}")
+            return
+
+        keys = {}
+        for jwk in document.get("keys", []):
+            kid = jwk.get("kid")
+            if not kid or jwk.get("alg", self.algorithm) != self.algorithm:
+                logger.warning(f"Skipping JWKS key without kid or with another alg: {kid}")
+                continue
+            try:
+                keys[kid] = jwt.PyJWK(jwk, algorithm=self.algorithm).key
+            except jwt.PyJWTError as e:
+                logger.warning(f"Skipping invalid JWKS key {kid}: {e!s}")
+
+        self._jwks = keys
+        self._jwks_mtime = mtime
+        self.version += 1
+        logger.info(f"Loaded {len(keys)} JWKS keys from {self.jwks_file}")
+
+    def get_verification_key(self, kid: str | None) -> Any:
+        """
+        Select the key that verifies a token.
+
+        Args:
+            kid: Key ID from the token header, if any
+
+        Returns:
+            Parsed key object (bytes for HMAC secrets)
+
+        Raises:
+            AuthenticationError: If no configured key matches
+        """
+        if kid is not None and self.jwks_file:
+            key = self._jwks.get(kid)
+            if key is None:
+                # A newly rotated key may have landed since the last check
+                self.refresh(force=True)
+                key = self._jwks.get(kid)
+            if key is not None:
+                return key
+
+        if self.verification_key is None:
+            raise AuthenticationError(f"Unknown signing key: {kid}")
+        return self.verification_key
+
+    @classmethod
+    def from_settings(cls) -> "KeyStore":
+        """Build the key store from application settings."""
+        return cls(
+            settings.jwt_algorithm,
+            secret=settings.jwt_secret_key,
+            public_key=settings.jwt_public_key,
+            private_key=settings.jwt_private_key,
+            key_id=settings.jwt_key_id,
+            jwks_file=settings.jwt_jwks_file,
+            refresh_interval=settings.jwt_jwks_refresh_interval,
+        )
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens whose signature and claims already verified.
+
+    Entries are keyed by the SHA-256 digest of the token, so raw tokens are
+    not kept in memory, and are dropped once the token's ``exp`` passes.
+    Reconnect storms, where thousands of clients present the same tokens
+    again, then cost one hash per handshake instead of a signature check.
+
+    Payloads are copied on the way in and out, so a connection that mutates
+    its payload (e.g. ``metadata``) never affects another connection.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, TokenPayload] = OrderedDict()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        """Cache key of a token."""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> TokenPayload | None:
+        """
+        Look up a previously verified token.
+
+        Args:
+            token: JWT token string
+
+        Returns:
+            Copy of the cached payload, or None if absent or expired
+        """
+        if self.maxsize <= 0:
+            return None
+
+        digest = self._digest(token)
+        payload = self._entries.get(digest)
+        if payload is None or payload.exp <= time.time():
+            if payload is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return payload.model_copy(deep=True)
+
+    def put(self, token: str, payload: TokenPayload):
+        """
+        Remember a verified token until its expiry.
+
+        Args:
+            token: JWT token string
+            payload: Verified payload
+        """
+        if self.maxsize <= 0:
+            return
+
+        self._entries[self._digest(token)] = payload.model_copy(deep=True)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget every cached token."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class JWTManager:
     """JWT token manager for encoding and decoding tokens."""
 
-    def __init__(self):
-        self.secret_key = settings.jwt_secret_key
-        self.algorithm = settings.jwt_algorithm
+    def __init__(self, keys: KeyStore | None = None, cache_size: int | None = None):
+        self.keys = keys or KeyStore.from_settings()
+        self.algorithm = self.keys.algorithm
         self.expire_minutes = settings.jwt_access_token_expire_minutes
+        self.cache = VerifiedTokenCache(
+            settings.jwt_verify_cache_size if cache_size is None else cache_size
+        )
+        self._cache_version = self.keys.version
 
     def create_access_token(
         self,
@@ -63,13 +297,22 @@ class JWTManager:
         if additional_claims:
             payload.update(additional_claims)
 
-        encoded_jwt = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        if self.keys.signing_key is None:
+            raise AuthenticationError(f"No private key configured for {self.algorithm}")
+
+        headers = {"kid": self.keys.key_id} if self.keys.key_id else None
+        encoded_jwt = jwt.encode(
+            payload, self.keys.signing_key, algorithm=self.algorithm, headers=headers
+        )
         return encoded_jwt
 
     def decode_token(self, token: str) -> TokenPayload:
         """
         Decode and validate a JWT token.
 
+        Tokens verified before are served from the verified-token cache
+        until they expire; rotating the JWKS keys empties the cache.
+
         Args:
             token: JWT token string
 
@@ -79,10 +322,33 @@ class JWTManager:
         Raises:
             AuthenticationError: If token is invalid, expired, or malformed
         """
+        self.keys.refresh()
+        if self.keys.version != self._cache_version:
+            self.cache.clear()
+            self._cache_version = self.keys.version
+
+        cached = self.cache.get(token)
+        if cached is not None:
+            token_verifications.inc("cached")
+            return cached
+
         try:
+            token_payload = self._verify(token)
+        except AuthenticationError:
+            token_verifications.inc("rejected")
+            raise
+
+        token_verifications.inc("verified")
+        self.cache.put(token, token_payload)
+        return token_payload
+
+    def _verify(self, token: str) -> TokenPayload:
+        """Verify a token's signature and claims."""
+        try:
+            key = self.keys.get_verification_key(jwt.get_unverified_header(token).get("kid"))
             payload = jwt.decode(
                 token,
-                self.secret_key,
+                key,
                 algorithms=[self.algorithm],
                 options={
                     "verify_exp": True,
@@ -103,6 +369,9 @@ class JWTManager:
 
             return TokenPayload(**payload)
 
+        except AuthenticationError:
+            raise
+
         except jwt.ExpiredSignatureError as e:
             logger.warning("Token has expired")
             raise AuthenticationError("Token has expired") from e
@@ -181,27 +450,34 @@ async def verify_websocket_token(token: str) -> TokenPayload:
         ) from e
 
 
-async def verify_webhook_signature(
-    payload: bytes, signature: str, secret: str, algorithm: str = "sha256"
-) -> bool:
+def webhook_signer(secret: str, algorithm: str = "sha256") -> hmac.HMAC:
     """
-    Verify webhook HMAC signature.
+    Create an HMAC for a webhook body that is fed incrementally.
 
     Args:
-        payload: Raw webhook payload bytes
-        signature: Signature from webhook header
         secret: Webhook signing secret
         algorithm: Hash algorithm (default: sha256)
 
+    Returns:
+        HMAC object; call ``update`` with each body chunk as it arrives
+    """
+    return hmac.new(secret.encode(), digestmod=getattr(hashlib, algorithm))
+
+
+def check_webhook_signature(signer: hmac.HMAC, signature: str) -> bool:
+    """
+    Compare a fully fed webhook HMAC against the signature header.
+
+    Args:
+        signer: HMAC that has consumed the whole raw body
+        signature: Signature from webhook header
+
     Returns:
         True if signature is valid
 
     Raises:
         AuthenticationError: If signature is invalid
     """
-    import hashlib
-    import hmac
-
     try:
         # Remove common signature prefixes (e.g., "sha256=")
         if "=" in signature:
@@ -209,13 +485,8 @@ async def verify_webhook_signature(
         else:
             sig_value = signature
 
-        # Compute expected signature
-        expected_signature = hmac.new(
-            secret.encode(), payload, getattr(hashlib, algorithm)
-        ).hexdigest()
-
         # Constant-time comparison to prevent timing attacks
-        is_valid = hmac.compare_digest(expected_signature, sig_value)
+        is_valid = hmac.compare_digest(signer.hexdigest(), sig_value)
 
         if not is_valid:
             raise AuthenticationError("Invalid webhook signature")
@@ -228,6 +499,34 @@ async def verify_webhook_signature(
         raise AuthenticationError(f"Signature verification failed: {e!s}") from e
 
 
+async def verify_webhook_signature(
+    payload: bytes, signature: str, secret: str, algorithm: str = "sha256"
+) -> bool:
+    """
+    Verify webhook HMAC signature.
+
+    Args:
+        payload: Raw webhook payload bytes
+        signature: Signature from webhook header
+        secret: Webhook signing secret
+        algorithm: Hash algorithm (default: sha256)
+
+    Returns:
+        True if signature is valid
+
+    Raises:
+        AuthenticationError: If signature is invalid
+    """
+    try:
+        signer = webhook_signer(secret, algorithm)
+    except Exception as e:
+        logger.error(f"Webhook signature verification failed: {e!s}")
+        raise AuthenticationError(f"Signature verification failed: {e!s}") from e
+
+    signer.update(payload)
+    return check_webhook_signature(signer, signature)
+
+
 async def verify_system_api_key(api_key: str) -> bool:
     """
     Verify system API key for privileged operations.
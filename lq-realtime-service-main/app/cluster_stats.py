@@ -0,0 +1,203 @@
+"""
+Cluster statistics module.
+Every instance publishes a compact stats heartbeat to Redis; any instance
+can merge them into a cluster-wide view.
+"""
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections.abc import Callable
+
+import orjson
+
+from app.redis_client import get_cluster_stats_key, get_instance_stats_key, redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class ClusterStats:
+    """
+    Per-instance stats heartbeat and cluster-wide aggregation.
+
+    Every ``interval`` seconds the instance stores a snapshot (connections,
+    per-tenant counts, queue depths, send and receive rates) under its own
+    key, which expires after ``stale_after`` seconds, and scores its ID in a
+    shared sorted set by report time. Readers drop index entries older than
+    ``stale_after`` (instances that crashed or were scaled down) with one
+    ZREMRANGEBYSCORE, so a report landing meanwhile is never removed, and
+    merge the rest. An instance that stops cleanly removes its own entry. An
+    interval of 0 disables reporting (aggregation still works).
+    """
+
+    def __init__(
+        self,
+        *,
+        instance_id: str,
+        interval: float,
+        stale_after: float,
+        snapshot: Callable[[], dict],
+    ):
+        self.instance_id = instance_id
+        self.interval = interval
+        self.stale_after = max(stale_after, interval * 2)
+        self.snapshot = snapshot
+
+        self._task: asyncio.Task | None = None
+        # Totals and time of the previous report, for rates
+        self._last_totals: tuple[float, float] | None = None
+        self._last_reported_at = 0.0
+
+        # Statistics
+        self.total_reports = 0
+        self.total_stale_removed = 0
+
+    def start(self):
+        """Start the background reporting task."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop reporting and remove this instance's entry."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+            try:
+                pipe = redis_client.redis.pipeline(transaction=True)
+                pipe.zrem(get_cluster_stats_key(), self.instance_id)
+                pipe.delete(get_instance_stats_key(self.instance_id))
+                await pipe.execute()
+            except Exception as e:
+                logger.debug(f"Failed to remove cluster stats entry: {e!s}")
+
+    async def _run(self):
+        """Report periodically."""
+        while True:
+            try:
+                await self.report()
+            except Exception as e:
+                logger.error(f"Failed to report cluster stats: {e!s}")
+            await asyncio.sleep(self.interval)
+
+    def build_report(self, now: float | None = None) -> dict:
+        """
+        Build this instance's heartbeat entry.
+
+        Args:
+            now: Wall clock time (defaults to now)
+
+        Returns:
+            Snapshot plus instance ID, report time and per-second rates since
+            the previous report
+        """
+        now = time.time() if now is None else now
+        entry = self.snapshot()
+        sent = entry.pop("total_messages_sent", 0)
+        received = entry.pop("total_messages_received", 0)
+
+        send_rate = receive_rate = 0.0
+        if self._last_totals is not None and now > self._last_reported_at:
+            elapsed = now - self._last_reported_at
+            send_rate = max(0.0, (sent - self._last_totals[0]) / elapsed)
+            receive_rate = max(0.0, (received - self._last_totals[1]) / elapsed)
+        self._last_totals = (sent, received)
+        self._last_reported_at = now
+
+        return {
+            **entry,
+            "instance_id": self.instance_id,
+            "reported_at": now,
+            "send_rate": round(send_rate, 2),
+            "receive_rate": round(receive_rate, 2),
+        }
+
+    async def report(self):
+        """Store this instance's heartbeat entry in Redis and index it."""
+        entry = self.build_report()
+        pipe = redis_client.redis.pipeline(transaction=True)
+        pipe.set(
+            get_instance_stats_key(self.instance_id),
+            orjson.dumps(entry),
+            ex=math.ceil(self.stale_after),
+        )
+        pipe.zadd(get_cluster_stats_key(), {self.instance_id: entry["reported_at"]})
+        await pipe.execute()
+        self.total_reports += 1
+
+    async def collect(self, tenant_limit: int = 100) -> dict:
+        """
+        Merge the heartbeat entries of all live instances.
+
+        Args:
+            tenant_limit: Number of tenants (by total connections) to list
+
+        Returns:
+            Cluster totals, per-instance entries (busiest first) and the
+            busiest tenants
+        """
+        key = get_cluster_stats_key()
+        now = time.time()
+
+        # Pruned by score, so an instance reporting concurrently keeps its entry
+        pipe = redis_client.redis.pipeline(transaction=True)
+        pipe.zremrangebyscore(key, "-inf", now - self.stale_after)
+        pipe.zrange(key, 0, -1)
+        stale, instance_ids = await pipe.execute()
+
+        if stale:
+            self.total_stale_removed += stale
+            logger.info(f"Removed {stale} stale cluster stats entries")
+
+        keys = [
+            get_instance_stats_key(m.decode() if isinstance(m, bytes) else m) for m in instance_ids
+        ]
+        rows = await redis_client.redis.mget(keys) if keys else []
+
+        instances = []
+        for value in rows:
+            if value is None:
+                continue
+            try:
+                entry = orjson.loads(value)
+            except orjson.JSONDecodeError:
+                continue
+            entry["age_seconds"] = round(max(0.0, now - entry["reported_at"]), 3)
+            instances.append(entry)
+
+        tenants: dict[str, int] = {}
+        for entry in instances:
+            instance_tenants = entry.pop("tenants", {})
+            entry["unique_tenants"] = len(instance_tenants)
+            for tenant_id, count in instance_tenants.items():
+                tenants[tenant_id] = tenants.get(tenant_id, 0) + count
+
+        instances.sort(key=lambda entry: entry.get("active_connections", 0), reverse=True)
+        busiest = sorted(tenants.items(), key=lambda item: item[1], reverse=True)[:tenant_limit]
+
+        return {
+            "total_instances": len(instances),
+            "total_connections": sum(e.get("active_connections", 0) for e in instances),
+            "total_tenants": len(tenants),
+            "outbound_queue_depth": sum(e.get("outbound_queue_depth", 0) for e in instances),
+            "send_rate": round(sum(e.get("send_rate", 0.0) for e in instances), 2),
+            "receive_rate": round(sum(e.get("receive_rate", 0.0) for e in instances), 2),
+            "stale_instances_removed": stale,
+            "instances": instances,
+            "tenants": dict(busiest),
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Get cluster stats reporter statistics.
+
+        Returns:
+            Dictionary with report and stale-entry counters
+        """
+        return {
+            "total_reports": self.total_reports,
+            "total_stale_removed": self.total_stale_removed,
+        }
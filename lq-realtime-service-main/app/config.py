@@ -3,7 +3,10 @@ Configuration module for LQ Real-time Service.
 Loads settings from environment variables with sensible defaults.
 """
 
+import socket
+import uuid
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -27,15 +30,35 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", description="Server host")
     port: int = Field(default=8082, description="Server port")
     workers: int = Field(default=1, description="Number of worker processes")
+    instance_id: str = Field(
+        default_factory=lambda: f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}",
+        description="Unique identifier of this service instance",
+    )
 
     jwt_secret_key: str = Field(
         default="change-me-in-production-min-32-chars",
         description="JWT secret key for signing tokens",
     )
-    jwt_algorithm: str = Field(default="HS256", description="JWT algorithm")
+    jwt_algorithm: str = Field(default="HS256", description="JWT algorithm: HS256, RS256 or ES256")
     jwt_access_token_expire_minutes: int = Field(
         default=15, description="JWT token expiration in minutes"
     )
+    jwt_public_key: str = Field(
+        default="", description="PEM public key (or path to one) for RS256/ES256 verification"
+    )
+    jwt_private_key: str = Field(
+        default="", description="PEM private key (or path to one) for minting RS256/ES256 tokens"
+    )
+    jwt_key_id: str = Field(default="", description="Key ID (kid) stamped on minted tokens")
+    jwt_jwks_file: str = Field(
+        default="", description="Path to a JWKS file of verification keys selected by kid"
+    )
+    jwt_jwks_refresh_interval: float = Field(
+        default=30.0, description="Seconds between checks of the JWKS file for rotated keys"
+    )
+    jwt_verify_cache_size: int = Field(
+        default=10000, description="Verified tokens remembered until they expire (0 disables)"
+    )
 
     system_api_key: str = Field(
         default="change-me-system-api-key-min-32-chars",
@@ -47,20 +70,160 @@ class Settings(BaseSettings):
     redis_db: int = Field(default=0, description="Redis database number")
     redis_password: str = Field(default="", description="Redis password")
     redis_max_connections: int = Field(default=100, description="Redis max connection pool size")
+    redis_unsubscribe_grace_period: float = Field(
+        default=5.0,
+        description="Seconds an unreferenced pub/sub channel stays subscribed before UNSUBSCRIBE",
+    )
+    redis_pubsub_shards: int = Field(
+        default=1,
+        description="Pub/sub connections, each with its own reader, to spread channels over",
+    )
+    redis_pubsub_reconnect_initial_delay: float = Field(
+        default=0.5, description="First pub/sub reconnect backoff in seconds"
+    )
+    redis_pubsub_reconnect_max_delay: float = Field(
+        default=30.0, description="Maximum pub/sub reconnect backoff in seconds"
+    )
+    redis_pubsub_ping_interval: float = Field(
+        default=15.0,
+        description="Seconds of pub/sub silence before probing the connection (0 disables)",
+    )
 
     ws_max_connections_per_instance: int = Field(
         default=10000, description="Maximum concurrent WebSocket connections per instance"
     )
+    ws_handshake_rate: float = Field(
+        default=200.0, description="New WebSocket handshakes per second per instance (0 disables)"
+    )
+    ws_handshake_burst: int = Field(
+        default=400, description="Handshakes per instance admitted in a burst"
+    )
+    ws_tenant_handshake_rate: float = Field(
+        default=50.0, description="New WebSocket handshakes per second per tenant (0 disables)"
+    )
+    ws_tenant_handshake_burst: int = Field(
+        default=200, description="Handshakes per tenant admitted in a burst"
+    )
+    ws_admission_retry_after: float = Field(
+        default=2.0, description="Minimum retry hint in seconds for rejected handshakes"
+    )
+    ws_admission_retry_jitter: float = Field(
+        default=8.0, description="Random seconds added to retry hints to spread reconnects"
+    )
+    ws_drain_window: float = Field(
+        default=30.0,
+        description=(
+            "Seconds over which connections are closed when draining; keep it below the "
+            "pod's terminationGracePeriodSeconds (45 in the manifest) minus the shutdown time"
+        ),
+    )
     ws_heartbeat_interval: int = Field(
         default=30, description="WebSocket heartbeat interval in seconds"
     )
+    ws_idle_timeout: int = Field(
+        default=0,
+        description="Seconds without inbound traffic before a connection is reaped "
+        "(0 disables; only enable for clients that answer server pings)",
+    )
+    ws_heartbeat_tick: float = Field(
+        default=1.0, description="Seconds between heartbeat timer wheel ticks"
+    )
     ws_message_max_size: int = Field(
         default=65536, description="Maximum WebSocket message size in bytes"
     )
+    ws_deflate_min_size: int = Field(
+        default=256, description="Smallest json+deflate frame that is compressed, in bytes"
+    )
+    ws_deflate_level: int = Field(
+        default=6, description="zlib compression level (1-9) of json+deflate frames"
+    )
+    ws_fanout_concurrency: int = Field(
+        default=256, description="Maximum concurrent sends per broadcast fanout"
+    )
+    ws_fanout_send_timeout: float = Field(
+        default=5.0, description="Per-connection send timeout during fanout in seconds"
+    )
+    ws_fanout_yield_every: int = Field(
+        default=64, description="Sends per fanout worker between event loop yields"
+    )
+    ws_outbound_queue_size: int = Field(
+        default=256, description="Per-connection outbound queue size (0 sends inline)"
+    )
+    ws_outbound_overflow_policy: Literal["drop_oldest", "coalesce", "disconnect"] = Field(
+        default="drop_oldest",
+        description="Outbound queue overflow policy: drop_oldest, coalesce or disconnect",
+    )
+    ws_coalesce_window_ms: float = Field(
+        default=0.0,
+        description="Milliseconds the writer waits to batch outbound messages (0 disables)",
+    )
+    ws_coalesce_max_batch: int = Field(
+        default=64, description="Maximum messages combined into one batch frame"
+    )
+    ws_user_route_ttl: int = Field(
+        default=60, description="TTL in seconds of user-to-instance routing entries"
+    )
+    ws_presence_enabled: bool = Field(
+        default=True, description="Track per-tenant presence and publish join/leave diffs"
+    )
+    ws_presence_ttl: int = Field(
+        default=60, description="TTL in seconds of a user's presence entry"
+    )
+    ws_presence_flush_ms: float = Field(
+        default=500.0, description="Milliseconds between batched presence diffs"
+    )
+    cluster_stats_interval: float = Field(
+        default=10.0, description="Seconds between stats heartbeats to Redis (0 disables)"
+    )
+    cluster_stats_stale_after: float = Field(
+        default=30.0, description="Seconds after which an instance's stats heartbeat is dropped"
+    )
+    ws_local_delivery: bool = Field(
+        default=False,
+        description="Deliver tenant and room messages to local sockets before publishing "
+        "them tagged with this instance's ID, instead of waiting for the Redis echo; "
+        "enable only once every instance understands the tag",
+    )
+    ws_forward_raw_frames: bool = Field(
+        default=True,
+        description="Forward pre-encoded pub/sub frames to sockets without re-validation",
+    )
+    ws_max_rooms_per_connection: int = Field(
+        default=100, description="Maximum rooms a single connection may join"
+    )
+    ws_event_log_enabled: bool = Field(
+        default=False,
+        description="Append tenant and user messages to Redis Streams for replay on reconnect",
+    )
+    ws_event_log_maxlen: int = Field(
+        default=1000, description="Approximate maximum entries kept per event stream"
+    )
+    ws_event_log_ttl: int = Field(
+        default=86400, description="Seconds an idle event stream is kept (0 keeps it forever)"
+    )
+    ws_event_log_replay_limit: int = Field(
+        default=500, description="Maximum events replayed to a reconnecting client"
+    )
+
+    api_batch_max_messages: int = Field(
+        default=1000, description="Maximum messages accepted by /api/messages/batch"
+    )
 
     webhook_max_retries: int = Field(default=3, description="Maximum webhook retry attempts")
     webhook_retry_delay: int = Field(default=5, description="Webhook retry delay in seconds")
     webhook_timeout: int = Field(default=30, description="Webhook timeout in seconds")
+    webhook_max_body_size: int = Field(
+        default=5 * 1024 * 1024, description="Maximum webhook request body size in bytes"
+    )
+    webhook_registry_refresh_interval: float = Field(
+        default=60.0, description="Seconds between full reloads of the webhook registry cache"
+    )
+    webhook_dedupe_ttl: int = Field(
+        default=86400, description="Seconds a provider delivery ID is remembered for dedupe"
+    )
+    webhook_dead_letter_maxlen: int = Field(
+        default=10000, description="Approximate maximum entries kept in the dead-letter stream"
+    )
 
     allowed_origins: str = Field(
         default="http://localhost:3000", description="Comma-separated allowed CORS origins"
@@ -71,6 +234,9 @@ class Settings(BaseSettings):
     log_format: str = Field(default="json", description="Log format: json or text")
 
     metrics_enabled: bool = Field(default=True, description="Enable metrics endpoint")
+    metrics_sample_interval: float = Field(
+        default=5.0, description="Seconds between background process stat samples"
+    )
     health_check_path: str = Field(default="/health", description="Health check endpoint path")
 
     @field_validator("allowed_origins")
@@ -0,0 +1,186 @@
+"""
+Drain module.
+Closes an instance's connections gradually before it shuts down, so clients
+move to the remaining instances in a trickle instead of all at once.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import signal
+import threading
+import time
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code 1012: "Service Restart"
+DRAIN_CLOSE_CODE = 1012
+
+# Seconds between batches of closed connections
+_DRAIN_TICK = 0.1
+
+
+def _once(callback: Callable[[], None]) -> Callable[[], None]:
+    """Wrap a callback so only its first call runs."""
+    called = False
+
+    def wrapper():
+        nonlocal called
+        if not called:
+            called = True
+            callback()
+
+    return wrapper
+
+
+class Drainer:
+    """
+    Drain mode for one instance.
+
+    Once started, ``draining`` stays true (readiness fails and new
+    handshakes are refused) and the connections open at that moment are
+    closed in shuffled batches spread evenly over ``window`` seconds. Drain
+    is triggered by SIGTERM or the admin endpoint; on SIGTERM the previous
+    handler (uvicorn's) is called only after the drain finishes, so uvicorn
+    does not close every socket first. A second SIGTERM skips the rest of
+    the drain.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: float,
+        list_connections: Callable[[], list[str]],
+        close: Callable[[str], Awaitable[None]],
+    ):
+        self.window = max(0.0, window)
+        self.list_connections = list_connections
+        self.close = close
+
+        self.draining = False
+        self._task: asyncio.Task | None = None
+        self._sigterm_received = False
+
+        # Statistics
+        self.total_drained = 0
+        self.started_at: float | None = None
+
+    def start(self, on_done: Callable[[], None] | None = None) -> bool:
+        """
+        Enter drain mode.
+
+        Args:
+            on_done: Called once every connection has been closed, also when
+                the drain was already started by someone else
+
+        Returns:
+            True if this call started the drain, False if it was already running
+        """
+        if self.draining:
+            if on_done is not None:
+                self._task.add_done_callback(lambda _: on_done())
+            return False
+
+        self.draining = True
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        if on_done is not None:
+            self._task.add_done_callback(lambda _: on_done())
+        return True
+
+    async def wait(self):
+        """Wait for a running drain to finish."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _run(self):
+        """Close the current connections in batches over the drain window."""
+        connection_ids = self.list_connections()
+        random.shuffle(connection_ids)
+        logger.info(f"Draining {len(connection_ids)} connections over {self.window:.0f}s")
+
+        batches = max(1, round(self.window / _DRAIN_TICK))
+        batch_size = max(1, math.ceil(len(connection_ids) / batches))
+
+        for start in range(0, len(connection_ids), batch_size):
+            if start:
+                await asyncio.sleep(_DRAIN_TICK)
+            batch = connection_ids[start : start + batch_size]
+            results = await asyncio.gather(
+                *(self.close(connection_id) for connection_id in batch),
+                return_exceptions=True,
+            )
+            for connection_id, result in zip(batch, results, strict=True):
+                if isinstance(result, Exception):
+                    logger.debug(f"Error draining {connection_id}: {result}")
+            self.total_drained += len(batch)
+
+        logger.info(f"Drain complete: {self.total_drained} connections closed")
+
+    def install_signal_handler(self):
+        """
+        Drain on SIGTERM before handing the signal to the previous handler.
+        Must be called from the event loop thread after the server has
+        installed its own handlers (i.e. during application startup).
+
+        uvicorn (>= 0.29, the supported floor) installs ``Server.handle_exit``
+        with ``signal.signal`` on every loop implementation; it is read back
+        with ``signal.getsignal`` and wrapped, so the drain runs before the
+        server starts shutting down.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            logger.debug("Not in the main thread, SIGTERM drain handler not installed")
+            return
+
+        loop = asyncio.get_running_loop()
+        handler = signal.getsignal(signal.SIGTERM)
+
+        def previous():
+            if callable(handler):
+                handler(signal.SIGTERM, None)
+            elif handler == signal.SIG_DFL:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.raise_signal(signal.SIGTERM)
+
+        chain = _once(previous)
+        signal.signal(
+            signal.SIGTERM,
+            lambda signum, frame: loop.call_soon_threadsafe(self._on_sigterm, chain),
+        )
+
+    def _on_sigterm(self, chain: Callable[[], None]):
+        """
+        Start the drain on the first SIGTERM and chain once it is done; a
+        second SIGTERM chains right away.
+
+        Args:
+            chain: Runs the previous SIGTERM handler (at most once)
+        """
+        if self._sigterm_received:
+            logger.warning("Second SIGTERM received, shutting down without finishing drain")
+            chain()
+            return
+
+        self._sigterm_received = True
+        logger.info("SIGTERM received, draining connections")
+        self.start(chain)
+
+    def get_stats(self) -> dict:
+        """
+        Get drain statistics.
+
+        Returns:
+            Dictionary with drain state and progress
+        """
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round(time.monotonic() - self.started_at, 3)
+
+        return {
+            "draining": self.draining,
+            "window_seconds": self.window,
+            "total_drained": self.total_drained,
+            "elapsed_seconds": elapsed,
+        }
@@ -0,0 +1,184 @@
+"""
+Frame encoding module.
+Per-connection wire encodings, negotiated at handshake time and computed
+once per frame for all recipients that share an encoding.
+"""
+
+import logging
+import zlib
+from collections.abc import Sequence
+from enum import Enum
+from typing import Any
+
+import orjson
+from fastapi import WebSocket
+
+from app.config import get_settings
+from app.utils.metrics import encoded_bytes, frames_encoded
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack is offered only when installed
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Raw deflate (no zlib header), as produced by DecompressionStream("deflate-raw")
+_DEFLATE_WBITS = -zlib.MAX_WBITS
+
+
+class Encoding(str, Enum):
+    """Wire encoding of the frames sent to a connection."""
+
+    JSON = "json"
+    JSON_DEFLATE = "json+deflate"
+    MSGPACK = "msgpack"
+
+
+def available_encodings() -> list[Encoding]:
+    """
+    Encodings this instance can serve.
+
+    Returns:
+        Supported encodings; MessagePack only when the msgpack package is installed
+    """
+    return [encoding for encoding in Encoding if encoding != Encoding.MSGPACK or msgpack]
+
+
+def negotiate_encoding(
+    subprotocols: Sequence[str], requested: str | None = None
+) -> tuple[Encoding, str | None]:
+    """
+    Pick the encoding for a new connection.
+
+    A ``Sec-WebSocket-Protocol`` offer wins: the first supported subprotocol
+    in the client's order is selected and must be echoed back on accept.
+    Otherwise the ``encoding`` query parameter is used. Anything unknown or
+    unavailable falls back to JSON text, which every client understands.
+
+    Args:
+        subprotocols: Subprotocols offered by the client
+        requested: Value of the ``encoding`` query parameter
+
+    Returns:
+        Tuple of (encoding, subprotocol to accept or None)
+    """
+    supported = {encoding.value: encoding for encoding in available_encodings()}
+
+    for subprotocol in subprotocols:
+        if subprotocol in supported:
+            return supported[subprotocol], subprotocol
+
+    if requested:
+        if requested in supported:
+            return supported[requested], None
+        logger.debug(f"Unsupported encoding {requested!r} requested, using json")
+
+    return Encoding.JSON, None
+
+
+class Frame:
+    """
+    One outbound message, serialized lazily per wire encoding.
+
+    A fanout wraps its JSON frame once and every recipient asks for its own
+    encoding; the first request for an encoding does the work (deflate or
+    MessagePack) and later recipients reuse the cached result, so the cost
+    scales with the number of encodings in use rather than the number of
+    sockets. JSON+deflate frames below ``ws_deflate_min_size`` are sent as
+    plain text frames, since compressing them costs more than it saves;
+    clients tell the two apart by the frame type.
+    """
+
+    __slots__ = ("_encoded", "data")
+
+    def __init__(self, data: str | bytes):
+        self.data = data
+        self._encoded: dict[Encoding, str | bytes] = {}
+
+    def encode(self, encoding: Encoding) -> str | bytes:
+        """
+        Serialize the frame for an encoding.
+
+        Args:
+            encoding: Wire encoding of the recipient
+
+        Returns:
+            Text (str) or binary (bytes) frame payload
+        """
+        encoded = self._encoded.get(encoding)
+        if encoded is not None:
+            return encoded
+
+        if encoding == Encoding.MSGPACK:
+            encoded = msgpack.packb(orjson.loads(self.data))
+        else:
+            text = self.data if isinstance(self.data, str) else self.data.decode()
+            if encoding == Encoding.JSON_DEFLATE and len(text) >= settings.ws_deflate_min_size:
+                encoded = deflate(text.encode())
+            else:
+                encoded = text
+
+        frames_encoded.inc(encoding.value)
+        encoded_bytes.inc(encoding.value, amount=len(encoded))
+        self._encoded[encoding] = encoded
+        return encoded
+
+
+def deflate(data: bytes) -> bytes:
+    """
+    Compress a payload with raw deflate.
+
+    Args:
+        data: Uncompressed bytes
+
+    Returns:
+        Compressed bytes without zlib header or trailer
+    """
+    compressor = zlib.compressobj(settings.ws_deflate_level, zlib.DEFLATED, _DEFLATE_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decode_inbound(encoding: Encoding, data: bytes) -> Any:
+    """
+    Parse a binary frame received from a client.
+
+    Text frames are always JSON; binary frames follow the connection's
+    encoding (raw deflate JSON or MessagePack). Decompression is bounded by
+    ``ws_message_max_size`` so a small frame cannot inflate without limit.
+
+    Args:
+        encoding: Connection encoding
+        data: Binary frame payload
+
+    Returns:
+        Decoded message data
+
+    Raises:
+        ValueError: If the frame is too large once decompressed
+    """
+    if encoding == Encoding.MSGPACK:
+        return msgpack.unpackb(data)
+
+    if encoding == Encoding.JSON_DEFLATE:
+        decompressor = zlib.decompressobj(_DEFLATE_WBITS)
+        data = decompressor.decompress(data, settings.ws_message_max_size)
+        if decompressor.unconsumed_tail:
+            raise ValueError("Message too large")
+
+    return orjson.loads(data)
+
+
+async def send_encoded(websocket: WebSocket, payload: str | bytes):
+    """
+    Write an encoded payload as a text or binary frame.
+
+    Args:
+        websocket: Target WebSocket
+        payload: Output of Frame.encode
+    """
+    if isinstance(payload, str):
+        await websocket.send_text(payload)
+    else:
+        await websocket.send_bytes(payload)
@@ -0,0 +1,175 @@
+"""
+Event log module.
+Appends tenant and user messages to capped Redis Streams so reconnecting
+clients can catch up from their last seen event ID.
+"""
+
+import logging
+
+import orjson
+
+from app.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Field holding the serialized frame in each stream entry
+FRAME_FIELD = b"f"
+
+# Suffix of an encoded WSMessage whose event_id has not been assigned yet
+_UNSET_EVENT_ID = b'"event_id":null}'
+
+
+def parse_event_id(event_id: str) -> tuple[int, int] | None:
+    """
+    Parse a Redis Stream entry ID into a comparable tuple.
+
+    Args:
+        event_id: Entry ID in "<milliseconds>-<sequence>" form
+
+    Returns:
+        (milliseconds, sequence) tuple, or None if the ID is malformed
+    """
+    millis, _, sequence = event_id.partition("-")
+    if not millis.isdigit() or (sequence and not sequence.isdigit()):
+        return None
+    return int(millis), int(sequence or 0)
+
+
+def with_event_id(frame: bytes, event_id: str) -> bytes:
+    """
+    Stamp an event ID into an encoded message frame.
+
+    Args:
+        frame: JSON frame produced by WSMessage.encode()
+        event_id: Stream entry ID
+
+    Returns:
+        Frame bytes with ``event_id`` set
+    """
+    if frame.endswith(_UNSET_EVENT_ID):
+        # event_id is the last field of WSMessage, so splice instead of re-encoding
+        return frame[: -len(b"null}")] + orjson.dumps(event_id) + b"}"
+
+    data = orjson.loads(frame)
+    data["event_id"] = event_id
+    return orjson.dumps(data)
+
+
+def _decode(value) -> str:
+    """Decode a Redis reply value to str."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class EventLog:
+    """
+    Capped Redis Streams holding recent messages per tenant and per user.
+
+    Each published message is appended before it is sent over pub/sub and
+    carries the resulting entry ID as ``event_id``. A client reconnecting
+    with its last seen ID receives the entries it missed, in ID order.
+    """
+
+    def __init__(self, enabled: bool, maxlen: int, ttl: int, replay_limit: int):
+        self.enabled = enabled
+        self.maxlen = max(1, maxlen)
+        self.ttl = ttl
+        self.replay_limit = max(1, replay_limit)
+
+        # Statistics
+        self.total_appended = 0
+        self.total_replays = 0
+        self.total_replayed_events = 0
+        self.total_incomplete_replays = 0
+
+    async def append_many(self, entries: list[tuple[str, bytes]]) -> list[str]:
+        """
+        Append frames to their streams in one pipeline round trip.
+
+        Args:
+            entries: List of (stream key, frame bytes) pairs
+
+        Returns:
+            Entry IDs assigned to each frame, in order
+        """
+        if not entries:
+            return []
+
+        pipe = redis_client.redis.pipeline(transaction=False)
+        for key, frame in entries:
+            pipe.xadd(key, {FRAME_FIELD: frame}, maxlen=self.maxlen, approximate=True)
+            if self.ttl > 0:
+                pipe.expire(key, self.ttl)
+        results = await pipe.execute()
+
+        step = 2 if self.ttl > 0 else 1
+        self.total_appended += len(entries)
+        return [_decode(event_id) for event_id in results[::step]]
+
+    async def replay(self, keys: list[str], last_event_id: str) -> tuple[list[bytes], bool]:
+        """
+        Read the entries appended after ``last_event_id`` across streams.
+
+        Args:
+            keys: Stream keys the client is entitled to
+            last_event_id: Last event ID the client received
+
+        Returns:
+            Tuple of (frames stamped with their event IDs in ID order,
+            whether the replay covers the whole gap)
+        """
+        last = parse_event_id(last_event_id)
+        if last is None:
+            logger.warning(f"Ignoring malformed last_event_id: {last_event_id!r}")
+            return [], False
+
+        pipe = redis_client.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.xrange(key, min=f"({last_event_id}", max="+", count=self.replay_limit + 1)
+            pipe.xinfo_stream(key)
+        results = await pipe.execute(raise_on_error=False)
+
+        entries: list[tuple[tuple[int, int], str, bytes]] = []
+        complete = True
+
+        for index in range(0, len(results), 2):
+            rows, info = results[index], results[index + 1]
+            if isinstance(rows, Exception):
+                raise rows
+
+            for raw_id, fields in rows:
+                event_id = _decode(raw_id)
+                entries.append((parse_event_id(event_id), event_id, fields[FRAME_FIELD]))
+
+            # Entries at or after the client's position were trimmed away
+            if isinstance(info, dict):
+                deleted = parse_event_id(_decode(info.get("max-deleted-entry-id", b"0-0")))
+                if deleted and deleted > last:
+                    complete = False
+
+        entries.sort(key=lambda entry: entry[0])
+        if len(entries) > self.replay_limit:
+            # Keep the oldest entries so the client's position never skips ahead
+            entries = entries[: self.replay_limit]
+            complete = False
+
+        self.total_replays += 1
+        self.total_replayed_events += len(entries)
+        if not complete:
+            self.total_incomplete_replays += 1
+
+        return [with_event_id(frame, event_id) for _, event_id, frame in entries], complete
+
+    def get_stats(self) -> dict:
+        """
+        Get event log statistics.
+
+        Returns:
+            Dictionary with append and replay counters
+        """
+        return {
+            "enabled": self.enabled,
+            "total_appended": self.total_appended,
+            "total_replays": self.total_replays,
+            "total_replayed_events": self.total_replayed_events,
+            "total_incomplete_replays": self.total_incomplete_replays,
+        }
@@ -0,0 +1,145 @@
+"""
+Fanout engine module.
+Delivers a single message to many local WebSocket connections concurrently.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+
+from app.utils.metrics import fanout_duration, percentile, send_failures
+
+logger = logging.getLogger(__name__)
+
+
+class FanoutEngine:
+    """
+    Sends one message to a set of connections using a bounded pool of workers.
+
+    Workers share a single iterator over the target connections, so at most
+    ``concurrency`` sends are in flight at once and no per-recipient task is
+    created. Every send is bounded by ``send_timeout`` so one stalled socket
+    cannot hold up the rest of the broadcast.
+    """
+
+    def __init__(self, concurrency: int, send_timeout: float, yield_every: int):
+        self.concurrency = max(1, concurrency)
+        self.send_timeout = send_timeout
+        self.yield_every = max(1, yield_every)
+
+        # Statistics
+        self.total_broadcasts = 0
+        self.total_deliveries = 0
+        self.total_failures = 0
+        self.total_timeouts = 0
+        self.last_p50_ms = 0.0
+        self.last_p99_ms = 0.0
+        self.last_duration_ms = 0.0
+
+    async def fanout(
+        self,
+        connection_ids: Iterable[str],
+        send: Callable[[str], Awaitable[None]],
+    ) -> dict:
+        """
+        Deliver a message to every target connection.
+
+        Args:
+            connection_ids: Target connection IDs
+            send: Coroutine function performing the send for one connection
+
+        Returns:
+            Dictionary with delivery counts, latency percentiles (milliseconds
+            since the start of the broadcast) and the IDs of connections whose
+            send failed or timed out
+        """
+        targets = list(connection_ids)
+        if not targets:
+            return {
+                "recipients": 0,
+                "delivered": 0,
+                "failed": [],
+                "timed_out": [],
+                "p50_ms": 0.0,
+                "p99_ms": 0.0,
+                "duration_ms": 0.0,
+            }
+
+        latencies: list[float] = []
+        failed: list[str] = []
+        timed_out: list[str] = []
+        remaining = iter(targets)
+        started = time.perf_counter()
+
+        async def worker():
+            for sent, connection_id in enumerate(remaining, start=1):
+                try:
+                    async with asyncio.timeout(self.send_timeout):
+                        await send(connection_id)
+                    latencies.append(time.perf_counter() - started)
+                except TimeoutError:
+                    timed_out.append(connection_id)
+                except Exception as e:
+                    logger.debug(f"Fanout send to {connection_id} failed: {e}")
+                    failed.append(connection_id)
+
+                # Sends to healthy sockets rarely suspend, so yield explicitly
+                if sent % self.yield_every == 0:
+                    await asyncio.sleep(0)
+
+        workers = min(self.concurrency, len(targets))
+        if workers == 1:
+            await worker()
+        else:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        p50_ms = percentile(latencies, 50) * 1000
+        p99_ms = percentile(latencies, 99) * 1000
+
+        self.total_broadcasts += 1
+        self.total_deliveries += len(latencies)
+        self.total_failures += len(failed)
+        self.total_timeouts += len(timed_out)
+        self.last_p50_ms = p50_ms
+        self.last_p99_ms = p99_ms
+        self.last_duration_ms = duration_ms
+        fanout_duration.observe(duration_ms / 1000)
+        if failed:
+            send_failures.inc("error", amount=len(failed))
+        if timed_out:
+            send_failures.inc("timeout", amount=len(timed_out))
+
+        logger.debug(
+            f"Fanout complete: recipients={len(targets)}, delivered={len(latencies)}, "
+            f"failed={len(failed)}, timed_out={len(timed_out)}, "
+            f"p50={p50_ms:.2f}ms, p99={p99_ms:.2f}ms"
+        )
+
+        return {
+            "recipients": len(targets),
+            "delivered": len(latencies),
+            "failed": failed,
+            "timed_out": timed_out,
+            "p50_ms": p50_ms,
+            "p99_ms": p99_ms,
+            "duration_ms": duration_ms,
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Get fanout statistics.
+
+        Returns:
+            Dictionary with cumulative counters and last broadcast latency
+        """
+        return {
+            "total_broadcasts": self.total_broadcasts,
+            "total_deliveries": self.total_deliveries,
+            "total_failures": self.total_failures,
+            "total_timeouts": self.total_timeouts,
+            "last_p50_ms": round(self.last_p50_ms, 3),
+            "last_p99_ms": round(self.last_p99_ms, 3),
+            "last_duration_ms": round(self.last_duration_ms, 3),
+        }
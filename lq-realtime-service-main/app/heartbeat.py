@@ -0,0 +1,179 @@
+"""
+Heartbeat module.
+Pings quiet connections and reaps the ones that stopped responding, using a
+single background task over a bucketed schedule.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code 1001: "Going Away"
+IDLE_CLOSE_CODE = 1001
+
+
+class Tracked(Protocol):
+    """Connection state read by the reaper."""
+
+    connection_id: str
+    last_seen: float
+    heartbeat_slot: int
+
+
+class HeartbeatReaper:
+    """
+    Round-robin timer wheel over all local connections.
+
+    Connections are spread across ``interval / tick`` slots and one slot is
+    visited per tick, so every connection is checked once per heartbeat
+    interval while the work per tick stays proportional to the number of
+    connections divided by the number of slots. A connection that has been
+    silent for ``interval`` seconds is pinged; one silent for longer than
+    ``idle_timeout`` is reaped. Inbound activity is read from each record's
+    ``last_seen`` (``time.monotonic()``), so the reaper keeps no per-connection
+    state of its own beyond slot membership.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float,
+        idle_timeout: float,
+        tick: float,
+        send_ping: Callable[[str], Awaitable[None]],
+        reap: Callable[[str], Awaitable[None]],
+    ):
+        self.interval = max(tick, interval)
+        self.idle_timeout = idle_timeout
+        self.tick = tick
+        self.send_ping = send_ping
+        self.reap = reap
+
+        # Timer wheel: each slot holds the connections checked on the same tick
+        self._slots: list[set[Tracked]] = [
+            set() for _ in range(max(1, round(self.interval / tick)))
+        ]
+        self._cursor = 0
+        self.tracked = 0
+
+        self._task: asyncio.Task | None = None
+
+        # Statistics
+        self.total_pings_sent = 0
+        self.total_reaped = 0
+        self.last_tick_reaped = 0
+
+    def add(self, record: Tracked):
+        """
+        Start tracking a connection.
+        It is placed in the slot visited furthest in the future.
+
+        Args:
+            record: Connection record
+        """
+        if record.heartbeat_slot >= 0:
+            return
+        slot = (self._cursor - 1) % len(self._slots)
+        self._slots[slot].add(record)
+        record.heartbeat_slot = slot
+        self.tracked += 1
+
+    def remove(self, record: Tracked):
+        """
+        Stop tracking a connection.
+
+        Args:
+            record: Connection record
+        """
+        if record.heartbeat_slot < 0:
+            return
+        self._slots[record.heartbeat_slot].discard(record)
+        record.heartbeat_slot = -1
+        self.tracked -= 1
+
+    async def run_tick(self, now: float | None = None) -> int:
+        """
+        Check the connections in the current slot and advance the wheel.
+
+        Args:
+            now: Monotonic time to evaluate against (defaults to now)
+
+        Returns:
+            Number of connections reaped
+        """
+        now = time.monotonic() if now is None else now
+        slot = self._slots[self._cursor]
+        self._cursor = (self._cursor + 1) % len(self._slots)
+
+        expired: list[Tracked] = []
+        quiet: list[str] = []
+        for record in slot:
+            silence = now - record.last_seen
+            if self.idle_timeout > 0 and silence > self.idle_timeout:
+                expired.append(record)
+            elif silence >= self.interval:
+                quiet.append(record.connection_id)
+
+        for connection_id in quiet:
+            try:
+                await self.send_ping(connection_id)
+                self.total_pings_sent += 1
+            except Exception as e:
+                logger.debug(f"Heartbeat ping to {connection_id} failed: {e}")
+
+        if expired:
+            logger.info(f"Reaping {len(expired)} idle connections")
+            for record in expired:
+                self.remove(record)
+            results = await asyncio.gather(
+                *(self.reap(record.connection_id) for record in expired), return_exceptions=True
+            )
+            for record, result in zip(expired, results, strict=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to reap idle connection {record.connection_id}: {result}")
+
+        self.total_reaped += len(expired)
+        self.last_tick_reaped = len(expired)
+        return len(expired)
+
+    def start(self):
+        """Start the background heartbeat task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background heartbeat task."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _run(self):
+        """Visit one slot of the wheel per tick."""
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.run_tick()
+            except Exception as e:
+                logger.error(f"Heartbeat tick failed: {e!s}")
+
+    def get_stats(self) -> dict:
+        """
+        Get heartbeat statistics.
+
+        Returns:
+            Dictionary with tracked connections, ping and reap counters
+        """
+        return {
+            "tracked_connections": self.tracked,
+            "interval_seconds": self.interval,
+            "idle_timeout_seconds": self.idle_timeout,
+            "total_pings_sent": self.total_pings_sent,
+            "total_reaped": self.total_reaped,
+            "last_tick_reaped": self.last_tick_reaped,
+        }
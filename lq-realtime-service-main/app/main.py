@@ -5,9 +5,9 @@ Configures routes, middleware, and lifecycle events.
 
 import logging
 from contextlib import asynccontextmanager
+from datetime import datetime
 
 from fastapi import (
-    BackgroundTasks,
     FastAPI,
     Header,
     HTTPException,
@@ -17,23 +17,33 @@ from fastapi import (
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.auth import verify_system_api_key
 from app.config import get_settings
 from app.redis_client import redis_client
 from app.schemas import (
+    BatchMessageRequest,
+    BatchMessageResponse,
+    ClusterStatsResponse,
+    DeadLetterEntry,
+    DeadLetterResponse,
+    DrainResponse,
     ErrorResponse,
     GlobalBroadcastRequest,
     GlobalBroadcastResponse,
     HealthCheckResponse,
+    MessageTarget,
     MetricsResponse,
+    PresenceSnapshotResponse,
+    SendMessageRequest,
+    SendMessageResponse,
     WebhookProvider,
     WSMessage,
 )
 from app.utils.logging import setup_logging
-from app.utils.metrics import metrics_collector
-from app.webhooks import handle_webhook, webhook_registry
+from app.utils.metrics import PROMETHEUS_CONTENT_TYPE, metrics_collector, registry
+from app.webhooks import handle_webhook, webhook_queue, webhook_registry
 from app.websocket_handler import connection_manager, websocket_endpoint
 
 settings = get_settings()
@@ -55,6 +65,14 @@ async def lifespan(app: FastAPI):
         await redis_client.connect()
         logger.info("Redis connection established")
 
+        await connection_manager.start()
+        metrics_collector.start()
+        await webhook_registry.start()
+        webhook_queue.start()
+
+        # Drain connections on SIGTERM before uvicorn starts shutting down
+        connection_manager.drainer.install_signal_handler()
+
     except Exception as e:
         logger.error(f"Failed to initialize application: {e}")
         raise
@@ -64,6 +82,13 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down application...")
 
     try:
+        # Let a drain started by SIGTERM or the admin endpoint finish first
+        await connection_manager.drainer.wait()
+
+        await metrics_collector.stop()
+        await webhook_queue.stop()
+        await webhook_registry.stop()
+        await connection_manager.stop()
         await redis_client.disconnect()
         logger.info("Redis connection closed")
 
@@ -134,24 +159,62 @@ async def root():
 async def health_check():
     """
     Health check endpoint.
-    Returns service status and basic metrics.
+    Returns service status and basic metrics. Responds with 503 while the
+    pub/sub listener is reconnecting, so readiness probes take the instance
+    out of rotation instead of letting it serve sockets that receive nothing,
+    and while the instance is draining before shutdown.
     """
     redis_connected = await redis_client.is_connected()
+    listener = redis_client.get_listener_stats()
     stats = connection_manager.get_stats()
 
-    return HealthCheckResponse(
-        status="healthy" if redis_connected else "degraded",
+    draining = connection_manager.drainer.draining
+    if draining:
+        health_status = "draining"
+    elif not listener["healthy"]:
+        health_status = "unhealthy"
+    elif not redis_connected:
+        health_status = "degraded"
+    else:
+        health_status = "healthy"
+
+    response = HealthCheckResponse(
+        status=health_status,
         version=settings.app_version,
         redis_connected=redis_connected,
         active_connections=stats["active_connections"],
+        pubsub_listener=listener["state"],
+        pubsub_last_message_age_seconds=listener["last_message_age_seconds"],
     )
 
+    if draining or not listener["healthy"]:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=response.model_dump(mode="json"),
+        )
+    return response
+
+
+def _wants_prometheus(request: Request, output_format: str | None) -> bool:
+    """Whether a metrics request asks for the Prometheus text format."""
+    if output_format is not None:
+        return output_format == "prometheus"
+    accept = request.headers.get("accept", "")
+    return "text/plain" in accept or "application/openmetrics-text" in accept
+
 
 @app.get("/metrics", response_model=MetricsResponse)
-async def metrics():
+async def metrics(
+    request: Request,
+    output_format: str | None = Query(
+        None, alias="format", description="Response format: json or prometheus"
+    ),
+):
     """
     Metrics endpoint.
-    Returns detailed application metrics.
+    Returns detailed application metrics as JSON, or in the Prometheus text
+    format when requested via ``?format=prometheus`` or an Accept header of
+    ``text/plain`` (as sent by Prometheus scrapers).
     """
     if not settings.metrics_enabled:
         return JSONResponse(
@@ -159,9 +222,13 @@ async def metrics():
             content={"error": "Metrics endpoint disabled"},
         )
 
+    if _wants_prometheus(request, output_format):
+        return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
     stats = connection_manager.get_stats()
     webhook_stats = webhook_registry.get_stats()
     system_metrics = metrics_collector.get_metrics()
+    subscription_stats = redis_client.get_subscription_stats()
 
     return MetricsResponse(
         active_websocket_connections=stats["active_connections"],
@@ -169,6 +236,16 @@ async def metrics():
         total_messages_received=stats["total_messages_received"],
         total_webhooks_processed=webhook_stats["total_processed"],
         redis_pubsub_channels=stats["subscribed_channels"],
+        outbound_queue_depth=stats["outbound_queue_depth"],
+        outbound_queue_max_depth=stats["outbound_queue_max_depth"],
+        total_dropped_frames=stats["total_dropped_frames"],
+        total_slow_consumer_evictions=stats["total_slow_consumer_evictions"],
+        active_rooms=stats["active_rooms"],
+        total_idle_reaped=stats["heartbeat"]["total_reaped"],
+        redis_subscribes_total=subscription_stats["total_subscribes"],
+        redis_unsubscribes_total=subscription_stats["total_unsubscribes"],
+        redis_unsubscribes_avoided=subscription_stats["total_unsubscribes_avoided"],
+        redis_pubsub_shards=redis_client.get_listener_stats().get("shards", []),
         uptime_seconds=system_metrics["uptime_seconds"],
         memory_usage_mb=system_metrics["memory_usage_mb"],
     )
@@ -178,6 +255,10 @@ async def metrics():
 async def websocket_route(
     websocket: WebSocket,
     token: str = Query(..., description="JWT authentication token"),
+    last_event_id: str | None = Query(None, description="Last event ID received, for replay"),
+    encoding: str | None = Query(
+        None, description="Wire encoding: json, json+deflate or msgpack (or a subprotocol)"
+    ),
 ):
     """
     WebSocket endpoint.
@@ -186,15 +267,16 @@ async def websocket_route(
     Args:
         websocket: WebSocket connection
         token: JWT token for authentication
+        last_event_id: Last event ID received before reconnecting
+        encoding: Requested wire encoding
     """
-    await websocket_endpoint(websocket, token)
+    await websocket_endpoint(websocket, token, last_event_id, encoding)
 
 
 @app.post("/webhooks/{provider}")
 async def webhook_route(
     provider: WebhookProvider,
     request: Request,
-    background_tasks: BackgroundTasks,
     x_signature: str = Header(None, alias="x-signature"),
     x_tenant_id: str = Header(None, alias="x-tenant-id"),
 ):
@@ -204,7 +286,6 @@ async def webhook_route(
     Args:
         provider: Webhook provider (stripe, github, slack, etc.)
         request: FastAPI request object
-        background_tasks: Background task manager
         x_signature: Webhook signature header
         x_tenant_id: Optional tenant ID header
 
@@ -214,7 +295,6 @@ async def webhook_route(
     return await handle_webhook(
         provider=provider,
         request=request,
-        background_tasks=background_tasks,
         x_signature=x_signature,
         x_tenant_id=x_tenant_id,
     )
@@ -241,7 +321,7 @@ async def debug_connections():
             "connected_at": info.connected_at.isoformat(),
             "last_activity": info.last_activity.isoformat(),
         }
-        for info in connection_manager.connection_info.values()
+        for info in (record.to_info() for record in connection_manager.active_connections.values())
     ]
 
     return {
@@ -250,6 +330,150 @@ async def debug_connections():
     }
 
 
+@app.get("/stats/cluster", response_model=ClusterStatsResponse)
+async def cluster_stats(
+    tenants: int = Query(100, ge=0, le=10000, description="Busiest tenants to list"),
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Connection statistics merged across every live instance.
+    Built from the stats heartbeats the instances write to Redis; instances
+    whose heartbeat is older than CLUSTER_STATS_STALE_AFTER are left out.
+
+    **Security**: Requires system API key in X-API-Key header.
+
+    Args:
+        tenants: Number of tenants (by total connections) to list
+        x_api_key: System API key for authentication
+
+    Returns:
+        ClusterStatsResponse with cluster totals and per-instance entries
+    """
+    await verify_system_api_key(x_api_key)
+
+    try:
+        merged = await connection_manager.cluster_stats.collect(tenant_limit=tenants)
+    except Exception as e:
+        logger.error(f"Failed to collect cluster stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cluster stats unavailable",
+        ) from e
+
+    for entry in merged["instances"]:
+        entry["reported_at"] = datetime.utcfromtimestamp(entry["reported_at"])
+    return ClusterStatsResponse(**merged)
+
+
+@app.get("/api/presence/{tenant_id}", response_model=PresenceSnapshotResponse)
+async def presence_snapshot(
+    tenant_id: str,
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Users of a tenant currently online on any instance.
+    WebSocket clients get the same snapshot, followed by join/leave diffs,
+    by sending a ``presence`` message.
+
+    **Security**: Requires system API key in X-API-Key header.
+
+    Args:
+        tenant_id: Tenant identifier
+        x_api_key: System API key for authentication
+
+    Returns:
+        PresenceSnapshotResponse with the online users and presence version
+    """
+    await verify_system_api_key(x_api_key)
+
+    try:
+        snapshot = await connection_manager.presence.snapshot(tenant_id)
+    except Exception as e:
+        logger.error(f"Failed to read presence for tenant {tenant_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Presence unavailable",
+        ) from e
+
+    return PresenceSnapshotResponse(**snapshot)
+
+
+@app.post("/api/admin/drain", response_model=DrainResponse, status_code=status.HTTP_202_ACCEPTED)
+async def drain_instance(
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Put this instance into drain mode.
+
+    Readiness fails immediately, new handshakes are refused, and open
+    connections are asked to reconnect elsewhere and closed gradually over
+    ``WS_DRAIN_WINDOW`` seconds. The instance keeps running afterwards;
+    SIGTERM triggers the same drain before shutdown.
+
+    **Security**: Requires system API key in X-API-Key header.
+
+    Args:
+        x_api_key: System API key for authentication
+
+    Returns:
+        DrainResponse with the drain window and connection count
+    """
+    await verify_system_api_key(x_api_key)
+
+    connections = len(connection_manager.active_connections)
+    started = connection_manager.drainer.start()
+    logger.info(f"Drain requested via API: started={started}, connections={connections}")
+
+    return DrainResponse(
+        success=started,
+        message="Drain started" if started else "Drain already in progress",
+        connections=connections,
+        window_seconds=connection_manager.drainer.window,
+    )
+
+
+@app.get("/api/admin/webhooks/dead-letters", response_model=DeadLetterResponse)
+async def webhook_dead_letters(
+    limit: int = Query(50, ge=1, le=1000, description="Maximum entries to return"),
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Inspect webhook deliveries that exhausted their retries.
+
+    **Security**: Requires system API key in X-API-Key header.
+
+    Args:
+        limit: Maximum entries to return
+        x_api_key: System API key for authentication
+
+    Returns:
+        DeadLetterResponse with the most recent entries first
+    """
+    await verify_system_api_key(x_api_key)
+
+    entries = [
+        DeadLetterEntry(
+            id=entry_id,
+            provider=fields.get("provider", ""),
+            tenant_id=fields.get("tenant_id") or None,
+            event_type=fields.get("event_type") or None,
+            delivery_id=fields.get("delivery_id") or None,
+            attempts=int(fields.get("attempts", 0)),
+            error=fields.get("error", ""),
+            received_at=_from_timestamp(fields.get("received_at")),
+            failed_at=_from_timestamp(fields.get("failed_at")),
+            body=fields.get("body", ""),
+        )
+        for entry_id, fields in await webhook_queue.dead_letters(limit)
+    ]
+    return DeadLetterResponse(count=len(entries), entries=entries)
+
+
+def _from_timestamp(value: str | None) -> datetime | None:
+    """Parse a stored Unix timestamp."""
+    return datetime.utcfromtimestamp(float(value)) if value else None
+
+
 @app.post("/api/broadcast/global", response_model=GlobalBroadcastResponse)
 async def global_broadcast(
     request: GlobalBroadcastRequest,
@@ -316,6 +540,165 @@ async def global_broadcast(
         ) from e
 
 
+def _build_message(request: SendMessageRequest, to_user: str | None = None) -> WSMessage:
+    """Build a WebSocket message from a targeted send request."""
+    return WSMessage(
+        type=request.message_type,
+        payload=request.payload,
+        from_user=request.from_user or "backend",
+        to_user=to_user,
+    )
+
+
+async def _send_targeted_message(
+    target: MessageTarget, target_id: str, request: SendMessageRequest
+) -> SendMessageResponse:
+    """Deliver a single targeted message and report what it reached."""
+    to_user = target_id if target == MessageTarget.USER else None
+
+    try:
+        result = await connection_manager.publish_batch(
+            [(target, target_id, _build_message(request, to_user))]
+        )
+
+        logger.info(
+            f"Message sent: target={target.value}:{target_id}, type={request.message_type}, "
+            f"subscribers={result['subscribers_reached']}, local={result['local_connections']}"
+        )
+
+        return SendMessageResponse(
+            success=True,
+            message=f"Message sent to {target.value} {target_id}",
+            subscribers_reached=result["subscribers_reached"],
+            local_connections=result["local_connections"],
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to send message to {target.value} {target_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to send message: {e!s}",
+        ) from e
+
+
+@app.post("/api/messages/user/{user_id}", response_model=SendMessageResponse)
+async def send_user_message(
+    user_id: str,
+    request: SendMessageRequest,
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Send a message to every connection of a user.
+    Only the instances that hold the user's connections receive the publish.
+
+    **Security**: Requires system API key in X-API-Key header.
+    """
+    await verify_system_api_key(x_api_key)
+    return await _send_targeted_message(MessageTarget.USER, user_id, request)
+
+
+@app.post("/api/messages/tenant/{tenant_id}", response_model=SendMessageResponse)
+async def send_tenant_message(
+    tenant_id: str,
+    request: SendMessageRequest,
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Send a message to every connection in a tenant.
+
+    **Security**: Requires system API key in X-API-Key header.
+    """
+    await verify_system_api_key(x_api_key)
+    return await _send_targeted_message(MessageTarget.TENANT, tenant_id, request)
+
+
+@app.post("/api/messages/room/{room_id}", response_model=SendMessageResponse)
+async def send_room_message(
+    room_id: str,
+    request: SendMessageRequest,
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Send a message to every connection subscribed to a room.
+
+    **Security**: Requires system API key in X-API-Key header.
+    """
+    await verify_system_api_key(x_api_key)
+    return await _send_targeted_message(MessageTarget.ROOM, room_id, request)
+
+
+@app.post("/api/messages/batch", response_model=BatchMessageResponse)
+async def send_message_batch(
+    request: BatchMessageRequest,
+    x_api_key: str = Header(..., alias="x-api-key", description="System API key"),
+):
+    """
+    Send many targeted messages in one request.
+
+    User routes are resolved in one Redis pipeline and all publishes go out
+    in a second one, so a batch costs two Redis round trips regardless of
+    its size.
+
+    **Security**: Requires system API key in X-API-Key header.
+
+    Example:
+        ```bash
+        curl -X POST http://localhost:8082/api/messages/batch \\
+          -H "Content-Type: application/json" \\
+          -H "X-API-Key: your-system-api-key" \\
+          -d '{
+            "messages": [
+              {"target": "user", "target_id": "123", "payload": {"unread": 4}},
+              {"target": "room", "target_id": "course-42", "payload": {"event": "started"}}
+            ]
+          }'
+        ```
+    """
+    await verify_system_api_key(x_api_key)
+
+    if len(request.messages) > settings.api_batch_max_messages:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Batch exceeds {settings.api_batch_max_messages} messages",
+        )
+
+    try:
+        result = await connection_manager.publish_batch(
+            [
+                (
+                    item.target,
+                    item.target_id,
+                    _build_message(
+                        item, item.target_id if item.target == MessageTarget.USER else None
+                    ),
+                )
+                for item in request.messages
+            ]
+        )
+
+        logger.info(
+            f"Message batch sent: messages={len(request.messages)}, "
+            f"channels={result['channels_published']}, "
+            f"subscribers={result['subscribers_reached']}"
+        )
+
+        return BatchMessageResponse(
+            success=True,
+            message="Message batch sent successfully",
+            messages_accepted=len(request.messages),
+            channels_published=result["channels_published"],
+            subscribers_reached=result["subscribers_reached"],
+            local_connections=result["local_connections"],
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to send message batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to send batch: {e!s}",
+        ) from e
+
+
 if __name__ == "__main__":
     import uvicorn
 
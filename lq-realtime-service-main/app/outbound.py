@@ -0,0 +1,253 @@
+"""
+Outbound queue module.
+Bounded per-connection send queues drained by a dedicated writer task.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from enum import Enum
+
+import orjson
+from fastapi import WebSocket
+
+from app.encoding import Encoding, Frame, send_encoded
+from app.utils.metrics import frames_coalesced, send_failures
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code 1013: "Try Again Later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class OverflowPolicy(str, Enum):
+    """What to do when a connection's outbound queue is full."""
+
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+def batch_frame(frames: list[Frame | str]) -> Frame:
+    """
+    Wrap several JSON frames in one ``batch`` message.
+    The frames are spliced in as-is rather than parsed and re-encoded.
+
+    Args:
+        frames: Frames to combine, oldest first
+
+    Returns:
+        Frame whose payload ``messages`` lists the original messages in order
+    """
+    texts = [frame.encode(Encoding.JSON) if isinstance(frame, Frame) else frame for frame in frames]
+    return Frame(
+        '{"type":"batch","payload":{"messages":['
+        + ",".join(texts)
+        + ']},"timestamp":'
+        + orjson.dumps(datetime.utcnow()).decode()
+        + "}"
+    )
+
+
+class OutboundQueue:
+    """
+    Bounded outbound queue for a single WebSocket connection.
+
+    Producers call ``put`` without awaiting the socket, so a slow client only
+    ever stalls its own writer task. When the queue is full the overflow
+    policy decides whether to drop the oldest frame, supersede a queued frame
+    with the same coalesce key, or evict the connection.
+
+    With a coalescing window, the writer holds the first frame for up to
+    ``coalesce_window`` seconds and sends it together with whatever arrives
+    meanwhile (up to ``coalesce_max_batch`` messages) as one ``batch`` frame,
+    so a burst costs one socket write instead of one per message. Frames
+    that are already queued when the writer gets to them are batched without
+    waiting. A lone frame is sent unwrapped.
+    """
+
+    def __init__(
+        self,
+        *,
+        connection_id: str,
+        websocket: WebSocket,
+        maxsize: int,
+        policy: OverflowPolicy,
+        send_timeout: float,
+        on_failure: Callable[[str, int, str], Awaitable[None]],
+        encoding: Encoding = Encoding.JSON,
+        coalesce_window: float = 0.0,
+        coalesce_max_batch: int = 1,
+    ):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        self.encoding = encoding
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_batch = max(1, coalesce_max_batch)
+
+        # Pending frames: (frame, coalesce_key); str frames are JSON text
+        self._frames: deque[tuple[Frame | str, str | None]] = deque()
+        self._ready = asyncio.Event()
+        self._writer_task: asyncio.Task | None = None
+        self._evict_task: asyncio.Task | None = None
+        self._sending = False
+        self.closed = False
+
+        # Statistics
+        self.dropped = 0
+        self.sent = 0
+        self.writes = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of frames waiting to be written."""
+        return len(self._frames)
+
+    def start(self):
+        """Start the writer task."""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+
+    def stop(self):
+        """Stop the writer task and discard pending frames."""
+        self.closed = True
+        self._frames.clear()
+        task = self._writer_task
+        if task and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+
+    def put(self, frame: Frame | str, coalesce_key: str | None = None) -> int:
+        """
+        Queue a frame for delivery without waiting for the socket.
+
+        Args:
+            frame: Frame, encoded for this connection when written, or JSON text
+            coalesce_key: Optional key; under the coalesce policy a newer frame
+                supersedes a queued frame with the same key
+
+        Returns:
+            Number of frames dropped to make room (0 when nothing was dropped)
+        """
+        if self.closed:
+            return 1
+
+        dropped = 0
+        if len(self._frames) >= self.maxsize:
+            if self.policy == OverflowPolicy.DISCONNECT:
+                self._evict()
+                return 1
+
+            if self.policy == OverflowPolicy.COALESCE and coalesce_key is not None:
+                dropped = self._remove_key(coalesce_key)
+
+            if not dropped:
+                self._frames.popleft()
+                dropped = 1
+
+        self._frames.append((frame, coalesce_key))
+        self._ready.set()
+        self.dropped += dropped
+        return dropped
+
+    async def flush(self, timeout: float) -> bool:
+        """
+        Wait for the queued frames to be written.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the queue emptied in time
+        """
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(timeout):
+                while (self._frames or self._sending) and not self.closed:
+                    await asyncio.sleep(0.01)
+        return not self._frames and not self._sending
+
+    def _remove_key(self, coalesce_key: str) -> int:
+        """Remove queued frames superseded by a newer frame with the same key."""
+        kept = deque(item for item in self._frames if item[1] != coalesce_key)
+        removed = len(self._frames) - len(kept)
+        self._frames = kept
+        return removed
+
+    def _evict(self):
+        """Evict a connection that cannot keep up with its outbound traffic."""
+        logger.warning(f"Outbound queue overflow for {self.connection_id}, evicting slow consumer")
+        self.dropped += len(self._frames) + 1
+        send_failures.inc("overflow")
+        self.stop()
+        self._evict_task = asyncio.create_task(
+            self.on_failure(self.connection_id, SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+        )
+
+    async def _collect(self, batch: list[Frame | str]):
+        """
+        Add frames queued within the coalescing window to a batch.
+
+        Args:
+            batch: Batch holding the first frame; extended in place
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_window
+
+        while len(batch) < self.coalesce_max_batch and not self.closed:
+            if self._frames:
+                batch.append(self._frames.popleft()[0])
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self._ready.clear()
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout(remaining):
+                    await self._ready.wait()
+            if not self._frames:
+                break
+
+    async def _writer(self):
+        """Drain queued frames to the socket, one at a time."""
+        try:
+            while not self.closed:
+                if not self._frames:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                frame, _ = self._frames.popleft()
+                self._sending = True
+                batch = [frame]
+                if self.coalesce_window > 0 and self.coalesce_max_batch > 1:
+                    await self._collect(batch)
+                    if len(batch) > 1:
+                        frames_coalesced.inc(amount=len(batch))
+                        frame = batch_frame(batch)
+
+                payload = frame.encode(self.encoding) if isinstance(frame, Frame) else frame
+                async with asyncio.timeout(self.send_timeout):
+                    await send_encoded(self.websocket, payload)
+                self._sending = False
+                self.sent += len(batch)
+                self.writes += 1
+
+        except asyncio.CancelledError:
+            raise
+        except TimeoutError:
+            logger.warning(f"Send to {self.connection_id} timed out, evicting slow consumer")
+            send_failures.inc("timeout")
+            self.closed = True
+            await self.on_failure(self.connection_id, SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")
+        except Exception as e:
+            logger.error(f"Error sending message to {self.connection_id}: {e}")
+            send_failures.inc("error")
+            self.closed = True
+            await self.on_failure(self.connection_id, 1011, "Send failed")
@@ -0,0 +1,332 @@
+"""
+Presence module.
+Tracks which users of each tenant are online across all instances and
+publishes batched join/leave diffs.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Callable
+
+from app.redis_client import (
+    get_presence_channel,
+    get_presence_holders_key,
+    get_presence_key,
+    get_presence_version_key,
+    redis_client,
+)
+from app.routing import UserRouteTable
+from app.schemas import WSMessage, WSMessageType
+from app.utils.metrics import presence_changes
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """
+    Redis-backed per-tenant presence with batched diffs.
+
+    Each tenant has a sorted set of online user IDs scored by the time the
+    entry expires; every instance refreshes the users it holds, so users of
+    a crashed instance drop out once their scores fall behind the clock.
+
+    Local transitions (a user's first connection to a tenant on this
+    instance, or its last one closing) are only recorded in memory. Every
+    ``flush_interval`` seconds they are applied to Redis in one pipeline;
+    only users whose membership actually changed make it into the diff, and
+    each tenant with changes gets one version bump and one published
+    ``presence`` frame listing everyone who joined or left. A tenant where
+    2,000 users connect at once therefore produces one diff per instance
+    and flush, not one event per connection per subscriber.
+
+    Alongside the members, each tenant keeps the (user, instance) pairs
+    holding them. A leave is dropped while another instance still holds
+    the user in the same tenant; the user route table narrows down which
+    instances to check. Diffs are idempotent; a client that sees a version
+    gap re-fetches the snapshot.
+    """
+
+    def __init__(
+        self,
+        *,
+        instance_id: str,
+        ttl: int,
+        flush_interval: float,
+        routes: UserRouteTable,
+        get_members: Callable[[], dict[str, set[str]]],
+    ):
+        self.instance_id = instance_id
+        self.ttl = max(3, ttl)
+        self.flush_interval = flush_interval
+        self.routes = routes
+        self.get_members = get_members
+
+        # Local transitions not yet applied: {tenant_id: {user_id: online}}
+        self._pending: dict[str, dict[str, bool]] = {}
+        self._task: asyncio.Task | None = None
+
+        # Statistics
+        self.total_flushes = 0
+        self.total_joins = 0
+        self.total_leaves = 0
+        self.total_diffs_published = 0
+
+    def mark_online(self, tenant_id: str, user_id: str):
+        """
+        Record a user's first local connection to a tenant.
+
+        Args:
+            tenant_id: Tenant identifier
+            user_id: User identifier
+        """
+        self._pending.setdefault(tenant_id, {})[user_id] = True
+
+    def mark_offline(self, tenant_id: str, user_id: str):
+        """
+        Record that a user's last local connection to a tenant closed.
+
+        Args:
+            tenant_id: Tenant identifier
+            user_id: User identifier
+        """
+        self._pending.setdefault(tenant_id, {})[user_id] = False
+
+    def start(self):
+        """Start the background flush and refresh task."""
+        if self.flush_interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush the remaining transitions."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.debug(f"Failed to flush presence on shutdown: {e!s}")
+
+    async def _run(self):
+        """Flush pending transitions and refresh entries well before they expire."""
+        next_refresh = time.monotonic() + self.ttl / 3
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() >= next_refresh:
+                    next_refresh = time.monotonic() + self.ttl / 3
+                    await self.refresh()
+            except Exception as e:
+                # The refresh restores lost joins and expiry removes lost leaves
+                logger.error(f"Failed to update presence: {e!s}")
+
+    async def flush(self):
+        """Apply pending local transitions and publish the resulting diffs."""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        now = time.time()
+
+        leaving = [
+            (tenant_id, user_id)
+            for tenant_id, changes in pending.items()
+            for user_id, online in changes.items()
+            if not online
+        ]
+        held_elsewhere = await self._held_elsewhere(leaving)
+
+        pipe = redis_client.redis.pipeline(transaction=False)
+        # None marks commands whose result is not a membership change
+        operations: list[tuple[str, str, bool] | None] = []
+        for tenant_id, changes in pending.items():
+            key = get_presence_key(tenant_id)
+            holders = get_presence_holders_key(tenant_id)
+            for user_id, online in changes.items():
+                holder = self._holder(user_id, self.instance_id)
+                if online:
+                    pipe.zadd(holders, {holder: now + self.ttl})
+                    pipe.zadd(key, {user_id: now + self.ttl})
+                else:
+                    pipe.zrem(holders, holder)
+                    if (tenant_id, user_id) in held_elsewhere:
+                        # Still connected to this tenant through another instance
+                        operations.append(None)
+                        continue
+                    pipe.zrem(key, user_id)
+                operations.extend([None, (tenant_id, user_id, online)])
+        for tenant_id in pending:
+            pipe.expire(get_presence_key(tenant_id), self.ttl)
+            pipe.expire(get_presence_holders_key(tenant_id), self.ttl)
+        results = await pipe.execute()
+
+        diffs: dict[str, dict[str, list[str]]] = {}
+        for operation, changed in zip(operations, results, strict=False):
+            if operation is None:
+                continue
+            tenant_id, user_id, online = operation
+            if changed:
+                diff = diffs.setdefault(tenant_id, {"joined": [], "left": []})
+                diff["joined" if online else "left"].append(user_id)
+
+        self.total_flushes += 1
+        await self._publish(diffs)
+
+    @staticmethod
+    def _holder(user_id: str, instance_id: str) -> str:
+        """Holder set member for a user held by an instance."""
+        return f"{user_id}@{instance_id}"
+
+    async def _held_elsewhere(self, leaving: list[tuple[str, str]]) -> set[tuple[str, str]]:
+        """
+        Find the leaving users another instance still holds in the same tenant.
+
+        Args:
+            leaving: (tenant_id, user_id) pairs whose last local connection closed
+
+        Returns:
+            The pairs that must not be announced as leaves
+        """
+        routes = await self.routes.get_instances_many(user_id for _, user_id in leaving)
+        candidates = [
+            (tenant_id, user_id, instance)
+            for tenant_id, user_id in leaving
+            for instance in routes.get(user_id, ())
+            if instance != self.instance_id
+        ]
+        if not candidates:
+            return set()
+
+        pipe = redis_client.redis.pipeline(transaction=False)
+        for tenant_id, user_id, instance in candidates:
+            pipe.zscore(get_presence_holders_key(tenant_id), self._holder(user_id, instance))
+        scores = await pipe.execute()
+
+        now = time.time()
+        return {
+            (tenant_id, user_id)
+            for (tenant_id, user_id, _), score in zip(candidates, scores, strict=True)
+            if score is not None and float(score) > now
+        }
+
+    async def refresh(self):
+        """
+        Extend the member and holder entries of every local user and
+        remove expired ones.
+
+        Users re-added here (after a failed flush or a racing leave on
+        another instance) are published as joins, expired users as leaves.
+        """
+        members = self.get_members()
+        if not members:
+            return
+
+        now = time.time()
+        pipe = redis_client.redis.pipeline(transaction=False)
+        operations: list[tuple[str, str | None]] = []
+        for tenant_id, user_ids in members.items():
+            key = get_presence_key(tenant_id)
+            holders = get_presence_holders_key(tenant_id)
+            for user_id in user_ids:
+                pipe.zadd(key, {user_id: now + self.ttl})
+                pipe.zadd(holders, {self._holder(user_id, self.instance_id): now + self.ttl})
+                operations.extend([(tenant_id, user_id), (tenant_id, None)])
+            pipe.expire(holders, self.ttl)
+            pipe.zremrangebyscore(holders, "-inf", now)
+            pipe.expire(key, self.ttl)
+            pipe.zrangebyscore(key, "-inf", now)
+            operations.extend([(tenant_id, None)] * 4)
+        results = await pipe.execute()
+
+        diffs: dict[str, dict[str, list[str]]] = {}
+        expired: list[tuple[str, str]] = []
+        for (tenant_id, user_id), result in zip(operations, results, strict=False):
+            if user_id is not None:
+                if result:
+                    diffs.setdefault(tenant_id, {"joined": [], "left": []})["joined"].append(
+                        user_id
+                    )
+            elif isinstance(result, list):
+                expired.extend(
+                    (tenant_id, m.decode() if isinstance(m, bytes) else m) for m in result
+                )
+
+        if expired:
+            # Per-member ZREM so concurrent pruning on several instances counts each leave once
+            pipe = redis_client.redis.pipeline(transaction=False)
+            for tenant_id, user_id in expired:
+                pipe.zrem(get_presence_key(tenant_id), user_id)
+            removed = await pipe.execute()
+            for (tenant_id, user_id), changed in zip(expired, removed, strict=False):
+                if changed:
+                    diffs.setdefault(tenant_id, {"joined": [], "left": []})["left"].append(user_id)
+
+        await self._publish(diffs)
+
+    async def _publish(self, diffs: dict[str, dict[str, list[str]]]):
+        """Bump the version of each changed tenant and publish its diff."""
+        if not diffs:
+            return
+
+        tenants = list(diffs)
+        pipe = redis_client.redis.pipeline(transaction=False)
+        for tenant_id in tenants:
+            pipe.incr(get_presence_version_key(tenant_id))
+        versions = await pipe.execute()
+
+        pipe = redis_client.redis.pipeline(transaction=False)
+        for tenant_id, version in zip(tenants, versions, strict=False):
+            diff = diffs[tenant_id]
+            frame = WSMessage(
+                type=WSMessageType.PRESENCE,
+                payload={"tenant_id": tenant_id, **diff, "version": version},
+            ).encode()
+            pipe.publish(get_presence_channel(tenant_id), frame)
+
+            self.total_joins += len(diff["joined"])
+            self.total_leaves += len(diff["left"])
+            presence_changes.inc("join", amount=len(diff["joined"]))
+            presence_changes.inc("leave", amount=len(diff["left"]))
+        await pipe.execute()
+        self.total_diffs_published += len(tenants)
+
+    async def snapshot(self, tenant_id: str) -> dict:
+        """
+        Read a tenant's online users together with the presence version.
+
+        Args:
+            tenant_id: Tenant identifier
+
+        Returns:
+            Dictionary with tenant_id, users and version; diffs with a higher
+            version apply on top of it
+        """
+        pipe = redis_client.redis.pipeline(transaction=True)
+        pipe.zrangebyscore(get_presence_key(tenant_id), time.time(), "+inf")
+        pipe.get(get_presence_version_key(tenant_id))
+        members, version = await pipe.execute()
+
+        return {
+            "tenant_id": tenant_id,
+            "users": sorted(m.decode() if isinstance(m, bytes) else m for m in members),
+            "version": int(version or 0),
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Get presence tracker statistics.
+
+        Returns:
+            Dictionary with pending transitions, flush and diff counters
+        """
+        return {
+            "pending": sum(len(changes) for changes in self._pending.values()),
+            "total_flushes": self.total_flushes,
+            "total_joins": self.total_joins,
+            "total_leaves": self.total_leaves,
+            "total_diffs_published": self.total_diffs_published,
+        }
@@ -4,8 +4,13 @@ Handles message broadcasting across WebSocket server instances.
 """
 
 import asyncio
+import contextlib
+import hashlib
 import logging
-from collections.abc import Callable
+import random
+import time
+from collections.abc import Awaitable, Callable
+from enum import Enum
 from typing import Any
 
 import orjson
@@ -13,24 +18,292 @@ import redis.asyncio as aioredis
 from redis.asyncio.client import PubSub
 
 from app.config import get_settings
+from app.utils.metrics import pubsub_dispatch_seconds, pubsub_messages, redis_publish_duration
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Seconds the listener waits for a message before checking its connection
+_LISTEN_POLL_TIMEOUT = 1.0
+
+
+class ListenerState(str, Enum):
+    """Pub/sub listener lifecycle."""
+
+    IDLE = "idle"
+    LISTENING = "listening"
+    RECONNECTING = "reconnecting"
+
+
+def shard_for(channel: str, shards: int) -> int:
+    """
+    Map a channel to a pub/sub shard with jump consistent hashing.
+
+    The mapping depends only on the channel name and the shard count, so it
+    is stable across restarts, and growing the pool from N to N+1 shards
+    moves only about 1/(N+1) of the channels.
+
+    Args:
+        channel: Channel name
+        shards: Number of shards
+
+    Returns:
+        Shard index in ``range(shards)``
+    """
+    key = int.from_bytes(hashlib.blake2b(channel.encode(), digest_size=8).digest(), "big")
+    bucket, jump = -1, 0
+    while jump < shards:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+class PubSubShard:
+    """
+    One pub/sub connection with its own reader task.
+
+    A shard reads, decodes and dispatches the messages of the channels
+    hashed to it, so a handler that is busy on one shard does not hold up
+    the others, while all messages of one channel keep their order. The
+    reader supervises itself: when the connection fails it backs off
+    exponentially (with jitter), opens a new pub/sub connection and
+    resubscribes to the shard's channels before resuming. Messages
+    published while it was down are not recovered here; clients catch up
+    through the event log.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        *,
+        create_pubsub: Callable[[], PubSub],
+        dispatch: Callable[[dict], Awaitable[None]],
+    ):
+        self.index = index
+        self.label = str(index)
+        self.create_pubsub = create_pubsub
+        self.dispatch = dispatch
+
+        self.pubsub: PubSub | None = None
+        self.channels: set[str] = set()
+        self._task: asyncio.Task | None = None
+        self._is_listening = False
+        self.state = ListenerState.IDLE
+        # time.monotonic() of the last pub/sub message delivered to a handler
+        self.last_message_at: float | None = None
+
+        # Statistics
+        self.total_messages = 0
+        self.total_errors = 0
+        self.total_reconnects = 0
+
+    async def subscribe(self, channel: str):
+        """Subscribe the shard's connection to a channel, starting the reader if needed."""
+        if self.pubsub is None:
+            self.pubsub = self.create_pubsub()
+        await self.pubsub.subscribe(channel)
+        self.channels.add(channel)
+        self.start()
+
+    async def unsubscribe(self, channel: str):
+        """Unsubscribe the shard's connection from a channel."""
+        # Forget the channel first so a reconnect never restores it
+        self.channels.discard(channel)
+        await self.pubsub.unsubscribe(channel)
+
+    def start(self):
+        """Start the reader task."""
+        if self._is_listening:
+            return
+
+        self._is_listening = True
+        self._task = asyncio.create_task(self._listen())
+        logger.info(f"Started Redis pub/sub listener shard {self.index}")
+
+    async def stop(self):
+        """Stop the reader task and close the connection."""
+        self._is_listening = False
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+        self.state = ListenerState.IDLE
+
+        if self.pubsub:
+            try:
+                await self.pubsub.unsubscribe()
+                await self.pubsub.aclose()
+            except Exception as e:
+                logger.error(f"Error closing Redis listener shard {self.index}: {e!s}")
+
+    async def _listen(self):
+        """Read until stopped, reconnecting after failures."""
+        delay = settings.redis_pubsub_reconnect_initial_delay
+
+        while self._is_listening:
+            try:
+                if self.state == ListenerState.RECONNECTING:
+                    await self._resubscribe()
+                    self.total_reconnects += 1
+                    delay = settings.redis_pubsub_reconnect_initial_delay
+                    logger.info(
+                        f"Redis listener shard {self.index} reconnected, restored "
+                        f"{len(self.channels)} channels"
+                    )
+
+                self.state = ListenerState.LISTENING
+                await self._read_messages()
+
+            except asyncio.CancelledError:
+                logger.info(f"Redis listener shard {self.index} cancelled")
+                return
+            except Exception as e:
+                self.state = ListenerState.RECONNECTING
+                self.total_errors += 1
+                backoff = random.uniform(delay / 2, delay)
+                logger.error(
+                    f"Error in Redis listener shard {self.index}: {e!s}; "
+                    f"reconnecting in {backoff:.1f}s"
+                )
+                await asyncio.sleep(backoff)
+                delay = min(delay * 2, settings.redis_pubsub_reconnect_max_delay)
+
+    async def _read_messages(self):
+        """
+        Read and dispatch pub/sub messages until the connection fails.
+
+        After ``redis_pubsub_ping_interval`` seconds without any traffic the
+        pub/sub connection is pinged; if the PONG does not arrive within
+        another interval the connection is treated as dead, which catches
+        half-open sockets that never raise on their own.
+
+        Raises:
+            ConnectionError: If the connection stops answering pings
+        """
+        ping_interval = settings.redis_pubsub_ping_interval
+        last_read = time.monotonic()
+        ping_sent: float | None = None
+
+        while self._is_listening:
+            if self.pubsub is None or self.pubsub.connection is None:
+                # Nothing subscribed yet, so there is no connection to read from
+                await asyncio.sleep(_LISTEN_POLL_TIMEOUT)
+                last_read = time.monotonic()
+                continue
+
+            message = await self.pubsub.get_message(timeout=_LISTEN_POLL_TIMEOUT)
+            now = time.monotonic()
+
+            if message is None:
+                if ping_interval > 0 and now - last_read >= ping_interval:
+                    if ping_sent is None:
+                        await self.pubsub.ping()
+                        ping_sent = now
+                    elif now - ping_sent >= ping_interval:
+                        raise ConnectionError("Redis pub/sub connection stopped answering pings")
+                continue
+
+            last_read = now
+            ping_sent = None
+
+            if message["type"] == "message":
+                self.last_message_at = now
+                self.total_messages += 1
+                await self.dispatch(message)
+                pubsub_messages.inc(self.label)
+                pubsub_dispatch_seconds.inc(self.label, amount=time.monotonic() - now)
+
+    async def _resubscribe(self):
+        """Replace the pub/sub connection and restore the shard's channels."""
+        stale = self.pubsub
+        self.pubsub = self.create_pubsub()
+        if stale:
+            with contextlib.suppress(Exception):
+                await stale.aclose()
+
+        channels = list(self.channels)
+        if channels:
+            await self.pubsub.subscribe(*channels)
+
+    def get_stats(self) -> dict:
+        """
+        Get shard statistics.
+
+        Returns:
+            Dictionary with state, channel count, and message and failure counters
+        """
+        return {
+            "shard": self.index,
+            "state": self.state.value,
+            "channels": len(self.channels),
+            "total_messages": self.total_messages,
+            "total_errors": self.total_errors,
+            "total_reconnects": self.total_reconnects,
+        }
+
 
 class RedisClient:
     """
     Redis client for pub/sub and caching operations.
     Manages connections and provides fanout messaging for WebSocket instances.
+
+    Channel subscriptions are spread over ``redis_pubsub_shards`` pub/sub
+    connections by consistent hashing (see ``shard_for``), each read by its
+    own task.
     """
 
-    def __init__(self):
+    def __init__(self, shards: int | None = None):
         self.redis: aioredis.Redis | None = None
-        self.pubsub: PubSub | None = None
+        self.shards = [
+            PubSubShard(index, create_pubsub=self._create_pubsub, dispatch=self._dispatch)
+            for index in range(max(1, shards or settings.redis_pubsub_shards))
+        ]
         self.subscribed_channels: set[str] = set()
         self.message_handlers: dict[str, Callable] = {}
-        self._listener_task: asyncio.Task | None = None
-        self._is_listening = False
+        # Channels whose handlers receive the raw published bytes
+        self.raw_channels: set[str] = set()
+
+        # Reference-counted subscriptions: {channel: holders}
+        self._channel_refs: dict[str, int] = {}
+        # Delayed UNSUBSCRIBE tasks for channels whose last holder released them
+        self._pending_unsubscribes: dict[str, asyncio.Task] = {}
+        # SUBSCRIBEs still in flight, resolved once they land or fail
+        self._subscribing: dict[str, asyncio.Future] = {}
+
+        # Subscription churn statistics
+        self.total_subscribes = 0
+        self.total_unsubscribes = 0
+        self.total_unsubscribes_avoided = 0
+
+    @property
+    def total_listener_errors(self) -> int:
+        """Listener failures across shards."""
+        return sum(shard.total_errors for shard in self.shards)
+
+    @property
+    def total_reconnects(self) -> int:
+        """Listener reconnects across shards."""
+        return sum(shard.total_reconnects for shard in self.shards)
+
+    def _create_pubsub(self) -> PubSub:
+        """Open a pub/sub connection for a shard."""
+        return self.redis.pubsub()
+
+    def shard(self, channel: str) -> PubSubShard:
+        """
+        Get the shard that owns a channel.
+
+        Args:
+            channel: Channel name
+
+        Returns:
+            Pub/sub shard
+        """
+        if len(self.shards) == 1:
+            return self.shards[0]
+        return self.shards[shard_for(channel, len(self.shards))]
 
     async def connect(self):
         """Establish connection to Redis."""
@@ -44,10 +317,10 @@ class RedisClient:
 
             # Test connection
             await self.redis.ping()
-            logger.info(f"Connected to Redis at {settings.redis_host}:{settings.redis_port}")
-
-            # Initialize pubsub
-            self.pubsub = self.redis.pubsub()
+            logger.info(
+                f"Connected to Redis at {settings.redis_host}:{settings.redis_port} "
+                f"({len(self.shards)} pub/sub shards)"
+            )
 
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e!s}")
@@ -56,18 +329,17 @@ class RedisClient:
     async def disconnect(self):
         """Close Redis connection and cleanup."""
         try:
-            self._is_listening = False
-
-            if self._listener_task and not self._listener_task.done():
-                self._listener_task.cancel()
-                import contextlib
-
-                with contextlib.suppress(asyncio.CancelledError):
-                    await self._listener_task
-
-            if self.pubsub:
-                await self.pubsub.unsubscribe()
-                await self.pubsub.close()
+            for task in self._pending_unsubscribes.values():
+                task.cancel()
+            self._pending_unsubscribes.clear()
+            for in_flight in self._subscribing.values():
+                if not in_flight.done():
+                    in_flight.set_result(None)
+            self._subscribing.clear()
+            self._channel_refs.clear()
+
+            for shard in self.shards:
+                await shard.stop()
 
             if self.redis:
                 await self.redis.close()
@@ -88,12 +360,24 @@ class RedisClient:
         Returns:
             Number of subscribers that received the message
         """
-        try:
-            # Serialize message with orjson for performance
-            serialized = orjson.dumps(message)
+        # Serialize message with orjson for performance
+        return await self.publish_raw(channel, orjson.dumps(message))
 
-            # Publish to channel
-            subscribers = await self.redis.publish(channel, serialized)
+    async def publish_raw(self, channel: str, data: bytes) -> int:
+        """
+        Publish already-serialized bytes to Redis channel.
+
+        Args:
+            channel: Channel name
+            data: Serialized message bytes
+
+        Returns:
+            Number of subscribers that received the message
+        """
+        try:
+            started = time.perf_counter()
+            subscribers = await self.redis.publish(channel, data)
+            redis_publish_duration.observe(time.perf_counter() - started, "publish")
 
             logger.debug(f"Published to channel '{channel}': {subscribers} subscribers")
             return subscribers
@@ -102,13 +386,42 @@ class RedisClient:
             logger.error(f"Failed to publish to channel '{channel}': {e!s}")
             raise
 
-    async def subscribe(self, channel: str, handler: Callable):
+    async def publish_many(self, messages: list[tuple[str, bytes]]) -> list[int]:
+        """
+        Publish several already-serialized messages in a single pipeline round trip.
+
+        Args:
+            messages: List of (channel, serialized bytes) pairs
+
+        Returns:
+            Number of subscribers that received each message, in order
+        """
+        if not messages:
+            return []
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for channel, data in messages:
+                pipe.publish(channel, data)
+            started = time.perf_counter()
+            results = await pipe.execute()
+            redis_publish_duration.observe(time.perf_counter() - started, "pipeline")
+
+            logger.debug(f"Published {len(messages)} messages in one pipeline")
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to publish {len(messages)} pipelined messages: {e!s}")
+            raise
+
+    async def subscribe(self, channel: str, handler: Callable, raw: bool = False):
         """
         Subscribe to Redis channel with a message handler.
 
         Args:
             channel: Channel name to subscribe to
             handler: Async function to handle incoming messages
+            raw: Pass the published bytes to the handler without decoding
         """
         try:
             if channel in self.subscribed_channels:
@@ -117,16 +430,16 @@ class RedisClient:
 
             # Store handler
             self.message_handlers[channel] = handler
+            if raw:
+                self.raw_channels.add(channel)
 
-            # Subscribe to channel
-            await self.pubsub.subscribe(channel)
+            # Subscribe on the shard that owns the channel
+            shard = self.shard(channel)
+            await shard.subscribe(channel)
             self.subscribed_channels.add(channel)
+            self.total_subscribes += 1
 
-            logger.info(f"Subscribed to Redis channel: {channel}")
-
-            # Start listener if not running
-            if not self._is_listening:
-                await self._start_listener()
+            logger.info(f"Subscribed to Redis channel: {channel} (shard {shard.index})")
 
         except Exception as e:
             logger.error(f"Failed to subscribe to channel '{channel}': {e!s}")
@@ -144,9 +457,13 @@ class RedisClient:
                 logger.warning(f"Not subscribed to channel '{channel}'")
                 return
 
-            await self.pubsub.unsubscribe(channel)
+            # Forget the channel first so a listener reconnect never restores it
             self.subscribed_channels.discard(channel)
             self.message_handlers.pop(channel, None)
+            self.raw_channels.discard(channel)
+            self.total_unsubscribes += 1
+
+            await self.shard(channel).unsubscribe(channel)
 
             logger.info(f"Unsubscribed from Redis channel: {channel}")
 
@@ -154,52 +471,188 @@ class RedisClient:
             logger.error(f"Failed to unsubscribe from channel '{channel}': {e!s}")
             raise
 
-    async def _start_listener(self):
-        """Start background task to listen for pub/sub messages."""
-        if self._is_listening:
+    async def acquire(self, channel: str, handler: Callable, raw: bool = False):
+        """
+        Take a reference on a channel, subscribing on the first one.
+
+        A channel released within the grace period is still subscribed, so
+        re-acquiring it cancels the pending UNSUBSCRIBE instead of paying
+        another round trip. Callers arriving while the SUBSCRIBE is in flight
+        wait for it, and subscribe themselves if it failed.
+
+        Args:
+            channel: Channel name to subscribe to
+            handler: Async function to handle incoming messages
+            raw: Pass the published bytes to the handler without decoding
+        """
+        self._channel_refs[channel] = self._channel_refs.get(channel, 0) + 1
+
+        pending = self._pending_unsubscribes.pop(channel, None)
+        if pending:
+            pending.cancel()
+            self.total_unsubscribes_avoided += 1
+
+        try:
+            while channel not in self.subscribed_channels:
+                if channel not in self._subscribing:
+                    await self._subscribe_tracked(channel, handler, raw)
+                    break
+                # Another holder's SUBSCRIBE is in flight; retry here if it failed
+                await self._wait_for_subscribe(channel)
+        except Exception:
+            self._release_ref(channel)
+            raise
+
+    async def _subscribe_tracked(self, channel: str, handler: Callable, raw: bool):
+        """Subscribe to a channel, letting concurrent callers wait for the outcome."""
+        in_flight = self._subscribing[channel] = asyncio.get_running_loop().create_future()
+        try:
+            await self.subscribe(channel, handler, raw=raw)
+        finally:
+            self._subscribing.pop(channel, None)
+            if not in_flight.done():
+                in_flight.set_result(None)
+
+    async def release(self, channel: str):
+        """
+        Drop a reference on a channel. The last release schedules an
+        UNSUBSCRIBE after ``redis_unsubscribe_grace_period`` seconds.
+
+        Args:
+            channel: Channel name to release
+        """
+        if not self._release_ref(channel) or channel in self._pending_unsubscribes:
             return
 
-        self._is_listening = True
-        self._listener_task = asyncio.create_task(self._listen_for_messages())
-        logger.info("Started Redis pub/sub listener")
+        grace = settings.redis_unsubscribe_grace_period
+        if grace <= 0:
+            # An UNSUBSCRIBE sent ahead of an in-flight SUBSCRIBE would be undone by it
+            await self._wait_for_subscribe(channel)
+            if not self._channel_refs.get(channel):
+                await self.unsubscribe(channel)
+            return
+
+        self._pending_unsubscribes[channel] = asyncio.create_task(
+            self._unsubscribe_after(channel, grace)
+        )
 
-    async def _listen_for_messages(self):
+    def _release_ref(self, channel: str) -> bool:
         """
-        Background task that listens for pub/sub messages.
-        Routes messages to registered handlers.
+        Decrement a channel's reference count.
+
+        Returns:
+            True if the last reference was released
         """
+        refs = self._channel_refs.get(channel, 0) - 1
+        if refs > 0:
+            self._channel_refs[channel] = refs
+            return False
+
+        self._channel_refs.pop(channel, None)
+        return refs == 0
+
+    async def _wait_for_subscribe(self, channel: str):
+        """Wait until an in-flight SUBSCRIBE to a channel has landed or failed."""
+        in_flight = self._subscribing.get(channel)
+        if in_flight is not None:
+            await asyncio.shield(in_flight)
+
+    async def _unsubscribe_after(self, channel: str, delay: float):
+        """Unsubscribe from a channel unless it is re-acquired within the delay."""
+        await asyncio.sleep(delay)
+        await self._wait_for_subscribe(channel)
+        self._pending_unsubscribes.pop(channel, None)
+
+        if self._channel_refs.get(channel):
+            return
+
         try:
-            async for message in self.pubsub.listen():
-                if message["type"] == "message":
-                    channel = (
-                        message["channel"].decode()
-                        if isinstance(message["channel"], bytes)
-                        else message["channel"]
-                    )
-                    data = message["data"]
-
-                    # Deserialize message
-                    try:
-                        if isinstance(data, bytes):
-                            decoded_message = orjson.loads(data)
-                        else:
-                            decoded_message = data
-
-                        # Route to handler
-                        handler = self.message_handlers.get(channel)
-                        if handler:
-                            await handler(channel, decoded_message)
-                        else:
-                            logger.warning(f"No handler for channel '{channel}'")
-
-                    except Exception as e:
-                        logger.error(f"Error processing message from '{channel}': {e!s}")
-
-        except asyncio.CancelledError:
-            logger.info("Redis listener task cancelled")
+            await self.unsubscribe(channel)
         except Exception as e:
-            logger.error(f"Error in Redis listener: {e!s}")
-            self._is_listening = False
+            logger.error(f"Deferred unsubscribe from '{channel}' failed: {e!s}")
+
+    def get_subscription_stats(self) -> dict:
+        """
+        Get pub/sub subscription statistics.
+
+        Returns:
+            Dictionary with channel counts and subscribe churn counters
+        """
+        return {
+            "subscribed_channels": len(self.subscribed_channels),
+            "referenced_channels": len(self._channel_refs),
+            "pending_unsubscribes": len(self._pending_unsubscribes),
+            "total_subscribes": self.total_subscribes,
+            "total_unsubscribes": self.total_unsubscribes,
+            "total_unsubscribes_avoided": self.total_unsubscribes_avoided,
+        }
+
+    async def _dispatch(self, message: dict):
+        """
+        Route one pub/sub message to its channel handler.
+
+        Args:
+            message: Message dict returned by the pub/sub connection
+        """
+        channel = (
+            message["channel"].decode()
+            if isinstance(message["channel"], bytes)
+            else message["channel"]
+        )
+        data = message["data"]
+
+        # Deserialize message
+        try:
+            if channel in self.raw_channels:
+                decoded_message = data
+            elif isinstance(data, bytes):
+                decoded_message = orjson.loads(data)
+            else:
+                decoded_message = data
+
+            # Route to handler
+            handler = self.message_handlers.get(channel)
+            if handler:
+                await handler(channel, decoded_message)
+            else:
+                logger.warning(f"No handler for channel '{channel}'")
+
+        except Exception as e:
+            logger.error(f"Error processing message from '{channel}': {e!s}")
+
+    def get_listener_stats(self) -> dict:
+        """
+        Get pub/sub listener health.
+
+        Returns:
+            Dictionary with the overall listener state (reconnecting while any
+            shard is), seconds since the last message on any shard (None
+            before the first one), failure counters and per-shard stats
+        """
+        states = {shard.state for shard in self.shards}
+        if ListenerState.RECONNECTING in states:
+            state = ListenerState.RECONNECTING
+        elif ListenerState.LISTENING in states:
+            state = ListenerState.LISTENING
+        else:
+            state = ListenerState.IDLE
+
+        age = None
+        last_message_at = max(
+            (shard.last_message_at for shard in self.shards if shard.last_message_at is not None),
+            default=None,
+        )
+        if last_message_at is not None:
+            age = round(time.monotonic() - last_message_at, 3)
+
+        return {
+            "state": state.value,
+            "healthy": state != ListenerState.RECONNECTING,
+            "last_message_age_seconds": age,
+            "total_listener_errors": self.total_listener_errors,
+            "total_reconnects": self.total_reconnects,
+            "shards": [shard.get_stats() for shard in self.shards],
+        }
 
     async def get(self, key: str) -> Any | None:
         """
@@ -310,6 +763,183 @@ def get_user_channel(user_id: str) -> str:
     return f"user:{user_id}"
 
 
+def get_room_channel(room_id: str) -> str:
+    """
+    Generate Redis channel name for a room.
+
+    Args:
+        room_id: Room identifier (e.g., "lesson:123")
+
+    Returns:
+        Redis channel name
+    """
+    return f"room:{room_id}"
+
+
+def get_instance_channel(instance_id: str) -> str:
+    """
+    Generate Redis channel name for a specific service instance.
+    Used to route messages only to the instances that need them.
+
+    Args:
+        instance_id: Service instance identifier
+
+    Returns:
+        Redis channel name
+    """
+    return f"instance:{instance_id}"
+
+
+def get_user_route_key(user_id: str) -> str:
+    """
+    Generate Redis key of the sorted set listing the instances that
+    currently hold connections for a user.
+
+    Args:
+        user_id: User identifier
+
+    Returns:
+        Redis key name
+    """
+    return f"route:{get_user_channel(user_id)}"
+
+
+def tag_origin(instance_id: str, data: bytes) -> bytes:
+    """
+    Prefix a published frame with the ID of the instance that published it.
+    JSON frames never start with ``@``, so tagged and untagged payloads can
+    share a channel.
+
+    Args:
+        instance_id: Publishing instance ID
+        data: Serialized message bytes
+
+    Returns:
+        ``@{instance_id}\\n`` followed by the frame
+    """
+    return b"@" + instance_id.encode() + b"\n" + data
+
+
+def split_origin(data: bytes) -> tuple[str | None, bytes]:
+    """
+    Split the origin tag added by ``tag_origin`` off a published frame.
+
+    Args:
+        data: Published bytes, tagged or not
+
+    Returns:
+        Tuple of (origin instance ID or None, frame)
+    """
+    if data[:1] != b"@":
+        return None, data
+    origin, _, frame = data[1:].partition(b"\n")
+    return origin.decode(), frame
+
+
+def get_presence_channel(tenant_id: str) -> str:
+    """
+    Generate Redis channel name carrying a tenant's presence diffs.
+
+    Args:
+        tenant_id: Tenant identifier
+
+    Returns:
+        Redis channel name
+    """
+    return f"presence:{tenant_id}"
+
+
+def get_presence_key(tenant_id: str) -> str:
+    """
+    Generate Redis key of the sorted set of a tenant's online users.
+
+    Args:
+        tenant_id: Tenant identifier
+
+    Returns:
+        Redis key name
+    """
+    return f"presence:users:{tenant_id}"
+
+
+def get_presence_holders_key(tenant_id: str) -> str:
+    """
+    Generate Redis key of the sorted set of instances holding a tenant's users.
+
+    Members are ``{user_id}@{instance_id}`` scored by entry expiry.
+
+    Args:
+        tenant_id: Tenant identifier
+
+    Returns:
+        Redis key name
+    """
+    return f"presence:holders:{tenant_id}"
+
+
+def get_presence_version_key(tenant_id: str) -> str:
+    """
+    Generate Redis key of the counter versioning a tenant's presence set.
+
+    Args:
+        tenant_id: Tenant identifier
+
+    Returns:
+        Redis key name
+    """
+    return f"presence:version:{tenant_id}"
+
+
+def get_stream_key(channel: str) -> str:
+    """
+    Generate Redis key of the event stream that mirrors a channel.
+
+    Args:
+        channel: Tenant or user channel name
+
+    Returns:
+        Redis key name
+    """
+    return f"stream:{channel}"
+
+
+def get_webhook_delivery_key(provider: str, delivery_id: str) -> str:
+    """
+    Generate Redis key marking a webhook delivery as already accepted.
+
+    Args:
+        provider: Webhook provider
+        delivery_id: Provider delivery ID
+
+    Returns:
+        Redis key name
+    """
+    return f"webhook:delivery:{provider}:{delivery_id}"
+
+
+def get_cluster_stats_key() -> str:
+    """
+    Generate Redis key of the sorted set indexing instances by last stats heartbeat.
+
+    Returns:
+        Redis key name
+    """
+    return "stats:instances:reported"
+
+
+def get_instance_stats_key(instance_id: str) -> str:
+    """
+    Generate Redis key holding one instance's stats heartbeat.
+
+    Args:
+        instance_id: Instance identifier
+
+    Returns:
+        Redis key name
+    """
+    return f"stats:instance:{instance_id}"
+
+
 def get_global_channel() -> str:
     """
     Generate Redis channel name for global broadcasts.
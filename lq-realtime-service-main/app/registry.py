@@ -0,0 +1,85 @@
+"""
+Connection registry module.
+Compact per-connection records held by the connection manager.
+"""
+
+import time
+from datetime import datetime
+from typing import Any
+
+from fastapi import WebSocket
+
+from app.encoding import Encoding
+from app.outbound import OutboundQueue
+from app.schemas import WSConnectionInfo
+
+
+class ConnectionRecord:
+    """
+    State of one local WebSocket connection.
+
+    A slotted record replaces the socket, metadata, queue and room entries
+    that used to live in separate per-connection dicts. Timestamps are plain
+    floats: ``connected_at`` is wall-clock (for display) and ``last_seen`` is
+    ``time.monotonic()`` of the last inbound message, written once per
+    message instead of on every send.
+    """
+
+    __slots__ = (
+        "connected_at",
+        "connection_id",
+        "encoding",
+        "heartbeat_slot",
+        "last_seen",
+        "metadata",
+        "queue",
+        "rooms",
+        "tenant_id",
+        "user_id",
+        "websocket",
+    )
+
+    def __init__(
+        self,
+        connection_id: str,
+        user_id: str,
+        tenant_id: str,
+        websocket: WebSocket,
+        metadata: dict[str, Any] | None = None,
+        *,
+        encoding: Encoding = Encoding.JSON,
+    ):
+        self.connection_id = connection_id
+        self.user_id = user_id
+        self.tenant_id = tenant_id
+        self.websocket = websocket
+        self.encoding = encoding
+        self.queue: OutboundQueue | None = None
+        # Created on the first room join; most connections never join one
+        self.rooms: set[str] | None = None
+        # None rather than an empty dict per connection
+        self.metadata = metadata or None
+        self.connected_at = time.time()
+        self.last_seen = time.monotonic()
+        self.heartbeat_slot = -1
+
+    def touch(self):
+        """Record inbound traffic."""
+        self.last_seen = time.monotonic()
+
+    def to_info(self) -> WSConnectionInfo:
+        """
+        Build the API representation of this connection.
+
+        Returns:
+            WSConnectionInfo with wall-clock timestamps
+        """
+        idle = time.monotonic() - self.last_seen
+        return WSConnectionInfo(
+            user_id=self.user_id,
+            tenant_id=self.tenant_id,
+            connection_id=self.connection_id,
+            connected_at=datetime.utcfromtimestamp(self.connected_at),
+            last_activity=datetime.utcfromtimestamp(time.time() - idle),
+            metadata=self.metadata or {},
+        )
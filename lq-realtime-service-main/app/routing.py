@@ -0,0 +1,151 @@
+"""
+User routing module.
+Tracks which service instances hold WebSocket connections for each user so
+user-targeted messages are published only to those instances.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Callable, Iterable
+
+from app.redis_client import get_user_route_key, redis_client
+
+logger = logging.getLogger(__name__)
+
+# Users refreshed per Redis pipeline round trip
+REFRESH_BATCH_SIZE = 500
+
+
+class UserRouteTable:
+    """
+    Redis-backed user -> instance routing table.
+
+    Each user has a sorted set of instance IDs scored by the time the entry
+    expires. Instances refresh their entries periodically, so a crashed
+    instance drops out of the table once its scores fall behind the clock.
+    """
+
+    def __init__(self, instance_id: str, ttl: int):
+        self.instance_id = instance_id
+        self.ttl = max(3, ttl)
+        self._refresh_task: asyncio.Task | None = None
+
+    async def register(self, user_id: str):
+        """
+        Record that this instance holds connections for a user.
+
+        Args:
+            user_id: User identifier
+        """
+        try:
+            pipe = redis_client.redis.pipeline(transaction=False)
+            self._add_route(pipe, user_id, time.time())
+            await pipe.execute()
+        except Exception as e:
+            # The periodic refresh restores the entry once Redis is reachable
+            logger.error(f"Failed to register route for user {user_id}: {e!s}")
+
+    async def unregister(self, user_id: str):
+        """
+        Remove this instance from a user's routing entry.
+
+        Args:
+            user_id: User identifier
+        """
+        try:
+            await redis_client.redis.zrem(get_user_route_key(user_id), self.instance_id)
+        except Exception as e:
+            logger.error(f"Failed to unregister route for user {user_id}: {e!s}")
+
+    async def get_instances(self, user_id: str) -> list[str]:
+        """
+        Get the instances currently holding connections for a user.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            List of instance IDs with a live routing entry
+        """
+        members = await redis_client.redis.zrangebyscore(
+            get_user_route_key(user_id), time.time(), "+inf"
+        )
+        return [m.decode() if isinstance(m, bytes) else m for m in members]
+
+    async def get_instances_many(self, user_ids: Iterable[str]) -> dict[str, list[str]]:
+        """
+        Get the live instances for several users in one pipeline round trip.
+
+        Args:
+            user_ids: User identifiers
+
+        Returns:
+            Dictionary mapping each user ID to its instance IDs
+        """
+        users = list(dict.fromkeys(user_ids))
+        if not users:
+            return {}
+
+        now = time.time()
+        pipe = redis_client.redis.pipeline(transaction=False)
+        for user_id in users:
+            pipe.zrangebyscore(get_user_route_key(user_id), now, "+inf")
+        results = await pipe.execute()
+
+        return {
+            user_id: [m.decode() if isinstance(m, bytes) else m for m in members]
+            for user_id, members in zip(users, results, strict=True)
+        }
+
+    async def refresh(self, user_ids: Iterable[str]):
+        """
+        Extend this instance's routing entries for all given users.
+
+        Args:
+            user_ids: Users with at least one local connection
+        """
+        now = time.time()
+        batch = list(user_ids)
+
+        for start in range(0, len(batch), REFRESH_BATCH_SIZE):
+            pipe = redis_client.redis.pipeline(transaction=False)
+            for user_id in batch[start : start + REFRESH_BATCH_SIZE]:
+                self._add_route(pipe, user_id, now)
+                # Drop entries left behind by instances that stopped refreshing
+                pipe.zremrangebyscore(get_user_route_key(user_id), "-inf", now)
+            await pipe.execute()
+
+    def _add_route(self, pipe, user_id: str, now: float):
+        """Queue the commands that (re)register this instance for a user."""
+        key = get_user_route_key(user_id)
+        pipe.zadd(key, {self.instance_id: now + self.ttl})
+        pipe.expire(key, self.ttl)
+
+    def start(self, get_user_ids: Callable[[], Iterable[str]]):
+        """
+        Start the background refresh task.
+
+        Args:
+            get_user_ids: Returns the users currently connected to this instance
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop(get_user_ids))
+
+    async def stop(self):
+        """Stop the background refresh task."""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._refresh_task
+
+    async def _refresh_loop(self, get_user_ids: Callable[[], Iterable[str]]):
+        """Refresh routing entries well before they expire."""
+        interval = self.ttl / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(list(get_user_ids()))
+            except Exception as e:
+                logger.error(f"Failed to refresh user routes: {e!s}")
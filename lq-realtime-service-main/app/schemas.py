@@ -6,7 +6,8 @@ from datetime import datetime
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, Field
+import orjson
+from pydantic import BaseModel, Field, field_validator
 
 # ==================== JWT Schemas ====================
 
@@ -36,6 +37,10 @@ class WSMessageType(str, Enum):
     NOTIFICATION = "notification"
     ERROR = "error"
     SYSTEM = "system"
+    SUBSCRIBE = "subscribe"
+    UNSUBSCRIBE = "unsubscribe"
+    BATCH = "batch"
+    PRESENCE = "presence"
 
 
 class WSMessage(BaseModel):
@@ -47,10 +52,20 @@ class WSMessage(BaseModel):
     message_id: str | None = Field(None, description="Unique message identifier")
     from_user: str | None = Field(None, description="Sender user ID")
     to_user: str | None = Field(None, description="Target user ID")
+    event_id: str | None = Field(None, description="Event log ID for replay on reconnect")
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
 
+    def encode(self) -> bytes:
+        """
+        Serialize the message into the JSON frame sent to clients.
+
+        Returns:
+            UTF-8 encoded JSON bytes
+        """
+        return orjson.dumps(self.model_dump())
+
 
 class WSConnectionInfo(BaseModel):
     """WebSocket connection information."""
@@ -119,6 +134,12 @@ class HealthCheckResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Check timestamp")
     redis_connected: bool = Field(..., description="Redis connection status")
     active_connections: int = Field(..., description="Number of active WebSocket connections")
+    pubsub_listener: str = Field(
+        default="idle", description="Pub/sub listener state: idle, listening or reconnecting"
+    )
+    pubsub_last_message_age_seconds: float | None = Field(
+        default=None, description="Seconds since the last pub/sub message was received"
+    )
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
@@ -132,6 +153,16 @@ class MetricsResponse(BaseModel):
     total_messages_received: int
     total_webhooks_processed: int
     redis_pubsub_channels: int
+    outbound_queue_depth: int = 0
+    outbound_queue_max_depth: int = 0
+    total_dropped_frames: int = 0
+    total_slow_consumer_evictions: int = 0
+    active_rooms: int = 0
+    total_idle_reaped: int = 0
+    redis_subscribes_total: int = 0
+    redis_unsubscribes_total: int = 0
+    redis_unsubscribes_avoided: int = 0
+    redis_pubsub_shards: list[dict[str, Any]] = []
     uptime_seconds: float
     memory_usage_mb: float
 
@@ -171,6 +202,99 @@ class GlobalBroadcastRequest(BaseModel):
         json_encoders = {datetime: lambda v: v.isoformat()}
 
 
+class MessageTarget(str, Enum):
+    """Recipient scopes for targeted messages."""
+
+    USER = "user"
+    TENANT = "tenant"
+    ROOM = "room"
+
+
+# Message types the backend may publish to clients; the rest are protocol frames
+DATA_MESSAGE_TYPES = frozenset(
+    {
+        WSMessageType.MESSAGE,
+        WSMessageType.BROADCAST,
+        WSMessageType.NOTIFICATION,
+        WSMessageType.SYSTEM,
+    }
+)
+
+
+class SendMessageRequest(BaseModel):
+    """Request schema for sending a message to a user, tenant or room."""
+
+    message_type: WSMessageType = Field(
+        default=WSMessageType.NOTIFICATION,
+        description="Type of message to send",
+    )
+    payload: dict[str, Any] = Field(..., description="Message payload")
+    from_user: str | None = Field(
+        default="backend",
+        description="Sender identifier (defaults to 'backend')",
+    )
+
+    @field_validator("message_type")
+    @classmethod
+    def validate_message_type(cls, v: WSMessageType) -> WSMessageType:
+        """Reject protocol frame types such as ping, subscribe or batch."""
+        if v not in DATA_MESSAGE_TYPES:
+            allowed = ", ".join(sorted(t.value for t in DATA_MESSAGE_TYPES))
+            raise ValueError(f"message_type must be one of: {allowed}")
+        return v
+
+
+class SendMessageResponse(BaseModel):
+    """Response schema for targeted message endpoints."""
+
+    success: bool = Field(..., description="Whether the message was sent successfully")
+    message: str = Field(..., description="Status message")
+    subscribers_reached: int = Field(
+        ..., description="Number of Redis subscribers that received the message"
+    )
+    local_connections: int = Field(
+        default=0, description="Number of connections on this instance that were targeted"
+    )
+    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Send timestamp")
+
+    class Config:
+        json_encoders = {datetime: lambda v: v.isoformat()}
+
+
+class BatchMessageItem(SendMessageRequest):
+    """A single targeted message inside a batch request."""
+
+    target: MessageTarget = Field(..., description="Recipient scope")
+    target_id: str = Field(..., min_length=1, description="User, tenant or room ID")
+
+
+class BatchMessageRequest(BaseModel):
+    """Request schema for sending many targeted messages at once."""
+
+    messages: list[BatchMessageItem] = Field(
+        ..., min_length=1, description="Messages to publish in a single pipeline"
+    )
+
+
+class BatchMessageResponse(BaseModel):
+    """Response schema for batch message endpoint."""
+
+    success: bool = Field(..., description="Whether the batch was sent successfully")
+    message: str = Field(..., description="Status message")
+    messages_accepted: int = Field(..., description="Number of messages in the batch")
+    channels_published: int = Field(..., description="Number of Redis publishes issued")
+    subscribers_reached: int = Field(
+        ..., description="Total Redis subscribers that received the messages"
+    )
+    local_connections: int = Field(
+        default=0, description="Number of connections on this instance that were targeted"
+    )
+    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Send timestamp")
+
+    class Config:
+        json_encoders = {datetime: lambda v: v.isoformat()}
+
+
 class GlobalBroadcastResponse(BaseModel):
     """Response schema for global broadcast."""
 
@@ -183,3 +307,80 @@ class GlobalBroadcastResponse(BaseModel):
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
+
+
+class DrainResponse(BaseModel):
+    """Response schema for the drain endpoint."""
+
+    success: bool = Field(..., description="Whether this request started the drain")
+    message: str = Field(..., description="Status message")
+    connections: int = Field(..., description="Connections open when the drain was requested")
+    window_seconds: float = Field(..., description="Seconds over which connections are closed")
+
+
+class InstanceStats(BaseModel):
+    """Latest stats heartbeat of one service instance."""
+
+    instance_id: str = Field(..., description="Service instance ID")
+    active_connections: int = Field(..., description="Open WebSocket connections")
+    unique_users: int = Field(0, description="Users with at least one connection")
+    unique_tenants: int = Field(0, description="Tenants with at least one connection")
+    outbound_queue_depth: int = Field(0, description="Frames waiting in outbound queues")
+    outbound_queue_max_depth: int = Field(0, description="Deepest single outbound queue")
+    send_rate: float = Field(0.0, description="Messages delivered per second")
+    receive_rate: float = Field(0.0, description="Messages received per second")
+    draining: bool = Field(False, description="Whether the instance is draining")
+    reported_at: datetime = Field(..., description="When the heartbeat was written")
+    age_seconds: float = Field(..., description="Seconds since the heartbeat was written")
+
+
+class ClusterStatsResponse(BaseModel):
+    """Response schema for cluster-wide connection statistics."""
+
+    total_instances: int = Field(..., description="Instances with a live heartbeat")
+    total_connections: int = Field(..., description="Open connections across instances")
+    total_tenants: int = Field(..., description="Tenants with at least one connection")
+    outbound_queue_depth: int = Field(..., description="Frames waiting across instances")
+    send_rate: float = Field(..., description="Messages delivered per second across instances")
+    receive_rate: float = Field(..., description="Messages received per second across instances")
+    stale_instances_removed: int = Field(
+        ..., description="Expired heartbeats dropped by this request"
+    )
+    instances: list[InstanceStats] = Field(
+        default_factory=list, description="Busiest instance first"
+    )
+    tenants: dict[str, int] = Field(
+        default_factory=dict, description="Connections per tenant, busiest first"
+    )
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class PresenceSnapshotResponse(BaseModel):
+    """Response schema for a tenant's presence snapshot."""
+
+    tenant_id: str = Field(..., description="Tenant identifier")
+    users: list[str] = Field(default_factory=list, description="Online user IDs")
+    version: int = Field(..., description="Presence version; later diffs have higher versions")
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class DeadLetterEntry(BaseModel):
+    """A webhook delivery that exhausted its retries."""
+
+    id: str = Field(..., description="Dead-letter stream entry ID")
+    provider: str = Field(..., description="Webhook provider")
+    tenant_id: str | None = Field(None, description="Target tenant ID")
+    event_type: str | None = Field(None, description="Provider event type")
+    delivery_id: str | None = Field(None, description="Provider delivery ID")
+    attempts: int = Field(..., description="Delivery attempts made")
+    error: str = Field(..., description="Error of the last attempt")
+    received_at: datetime | None = Field(None, description="When the webhook was accepted")
+    failed_at: datetime | None = Field(None, description="When the delivery was dead-lettered")
+    body: str = Field(..., description="Raw webhook body")
+
+
+class DeadLetterResponse(BaseModel):
+    """Response schema for the webhook dead-letter inspection endpoint."""
+
+    count: int = Field(..., description="Number of entries returned")
+    entries: list[DeadLetterEntry] = Field(default_factory=list, description="Newest first")
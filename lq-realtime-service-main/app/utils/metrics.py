@@ -2,21 +2,275 @@
 Metrics and monitoring utilities.
 """
 
+import asyncio
+import contextlib
 import logging
+import math
 import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
 from datetime import datetime
 
 import psutil
 
+from app.config import get_settings
+
 logger = logging.getLogger(__name__)
 
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
-class MetricsCollector:
-    """Collects application metrics."""
+# Latency buckets in seconds, from sub-millisecond Redis calls to slow fanouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Sample produced by a collector: (name, type, help, [(labels, value), ...])
+MetricFamily = tuple[str, str, str, list[tuple[dict[str, str], float]]]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a Prometheus label set."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels.
+
+    Label values are passed positionally in the order of ``labelnames``;
+    each combination is a plain dict entry, so ``inc`` costs one lookup.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """
+        Increment the counter.
+
+        Args:
+            labels: Label values
+            amount: Non-negative increment
+        """
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Current value for a label combination."""
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        """Render the counter's samples."""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets and optional labels.
+
+    Observations are stored as non-cumulative bucket counts and only summed
+    into cumulative ``_bucket`` samples when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value (seconds for latency histograms)
+            labels: Label values
+        """
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        """Number of observations for a label combination."""
+        series = self._values.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> list[str]:
+        """Render the histogram's bucket, sum and count samples."""
+        lines = []
+        for labels, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, observed in zip((*self.buckets, math.inf), series[:-1], strict=True):
+                cumulative += observed
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {_format_value(cumulative)}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds instruments and collectors and renders them in the Prometheus
+    text exposition format.
+
+    Collectors are callables invoked at scrape time that return metric
+    families computed from existing statistics (gauges and totals that
+    components already keep), so those values cost nothing between scrapes.
+    """
 
     def __init__(self):
+        self._instruments: list[Counter | Histogram] = []
+        self._collectors: list[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        instrument = Counter(name, documentation, labelnames)
+        self._instruments.append(instrument)
+        return instrument
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram."""
+        instrument = Histogram(name, documentation, labelnames, buckets)
+        self._instruments.append(instrument)
+        return instrument
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        """
+        Register a scrape-time collector.
+
+        Args:
+            collector: Callable returning (name, type, help, samples) tuples
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render every metric.
+
+        Returns:
+            Prometheus text exposition
+        """
+        lines: list[str] = []
+        for instrument in self._instruments:
+            lines.append(f"# HELP {instrument.name} {instrument.documentation}")
+            lines.append(f"# TYPE {instrument.name} {instrument.type}")
+            lines.extend(instrument.render())
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+                continue
+
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsCollector:
+    """
+    Collects application metrics.
+
+    Process statistics are refreshed by a background task every
+    ``sample_interval`` seconds and served from the cached values, so
+    reading them never blocks the event loop.
+    """
+
+    def __init__(self, sample_interval: float = 5.0):
         self.start_time = time.time()
         self.process = psutil.Process()
+        self.sample_interval = sample_interval
+
+        self._task: asyncio.Task | None = None
+        self.memory_usage_mb = 0.0
+        self.cpu_percent = 0.0
+        self.open_fds = 0
+        self.last_sampled_at = 0.0
+
+    def sample(self):
+        """
+        Refresh the cached process statistics.
+
+        CPU usage is measured since the previous sample
+        (``cpu_percent(interval=None)``), which never sleeps.
+        """
+        try:
+            self.memory_usage_mb = self.process.memory_info().rss / 1024 / 1024
+            self.cpu_percent = self.process.cpu_percent(interval=None)
+            with contextlib.suppress(AttributeError, psutil.Error):
+                self.open_fds = self.process.num_fds()
+            self.last_sampled_at = time.time()
+        except Exception as e:
+            logger.error(f"Error sampling process metrics: {e}")
+
+    def start(self):
+        """Start the background sampling task."""
+        if self._task is None or self._task.done():
+            # The first cpu_percent() call only sets the baseline
+            self.sample()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background sampling task."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _run(self):
+        """Sample process statistics periodically."""
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            self.sample()
 
     def get_uptime(self) -> float:
         """
@@ -29,30 +283,21 @@ class MetricsCollector:
 
     def get_memory_usage(self) -> float:
         """
-        Get current memory usage in MB.
+        Get memory usage in MB as of the last sample.
 
         Returns:
             Memory usage in megabytes
         """
-        try:
-            memory_info = self.process.memory_info()
-            return memory_info.rss / 1024 / 1024  # Convert to MB
-        except Exception as e:
-            logger.error(f"Error getting memory usage: {e}")
-            return 0.0
+        return self.memory_usage_mb
 
     def get_cpu_percent(self) -> float:
         """
-        Get current CPU usage percentage.
+        Get CPU usage percentage over the last sampling interval.
 
         Returns:
             CPU usage percentage
         """
-        try:
-            return self.process.cpu_percent(interval=0.1)
-        except Exception as e:
-            logger.error(f"Error getting CPU usage: {e}")
-            return 0.0
+        return self.cpu_percent
 
     def get_metrics(self) -> dict:
         """
@@ -68,6 +313,109 @@ class MetricsCollector:
             "timestamp": datetime.utcnow().isoformat(),
         }
 
+    def collect(self) -> list[MetricFamily]:
+        """
+        Process metric families for the registry.
+
+        Returns:
+            Uptime, resident memory, CPU and open file descriptor gauges
+        """
+        return [
+            (
+                "process_uptime_seconds",
+                "gauge",
+                "Seconds since the process started",
+                [({}, self.get_uptime())],
+            ),
+            (
+                "process_resident_memory_bytes",
+                "gauge",
+                "Resident memory size in bytes",
+                [({}, self.memory_usage_mb * 1024 * 1024)],
+            ),
+            (
+                "process_cpu_percent",
+                "gauge",
+                "CPU usage over the last sampling interval",
+                [({}, self.cpu_percent)],
+            ),
+            ("process_open_fds", "gauge", "Number of open file descriptors", [({}, self.open_fds)]),
+        ]
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Compute a percentile using the nearest-rank method.
+
+    Args:
+        values: Sample values (need not be sorted)
+        pct: Percentile in the range 0-100
+
+    Returns:
+        Percentile value, or 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# Global metrics registry and instruments
+registry = MetricsRegistry()
+
+connections_opened = registry.counter(
+    "realtime_connections_opened_total", "WebSocket connections accepted"
+)
+connections_closed = registry.counter(
+    "realtime_connections_closed_total", "WebSocket connections closed", ["code"]
+)
+messages_received = registry.counter(
+    "realtime_messages_received_total", "Messages received from WebSocket clients", ["type"]
+)
+messages_published = registry.counter(
+    "realtime_messages_published_total", "Messages published for delivery", ["target", "type"]
+)
+send_failures = registry.counter(
+    "realtime_send_failures_total", "Frames that could not be delivered to a socket", ["reason"]
+)
+handshakes_rejected = registry.counter(
+    "realtime_handshakes_rejected_total", "WebSocket handshakes turned away", ["reason"]
+)
+token_verifications = registry.counter(
+    "realtime_token_verifications_total", "WebSocket token checks by outcome", ["result"]
+)
+frames_encoded = registry.counter(
+    "realtime_frames_encoded_total", "Frames serialized per wire encoding", ["encoding"]
+)
+encoded_bytes = registry.counter(
+    "realtime_encoded_bytes_total", "Bytes produced by frame serialization", ["encoding"]
+)
+frames_coalesced = registry.counter(
+    "realtime_frames_coalesced_total", "Messages delivered inside batch frames"
+)
+pubsub_messages = registry.counter(
+    "realtime_pubsub_messages_total", "Pub/sub messages dispatched per listener shard", ["shard"]
+)
+pubsub_dispatch_seconds = registry.counter(
+    "realtime_pubsub_dispatch_seconds_total",
+    "Seconds each listener shard spent decoding and dispatching messages",
+    ["shard"],
+)
+presence_changes = registry.counter(
+    "realtime_presence_changes_total", "Presence joins and leaves published", ["change"]
+)
+webhook_deliveries = registry.counter(
+    "realtime_webhook_deliveries_total", "Webhook deliveries by queue outcome", ["result"]
+)
+fanout_duration = registry.histogram(
+    "realtime_fanout_duration_seconds", "Time to deliver one message to all local recipients"
+)
+redis_publish_duration = registry.histogram(
+    "realtime_redis_publish_duration_seconds", "Redis publish round trip time", ["operation"]
+)
 
 # Global metrics collector
-metrics_collector = MetricsCollector()
+metrics_collector = MetricsCollector(get_settings().metrics_sample_interval)
+registry.register_collector(metrics_collector.collect)
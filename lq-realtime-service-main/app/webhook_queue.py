@@ -0,0 +1,322 @@
+"""
+Webhook queue module.
+Durable webhook ingestion: accepted deliveries are appended to a Redis Stream
+and published by a consumer group with bounded retries and dead-lettering.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from redis.exceptions import ResponseError
+
+from app.redis_client import get_webhook_delivery_key, redis_client
+from app.utils.metrics import webhook_deliveries
+
+logger = logging.getLogger(__name__)
+
+# Stream of accepted deliveries waiting to be published
+WEBHOOK_STREAM = "webhooks:ingest"
+
+# Stream of deliveries that exhausted their retries
+DEAD_LETTER_STREAM = "webhooks:dead-letter"
+
+# Consumer group shared by every instance
+CONSUMER_GROUP = "webhook-publishers"
+
+# Entries read or reclaimed per round trip
+_READ_COUNT = 32
+
+# Milliseconds a read waits for new entries before checking for retries
+_READ_BLOCK_MS = 1000
+
+
+def _decode(value) -> str:
+    """Decode a Redis reply value to str."""
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class WebhookQueue:
+    """
+    Redis Streams ingest queue for webhook deliveries.
+
+    The webhook handler appends the raw body and returns as soon as the
+    entry is stored, so its latency does not depend on how long publishing
+    takes. Every instance reads the stream through one consumer group; an
+    entry is acknowledged and deleted once ``process`` succeeds. A failed
+    entry stays pending and is reclaimed (by any instance, which also covers
+    crashed consumers) after ``retry_delay`` seconds; after ``max_retries``
+    retries it is moved to the dead-letter stream. Deliveries carrying a
+    provider delivery ID are deduplicated at ingest for ``dedupe_ttl``
+    seconds, so provider retries of an accepted delivery are not queued twice.
+    Delivery is at least once.
+    """
+
+    def __init__(
+        self,
+        *,
+        process: Callable[[dict[str, bytes]], Awaitable[None]],
+        consumer: str,
+        max_retries: int,
+        retry_delay: float,
+        timeout: float,
+        dedupe_ttl: int,
+        dead_letter_maxlen: int,
+    ):
+        self.process = process
+        self.consumer = consumer
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = max(0.0, retry_delay)
+        self.timeout = timeout
+        self.dedupe_ttl = dedupe_ttl
+        self.dead_letter_maxlen = max(1, dead_letter_maxlen)
+
+        self._task: asyncio.Task | None = None
+        self._group_ready = False
+
+        # Statistics
+        self.total_enqueued = 0
+        self.total_duplicates = 0
+        self.total_published = 0
+        self.total_retries = 0
+        self.total_dead_lettered = 0
+
+    async def enqueue(
+        self, provider: str, body: bytes, fields: dict[str, str], delivery_id: str | None = None
+    ) -> bool:
+        """
+        Store an accepted delivery for publishing.
+
+        Args:
+            provider: Webhook provider
+            body: Raw request body
+            fields: Extra string fields stored with the entry (tenant_id, event_type, ...)
+            delivery_id: Provider delivery ID used for deduplication, if any
+
+        Returns:
+            True if the delivery was queued, False if it is a duplicate
+
+        Raises:
+            Exception: If Redis could not store the delivery
+        """
+        redis = redis_client.redis
+        dedupe_key = None
+
+        if delivery_id and self.dedupe_ttl > 0:
+            dedupe_key = get_webhook_delivery_key(provider, delivery_id)
+            if not await redis.set(dedupe_key, b"1", nx=True, ex=self.dedupe_ttl):
+                self.total_duplicates += 1
+                webhook_deliveries.inc("duplicate")
+                return False
+
+        entry = {
+            "provider": provider,
+            "body": body,
+            "delivery_id": delivery_id or "",
+            "received_at": str(time.time()),
+            **fields,
+        }
+        try:
+            await redis.xadd(WEBHOOK_STREAM, entry)
+        except Exception:
+            # Let the provider's retry through instead of treating it as a duplicate
+            if dedupe_key:
+                with contextlib.suppress(Exception):
+                    await redis.delete(dedupe_key)
+            raise
+
+        self.total_enqueued += 1
+        webhook_deliveries.inc("enqueued")
+        return True
+
+    def start(self):
+        """Start the background consumer task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background consumer task.
+        Unacknowledged entries are reclaimed by another instance.
+        """
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _ensure_group(self):
+        """Create the stream and consumer group if they do not exist yet."""
+        try:
+            await redis_client.redis.xgroup_create(
+                WEBHOOK_STREAM, CONSUMER_GROUP, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def _run(self):
+        """Consume the stream until stopped, backing off after errors."""
+        while True:
+            try:
+                if not self._group_ready:
+                    await self._ensure_group()
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook consumer error: {e!s}")
+                # The group may be gone (e.g. Redis was flushed); recreate it
+                self._group_ready = False
+                await asyncio.sleep(max(1.0, self.retry_delay))
+
+    async def run_once(self) -> int:
+        """
+        Retry the pending entries that are due, then read new entries.
+
+        Returns:
+            Number of entries handled
+        """
+        handled = await self._retry_pending()
+
+        reply = await redis_client.redis.xreadgroup(
+            CONSUMER_GROUP,
+            self.consumer,
+            {WEBHOOK_STREAM: ">"},
+            count=_READ_COUNT,
+            block=_READ_BLOCK_MS,
+        )
+        for _, entries in reply or ():
+            for entry_id, fields in entries:
+                await self._handle(entry_id, fields, attempt=1)
+                handled += 1
+
+        return handled
+
+    async def _retry_pending(self) -> int:
+        """
+        Reclaim entries that failed (or whose consumer died) at least
+        ``retry_delay`` seconds ago and process them again.
+
+        Returns:
+            Number of entries handled
+        """
+        redis = redis_client.redis
+        min_idle = int(self.retry_delay * 1000)
+
+        pending = await redis.xpending_range(
+            WEBHOOK_STREAM, CONSUMER_GROUP, min="-", max="+", count=_READ_COUNT, idle=min_idle
+        )
+        if not pending:
+            return 0
+
+        deliveries = {item["message_id"]: item["times_delivered"] for item in pending}
+        claimed = await redis.xclaim(
+            WEBHOOK_STREAM, CONSUMER_GROUP, self.consumer, min_idle, list(deliveries)
+        )
+
+        for entry_id, fields in claimed:
+            if not fields:
+                # Deleted while pending; nothing left to deliver
+                await self._ack(entry_id)
+                continue
+            self.total_retries += 1
+            webhook_deliveries.inc("retried")
+            await self._handle(entry_id, fields, attempt=deliveries.get(entry_id, 1) + 1)
+
+        return len(claimed)
+
+    async def _handle(self, entry_id: bytes, fields: dict[bytes, bytes], attempt: int):
+        """
+        Process one entry; acknowledge it, leave it pending for a retry, or
+        dead-letter it once retries are exhausted.
+
+        Args:
+            entry_id: Stream entry ID
+            fields: Entry fields
+            attempt: 1 for the first delivery, incremented on each retry
+        """
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self.process({_decode(key): value for key, value in fields.items()})
+        except Exception as e:
+            if attempt > self.max_retries:
+                await self._dead_letter(entry_id, fields, attempt, e)
+            else:
+                logger.warning(
+                    f"Webhook {_decode(entry_id)} failed (attempt {attempt}), "
+                    f"retrying in {self.retry_delay:.0f}s: {e!s}"
+                )
+            return
+
+        await self._ack(entry_id)
+        self.total_published += 1
+        webhook_deliveries.inc("published")
+
+    async def _ack(self, entry_id: bytes):
+        """Acknowledge and delete a finished entry."""
+        pipe = redis_client.redis.pipeline(transaction=False)
+        pipe.xack(WEBHOOK_STREAM, CONSUMER_GROUP, entry_id)
+        pipe.xdel(WEBHOOK_STREAM, entry_id)
+        await pipe.execute()
+
+    async def _dead_letter(
+        self, entry_id: bytes, fields: dict[bytes, bytes], attempts: int, error: Exception
+    ):
+        """Move an entry that exhausted its retries to the dead-letter stream."""
+        logger.error(
+            f"Webhook {_decode(entry_id)} failed after {attempts} attempts, dead-lettering: "
+            f"{error!s}"
+        )
+        entry = {
+            **fields,
+            b"entry_id": entry_id,
+            b"attempts": str(attempts),
+            b"error": str(error)[:500] or type(error).__name__,
+            b"failed_at": str(time.time()),
+        }
+
+        pipe = redis_client.redis.pipeline(transaction=True)
+        pipe.xadd(DEAD_LETTER_STREAM, entry, maxlen=self.dead_letter_maxlen, approximate=True)
+        pipe.xack(WEBHOOK_STREAM, CONSUMER_GROUP, entry_id)
+        pipe.xdel(WEBHOOK_STREAM, entry_id)
+        await pipe.execute()
+
+        self.total_dead_lettered += 1
+        webhook_deliveries.inc("dead_lettered")
+
+    async def dead_letters(self, count: int) -> list[tuple[str, dict[str, str]]]:
+        """
+        Read the most recent dead-lettered deliveries.
+
+        Args:
+            count: Maximum number of entries
+
+        Returns:
+            List of (dead-letter entry ID, fields) pairs, newest first
+        """
+        rows = await redis_client.redis.xrevrange(DEAD_LETTER_STREAM, count=count)
+        return [
+            (
+                _decode(entry_id),
+                {_decode(key): value.decode(errors="replace") for key, value in fields.items()},
+            )
+            for entry_id, fields in rows or ()
+        ]
+
+    def get_stats(self) -> dict:
+        """
+        Get webhook queue statistics.
+
+        Returns:
+            Dictionary with ingest, publish, retry and dead-letter counters
+        """
+        return {
+            "total_enqueued": self.total_enqueued,
+            "total_duplicates": self.total_duplicates,
+            "total_published": self.total_published,
+            "total_retries": self.total_retries,
+            "total_dead_lettered": self.total_dead_lettered,
+        }
@@ -4,14 +4,17 @@ Receives, validates, and processes webhooks from external providers.
 """
 
 import asyncio
+import contextlib
+import hmac
 import logging
 from datetime import datetime
 
-from fastapi import BackgroundTasks, Header, HTTPException, Request, status
+import orjson
+from fastapi import Header, HTTPException, Request, status
 
-from app.auth import verify_webhook_signature
+from app.auth import check_webhook_signature, webhook_signer
 from app.config import get_settings
-from app.redis_client import get_tenant_channel, redis_client
+from app.redis_client import RedisClient, redis_client
 from app.schemas import (
     WebhookEvent,
     WebhookProvider,
@@ -19,43 +22,183 @@ from app.schemas import (
     WSMessage,
     WSMessageType,
 )
+from app.webhook_queue import WebhookQueue
+from app.websocket_handler import connection_manager
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Redis hash of webhook registrations: {"{provider}:{tenant_id}": registration JSON}
+REGISTRY_KEY = "webhook:registrations"
+
+# Channel announcing the hash field of a changed registration
+REGISTRY_CHANNEL = "webhook:registrations:changed"
+
 
 class WebhookRegistry:
     """
     Registry for managing webhook configurations.
-    In production, this should be backed by a database.
+
+    Registrations are stored in a Redis hash shared by every instance, with
+    a full copy cached in a local dict so lookups on the webhook path never
+    leave the process. Writers update the hash and publish the changed field
+    on an invalidation channel; every instance then re-reads just that
+    field. A periodic full reload repairs the cache if an invalidation was
+    missed (e.g. while the pub/sub listener was reconnecting). Other
+    services can register webhooks the same way: ``HSET`` the JSON
+    registration under ``{provider}:{tenant_id}`` and ``PUBLISH`` that field.
     """
 
-    def __init__(self):
-        # In-memory registry: {provider: {tenant_id: WebhookRegistration}}
+    def __init__(
+        self,
+        client: RedisClient | None = None,
+        *,
+        key: str = REGISTRY_KEY,
+        channel: str = REGISTRY_CHANNEL,
+        refresh_interval: float = 60.0,
+    ):
+        self.client = client
+        self.key = key
+        self.channel = channel
+        self.refresh_interval = refresh_interval
+
+        # Local cache: {provider: {tenant_id: WebhookRegistration}}
         self._registrations: dict[str, dict[str, WebhookRegistration]] = {}
         self._processing_stats = {"total_processed": 0, "total_failed": 0}
+        self._refresh_task: asyncio.Task | None = None
+        self.total_invalidations = 0
+
+    @property
+    def redis_client(self) -> RedisClient:
+        """Redis client holding the registrations (the shared one by default)."""
+        return self.client or redis_client
+
+    @staticmethod
+    def _field(provider: str, tenant_id: str) -> str:
+        """Hash field of a registration."""
+        return f"{provider}:{tenant_id}"
+
+    async def start(self):
+        """
+        Load every registration and follow changes made by other instances.
+        """
+        try:
+            await self.load()
+        except Exception as e:
+            # The periodic reload retries; webhooks are accepted unverified meanwhile
+            logger.error(f"Failed to load webhook registrations: {e!s}")
+
+        await self.redis_client.subscribe(self.channel, self._handle_invalidation, raw=True)
+
+        if self.refresh_interval > 0 and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        """Stop the periodic reload."""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._refresh_task
+
+    async def load(self):
+        """Replace the local cache with every registration stored in Redis."""
+        stored = await self.redis_client.redis.hgetall(self.key)
+
+        registrations: dict[str, dict[str, WebhookRegistration]] = {}
+        for value in stored.values():
+            try:
+                registration = WebhookRegistration.model_validate_json(value)
+            except Exception as e:
+                logger.error(f"Skipping invalid webhook registration: {e!s}")
+                continue
+            registrations.setdefault(registration.provider.value, {})[registration.tenant_id] = (
+                registration
+            )
+
+        self._registrations = registrations
+
+    async def _refresh(self):
+        """Reload the cache periodically."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Failed to reload webhook registrations: {e!s}")
+
+    async def _handle_invalidation(self, channel: str, message: bytes):
+        """
+        Re-read one registration after another instance changed it.
+
+        Args:
+            channel: Invalidation channel
+            message: Changed hash field ("{provider}:{tenant_id}")
+        """
+        field = message.decode()
+        provider, _, tenant_id = field.partition(":")
+        self.total_invalidations += 1
+
+        try:
+            value = await self.redis_client.redis.hget(self.key, field)
+        except Exception as e:
+            logger.error(f"Failed to refresh webhook registration {field}: {e!s}")
+            return
+
+        if value is None:
+            self._registrations.get(provider, {}).pop(tenant_id, None)
+        else:
+            self._cache(WebhookRegistration.model_validate_json(value))
+
+    def _cache(self, registration: WebhookRegistration):
+        """Store a registration in the local cache."""
+        self._registrations.setdefault(registration.provider.value, {})[registration.tenant_id] = (
+            registration
+        )
 
-    def register(self, registration: WebhookRegistration):
+    async def register(self, registration: WebhookRegistration):
         """
-        Register a webhook configuration.
+        Register a webhook configuration for every instance.
 
         Args:
             registration: Webhook registration details
         """
         provider = registration.provider.value
+        field = self._field(provider, registration.tenant_id)
 
-        if provider not in self._registrations:
-            self._registrations[provider] = {}
-
-        self._registrations[provider][registration.tenant_id] = registration
+        redis = self.redis_client.redis
+        await redis.hset(self.key, field, registration.model_dump_json())
+        await redis.publish(self.channel, field)
+        self._cache(registration)
 
         logger.info(f"Webhook registered: provider={provider}, tenant={registration.tenant_id}")
 
+    async def unregister(self, provider: WebhookProvider, tenant_id: str) -> bool:
+        """
+        Remove a webhook configuration from every instance.
+
+        Args:
+            provider: Webhook provider
+            tenant_id: Tenant ID
+
+        Returns:
+            True if a registration was removed
+        """
+        field = self._field(provider.value, tenant_id)
+
+        redis = self.redis_client.redis
+        removed = await redis.hdel(self.key, field)
+        await redis.publish(self.channel, field)
+        self._registrations.get(provider.value, {}).pop(tenant_id, None)
+
+        logger.info(f"Webhook unregistered: provider={provider.value}, tenant={tenant_id}")
+        return bool(removed)
+
     def get_registration(
         self, provider: WebhookProvider, tenant_id: str
     ) -> WebhookRegistration | None:
         """
         Get webhook registration for a provider and tenant.
+        Served from the local cache.
 
         Args:
             provider: Webhook provider
@@ -71,6 +214,7 @@ class WebhookRegistry:
         """Get webhook processing statistics."""
         return {
             "registered_webhooks": sum(len(tenants) for tenants in self._registrations.values()),
+            "total_invalidations": self.total_invalidations,
             **self._processing_stats,
         }
 
@@ -84,14 +228,28 @@ class WebhookRegistry:
 
 
 # Global webhook registry
-webhook_registry = WebhookRegistry()
+webhook_registry = WebhookRegistry(refresh_interval=settings.webhook_registry_refresh_interval)
 
 
 class WebhookProcessor:
     """Processes incoming webhooks and publishes events."""
 
-    def __init__(self):
-        self.retry_queue: asyncio.Queue = asyncio.Queue()
+    async def process_delivery(self, fields: dict[str, bytes]):
+        """
+        Publish a delivery read from the webhook queue.
+
+        Args:
+            fields: Queue entry fields (provider, body, tenant_id, event_type, ...)
+
+        Raises:
+            Exception: If publishing failed and the delivery should be retried
+        """
+        await self.process_webhook(
+            provider=WebhookProvider(fields["provider"].decode()),
+            event_type=fields.get("event_type", b"unknown").decode(),
+            payload=orjson.loads(fields["body"]),
+            tenant_id=fields.get("tenant_id", b"").decode() or None,
+        )
 
     async def process_webhook(
         self,
@@ -135,8 +293,7 @@ class WebhookProcessor:
             ws_message = self._webhook_to_ws_message(webhook_event)
 
             # Publish to tenant channel
-            channel = get_tenant_channel(tenant_id)
-            await redis_client.publish(channel, ws_message.model_dump())
+            await connection_manager.broadcast_to_tenant(tenant_id, ws_message)
 
             # Update statistics
             webhook_registry.increment_processed()
@@ -213,38 +370,107 @@ class WebhookProcessor:
 # Global webhook processor
 webhook_processor = WebhookProcessor()
 
+# Global durable ingest queue, published by the webhook processor
+webhook_queue = WebhookQueue(
+    process=webhook_processor.process_delivery,
+    consumer=settings.instance_id,
+    max_retries=settings.webhook_max_retries,
+    retry_delay=settings.webhook_retry_delay,
+    timeout=settings.webhook_timeout,
+    dedupe_ttl=settings.webhook_dedupe_ttl,
+    dead_letter_maxlen=settings.webhook_dead_letter_maxlen,
+)
+
+
+async def read_webhook_body(
+    request: Request, max_size: int, signer: hmac.HMAC | None = None
+) -> bytes:
+    """
+    Read a webhook body from the request stream with a size limit.
+
+    A declared Content-Length above the limit is refused before anything is
+    read; otherwise chunks are counted as they arrive, so an oversized or
+    chunked body is cut off at the limit instead of being buffered whole.
+
+    Args:
+        request: FastAPI request object
+        max_size: Maximum body size in bytes
+        signer: HMAC fed with each chunk as it arrives, if the signing
+            secret is already known
+
+    Returns:
+        Raw body
+
+    Raises:
+        HTTPException: 413 if the body is larger than ``max_size``
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Webhook body exceeds {max_size} bytes",
+    )
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise too_large
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_size:
+            raise too_large
+        if signer is not None:
+            signer.update(chunk)
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+def _requires_signature(registration: WebhookRegistration | None, signature: str | None) -> bool:
+    """Whether a delivery's signature must be checked against its registration."""
+    return bool(registration and registration.enabled and signature and registration.secret)
+
 
 async def handle_webhook(
     provider: WebhookProvider,
     request: Request,
-    background_tasks: BackgroundTasks,
     x_signature: str | None = Header(None, alias="x-signature"),
     x_tenant_id: str | None = Header(None, alias="x-tenant-id"),
 ):
     """
     Generic webhook handler endpoint.
+    The validated delivery is stored in the webhook queue before responding
+    and published from there, so it survives Redis hiccups and restarts.
 
     Args:
         provider: Webhook provider from path parameter
         request: FastAPI request object
-        background_tasks: FastAPI background tasks
         x_signature: Webhook signature header
         x_tenant_id: Optional tenant ID header
 
     Returns:
-        Success response
+        Success response, with status "duplicate" for a repeated delivery
 
     Raises:
-        HTTPException: If validation fails
+        HTTPException: If validation fails, 413 if the body is too large, or
+            503 if the delivery could not be stored (the provider should retry)
     """
     try:
-        # Read raw body
-        body = await request.body()
-
-        # Parse JSON payload
+        # With the tenant in a header the registration is known before the
+        # body arrives, so the signature is computed while it streams in
+        registration = None
+        signer = None
+        if x_tenant_id:
+            registration = webhook_registry.get_registration(provider, x_tenant_id)
+            if _requires_signature(registration, x_signature):
+                signer = webhook_signer(registration.secret)
+
+        body = await read_webhook_body(request, settings.webhook_max_body_size, signer)
+
+        # Parse JSON payload once; the extractors below share the result
         try:
-            payload = await request.json()
-        except Exception as e:
+            payload = orjson.loads(body)
+        except orjson.JSONDecodeError as e:
             logger.error(f"Invalid JSON payload: {e}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -256,37 +482,45 @@ async def handle_webhook(
 
         # Verify signature if provided and registration exists
         if tenant_id:
-            registration = webhook_registry.get_registration(provider, tenant_id)
-
-            if registration and registration.enabled:
-                if x_signature and registration.secret:
-                    # Verify signature
-                    try:
-                        await verify_webhook_signature(body, x_signature, registration.secret)
-                    except Exception as e:
-                        logger.warning(f"Webhook signature verification failed: {e}")
-                        raise HTTPException(
-                            status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Invalid webhook signature",
-                        ) from e
+            if not x_tenant_id:
+                registration = webhook_registry.get_registration(provider, tenant_id)
+
+            if _requires_signature(registration, x_signature):
+                # Tenant came from the payload: hash the buffered body
+                if signer is None:
+                    signer = webhook_signer(registration.secret)
+                    signer.update(body)
+                try:
+                    check_webhook_signature(signer, x_signature)
+                except Exception as e:
+                    logger.warning(f"Webhook signature verification failed: {e}")
+                    raise HTTPException(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail="Invalid webhook signature",
+                    ) from e
             elif not registration:
                 logger.warning(f"No webhook registration found for {provider.value}/{tenant_id}")
 
         # Extract event type (provider-specific)
         event_type = _extract_event_type(provider, payload)
 
-        # Process webhook asynchronously
-        background_tasks.add_task(
-            webhook_processor.process_webhook,
-            provider=provider,
-            event_type=event_type,
-            payload=payload,
-            signature=x_signature,
-            tenant_id=tenant_id,
-        )
+        # Persist for the queue consumers; only then acknowledge the provider
+        try:
+            queued = await webhook_queue.enqueue(
+                provider.value,
+                body,
+                {"tenant_id": tenant_id or "", "event_type": str(event_type)},
+                _extract_delivery_id(provider, request.headers, payload),
+            )
+        except Exception as e:
+            logger.error(f"Failed to enqueue webhook: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Webhook queue unavailable",
+            ) from e
 
         return {
-            "status": "accepted",
+            "status": "accepted" if queued else "duplicate",
             "provider": provider.value,
             "timestamp": datetime.utcnow().isoformat(),
         }
@@ -327,8 +561,44 @@ def _extract_event_type(provider: WebhookProvider, payload: dict) -> str:
     return payload.get(field, "unknown")
 
 
+def _extract_delivery_id(provider: WebhookProvider, headers, payload: dict) -> str | None:
+    """
+    Extract the provider's delivery ID, used to drop redelivered webhooks.
+    Provider-specific logic.
+
+    Args:
+        provider: Webhook provider
+        headers: Request headers
+        payload: Webhook payload
+
+    Returns:
+        Delivery ID if the provider sends one, None otherwise
+    """
+    # Provider-specific delivery ID headers, then payload fields
+    delivery_headers = {
+        WebhookProvider.GITHUB: "x-github-delivery",
+        WebhookProvider.TWILIO: "i-twilio-idempotency-token",
+    }
+    delivery_fields = {
+        WebhookProvider.STRIPE: "id",
+        WebhookProvider.SLACK: "event_id",
+        WebhookProvider.SENDGRID: "sg_event_id",
+        WebhookProvider.CUSTOM: "event_id",
+    }
+
+    header = delivery_headers.get(provider)
+    delivery_id = headers.get(header) if header else None
+    delivery_id = delivery_id or headers.get("x-delivery-id") or headers.get("idempotency-key")
+
+    field = delivery_fields.get(provider)
+    if not delivery_id and field and isinstance(payload, dict):
+        delivery_id = payload.get(field)
+
+    return str(delivery_id) if delivery_id else None
+
+
 # Convenience function to register webhooks programmatically
-def register_webhook(
+async def register_webhook(
     provider: WebhookProvider,
     tenant_id: str,
     secret: str,
@@ -360,5 +630,5 @@ def register_webhook(
         },
     )
 
-    webhook_registry.register(registration)
+    await webhook_registry.register(registration)
     return registration
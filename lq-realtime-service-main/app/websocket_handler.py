@@ -3,17 +3,54 @@ WebSocket connection handler module.
 Manages WebSocket connections, message routing, and pub/sub integration.
 """
 
+import asyncio
 import logging
 import uuid
 from datetime import datetime
 
 import orjson
-from fastapi import WebSocket, WebSocketDisconnect
+from fastapi import WebSocket
 
+from app.admission import AdmissionController, AdmissionRejected, reject_handshake
 from app.auth import verify_websocket_token
+from app.cluster_stats import ClusterStats
 from app.config import get_settings
-from app.redis_client import get_global_channel, get_tenant_channel, redis_client
-from app.schemas import TokenPayload, WSConnectionInfo, WSMessage, WSMessageType
+from app.drain import DRAIN_CLOSE_CODE, Drainer
+from app.encoding import Frame, decode_inbound, negotiate_encoding, send_encoded
+from app.event_log import EventLog, with_event_id
+from app.fanout import FanoutEngine
+from app.heartbeat import IDLE_CLOSE_CODE, HeartbeatReaper
+from app.outbound import SLOW_CONSUMER_CLOSE_CODE, OutboundQueue, OverflowPolicy
+from app.presence import PresenceTracker
+from app.redis_client import (
+    get_global_channel,
+    get_instance_channel,
+    get_presence_channel,
+    get_room_channel,
+    get_stream_key,
+    get_tenant_channel,
+    get_user_channel,
+    redis_client,
+    split_origin,
+    tag_origin,
+)
+from app.registry import ConnectionRecord
+from app.routing import UserRouteTable
+from app.schemas import (
+    MessageTarget,
+    TokenPayload,
+    WSMessage,
+    WSMessageType,
+)
+from app.utils.metrics import (
+    MetricFamily,
+    connections_closed,
+    connections_opened,
+    messages_published,
+    messages_received,
+    registry,
+    send_failures,
+)
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -26,11 +63,9 @@ class ConnectionManager:
     """
 
     def __init__(self):
-        # Active connections: {connection_id: WebSocket}
-        self.active_connections: dict[str, WebSocket] = {}
-
-        # Connection metadata: {connection_id: WSConnectionInfo}
-        self.connection_info: dict[str, WSConnectionInfo] = {}
+        # Connection registry: {connection_id: ConnectionRecord}
+        # Each record holds the socket, metadata, outbound queue and joined rooms
+        self.active_connections: dict[str, ConnectionRecord] = {}
 
         # User to connections mapping: {user_id: {connection_id1, connection_id2, ...}}
         self.user_connections: dict[str, set] = {}
@@ -38,121 +73,304 @@ class ConnectionManager:
         # Tenant to connections mapping: {tenant_id: {connection_id1, connection_id2, ...}}
         self.tenant_connections: dict[str, set] = {}
 
-        # Subscribed tenant channels
-        self.subscribed_tenants: set = set()
+        # Room to connections mapping: {room_id: {connection_id1, ...}}
+        # Each member holds a reference on the room's Redis channel
+        self.room_connections: dict[str, set] = {}
 
         # Global channel subscription flag
         self.global_channel_subscribed: bool = False
 
+        # Cross-instance routing of user-targeted messages
+        self.user_routes = UserRouteTable(settings.instance_id, settings.ws_user_route_ttl)
+        self.instance_channel_subscribed: bool = False
+
+        # Online users per tenant, shared across instances through Redis
+        self.presence = PresenceTracker(
+            instance_id=settings.instance_id,
+            ttl=settings.ws_presence_ttl,
+            flush_interval=settings.ws_presence_flush_ms / 1000,
+            routes=self.user_routes,
+            get_members=self._presence_members,
+        )
+        # Connections receiving presence diffs: {tenant_id: {connection_id, ...}}
+        # Each tenant entry holds a reference on the tenant's presence channel
+        self.presence_subscribers: dict[str, set] = {}
+
+        # Optional replay log of tenant and user messages
+        self.event_log = EventLog(
+            enabled=settings.ws_event_log_enabled,
+            maxlen=settings.ws_event_log_maxlen,
+            ttl=settings.ws_event_log_ttl,
+            replay_limit=settings.ws_event_log_replay_limit,
+        )
+
+        # Pings quiet connections and reaps dead ones
+        self.heartbeat = HeartbeatReaper(
+            interval=settings.ws_heartbeat_interval,
+            idle_timeout=settings.ws_idle_timeout,
+            tick=settings.ws_heartbeat_tick,
+            send_ping=self._send_heartbeat,
+            reap=lambda connection_id: self.disconnect(
+                connection_id, code=IDLE_CLOSE_CODE, reason="Idle timeout"
+            ),
+        )
+
+        # Early rejection of handshakes over capacity or rate
+        self.admission = AdmissionController(
+            max_connections=settings.ws_max_connections_per_instance,
+            instance_rate=settings.ws_handshake_rate,
+            instance_burst=settings.ws_handshake_burst,
+            tenant_rate=settings.ws_tenant_handshake_rate,
+            tenant_burst=settings.ws_tenant_handshake_burst,
+            retry_after=settings.ws_admission_retry_after,
+            retry_jitter=settings.ws_admission_retry_jitter,
+        )
+
+        # Stats heartbeat merged by /stats/cluster
+        self.cluster_stats = ClusterStats(
+            instance_id=settings.instance_id,
+            interval=settings.cluster_stats_interval,
+            stale_after=settings.cluster_stats_stale_after,
+            snapshot=self.get_instance_snapshot,
+        )
+
+        # Gradual close of every connection before shutdown
+        self.drainer = Drainer(
+            window=settings.ws_drain_window,
+            list_connections=lambda: list(self.active_connections),
+            close=self._drain_connection,
+        )
+
+        # Policy of the outbound queues drained by per-connection writer tasks
+        self.overflow_policy = OverflowPolicy(settings.ws_outbound_overflow_policy)
+
+        # Concurrent delivery to local connections
+        self.fanout_engine = FanoutEngine(
+            concurrency=settings.ws_fanout_concurrency,
+            send_timeout=settings.ws_fanout_send_timeout,
+            yield_every=settings.ws_fanout_yield_every,
+        )
+
         # Statistics
         self.total_messages_sent = 0
+        self.total_socket_writes = 0
         self.total_messages_received = 0
+        self.total_dropped_frames = 0
+        self.total_slow_consumer_evictions = 0
+        self.total_local_deliveries = 0
+        self.total_echoes_skipped = 0
 
-    async def connect(self, websocket: WebSocket, token: str) -> tuple[str, TokenPayload]:
+    async def start(self):
+        """
+        Start instance-level background work.
+        Subscribes to this instance's channel, keeps user routes fresh, runs
+        the heartbeat reaper, flushes presence and reports cluster stats.
+        """
+        if not self.instance_channel_subscribed:
+            channel = get_instance_channel(settings.instance_id)
+            await redis_client.subscribe(channel, self._handle_instance_message, raw=True)
+            self.instance_channel_subscribed = True
+            logger.info(f"Subscribed to instance channel: {channel}")
+
+        self.user_routes.start(lambda: list(self.user_connections.keys()))
+        self.heartbeat.start()
+        if settings.ws_presence_enabled:
+            self.presence.start()
+        self.cluster_stats.start()
+
+    async def stop(self):
+        """Stop instance-level background work."""
+        await self.cluster_stats.stop()
+        await self.heartbeat.stop()
+        await self.presence.stop()
+        await self.user_routes.stop()
+
+    async def connect(
+        self, websocket: WebSocket, token: str, encoding: str | None = None
+    ) -> tuple[str, TokenPayload]:
         """
         Authenticate and register a new WebSocket connection.
 
         Args:
             websocket: FastAPI WebSocket instance
             token: JWT token from query parameters
+            encoding: Requested wire encoding; a supported subprotocol offer
+                takes precedence
 
         Returns:
             Tuple of (connection_id, token_payload)
 
         Raises:
             HTTPException: If authentication fails
+            AdmissionRejected: If admission control turned the handshake away
         """
-        # Verify token
-        token_payload = await verify_websocket_token(token)
+        wire_encoding, subprotocol = negotiate_encoding(
+            websocket.scope.get("subprotocols", ()), encoding
+        )
+
+        try:
+            # Capacity and handshake rate, before any authentication work
+            self.admission.check_instance(
+                len(self.active_connections), draining=self.drainer.draining
+            )
+        except AdmissionRejected as rejection:
+            logger.debug(f"Handshake rejected: {rejection}")
+            await reject_handshake(websocket, rejection, subprotocol)
+            raise
 
-        # Check connection limit
-        if len(self.active_connections) >= settings.ws_max_connections_per_instance:
-            logger.warning("Max connections reached, rejecting new connection")
-            await websocket.close(code=1008, reason="Server at capacity")
-            raise Exception("Max connections reached")
+        try:
+            # Verify token
+            token_payload = await verify_websocket_token(token)
+
+            self.admission.check_tenant(token_payload.tenant_id)
+
+            # Accept WebSocket connection
+            await websocket.accept(subprotocol=subprotocol)
 
-        # Accept WebSocket connection
-        await websocket.accept()
+        except AdmissionRejected as rejection:
+            logger.debug(f"Handshake rejected: {rejection}")
+            await reject_handshake(websocket, rejection, subprotocol)
+            raise
+
+        finally:
+            # The connection is registered below without yielding, so the
+            # reserved slot passes straight to it (or is freed on failure)
+            self.admission.release()
 
         # Generate connection ID
         connection_id = str(uuid.uuid4())
 
         # Store connection
-        self.active_connections[connection_id] = websocket
-
-        # Store connection info
-        now = datetime.utcnow()
-        self.connection_info[connection_id] = WSConnectionInfo(
+        record = ConnectionRecord(
+            connection_id=connection_id,
             user_id=token_payload.sub,
             tenant_id=token_payload.tenant_id,
-            connection_id=connection_id,
-            connected_at=now,
-            last_activity=now,
-            metadata=token_payload.metadata or {},
+            websocket=websocket,
+            metadata=token_payload.metadata,
+            encoding=wire_encoding,
         )
+        self.active_connections[connection_id] = record
+
+        # Start outbound writer so slow clients never block shared producers
+        if settings.ws_outbound_queue_size > 0:
+            record.queue = OutboundQueue(
+                connection_id=connection_id,
+                websocket=websocket,
+                maxsize=settings.ws_outbound_queue_size,
+                policy=self.overflow_policy,
+                send_timeout=settings.ws_fanout_send_timeout,
+                on_failure=self.disconnect,
+                encoding=wire_encoding,
+                coalesce_window=settings.ws_coalesce_window_ms / 1000,
+                coalesce_max_batch=settings.ws_coalesce_max_batch,
+            )
+            record.queue.start()
+
+        self.heartbeat.add(record)
+        connections_opened.inc()
 
         # Update user connections
         if token_payload.sub not in self.user_connections:
             self.user_connections[token_payload.sub] = set()
+            # First local connection for this user: advertise it to other instances
+            await self.user_routes.register(token_payload.sub)
         self.user_connections[token_payload.sub].add(connection_id)
 
+        if settings.ws_presence_enabled and not self._has_tenant_connection(
+            token_payload.sub, token_payload.tenant_id, exclude=connection_id
+        ):
+            self.presence.mark_online(token_payload.tenant_id, token_payload.sub)
+
         # Update tenant connections
         if token_payload.tenant_id not in self.tenant_connections:
             self.tenant_connections[token_payload.tenant_id] = set()
         self.tenant_connections[token_payload.tenant_id].add(connection_id)
 
-        # Subscribe to tenant channel if not already subscribed
-        await self._subscribe_to_tenant(token_payload.tenant_id)
+        try:
+            # Take a reference on the tenant channel (subscribes on the first one)
+            await self._subscribe_to_tenant(token_payload.tenant_id)
+        except Exception:
+            # acquire() already dropped its reference; disconnect must not release another
+            self._remove_tenant_connection(token_payload.tenant_id, connection_id)
+            await self.disconnect(connection_id, 1011, "Subscribe failed")
+            raise
 
-        # Subscribe to global channel if not already subscribed
-        await self._subscribe_to_global_channel()
+        try:
+            # Subscribe to global channel if not already subscribed
+            await self._subscribe_to_global_channel()
+        except Exception:
+            await self.disconnect(connection_id, 1011, "Subscribe failed")
+            raise
 
         logger.info(
             f"WebSocket connected: connection_id={connection_id}, "
             f"user={token_payload.sub}, tenant={token_payload.tenant_id}, "
-            f"total_connections={len(self.active_connections)}"
+            f"encoding={wire_encoding.value}, total_connections={len(self.active_connections)}"
         )
 
         return connection_id, token_payload
 
-    async def disconnect(self, connection_id: str):
+    async def disconnect(self, connection_id: str, code: int = 1000, reason: str | None = None):
         """
         Disconnect and cleanup a WebSocket connection.
 
         Args:
             connection_id: Connection identifier
+            code: WebSocket close code
+            reason: Optional close reason
         """
-        conn_info = self.connection_info.get(connection_id)
-        if not conn_info:
+        # Remove from active connections
+        record = self.active_connections.pop(connection_id, None)
+        if not record:
             logger.warning(f"Connection {connection_id} not found")
             return
 
-        # Remove from active connections
-        websocket = self.active_connections.pop(connection_id, None)
-        if websocket:
-            try:
-                await websocket.close()
-            except Exception as e:
-                logger.debug(f"Error closing websocket: {e}")
+        self.heartbeat.remove(record)
+        connections_closed.inc(str(code))
+
+        # Stop the outbound writer, keeping its counters
+        queue = record.queue
+        if queue:
+            queue.stop()
+            self.total_messages_sent += queue.sent
+            self.total_socket_writes += queue.writes
+            self.total_dropped_frames += queue.dropped
+            if code == SLOW_CONSUMER_CLOSE_CODE:
+                self.total_slow_consumer_evictions += 1
 
-        # Remove from connection info
-        self.connection_info.pop(connection_id, None)
+        try:
+            # Bounded so a half-dead socket cannot stall the caller
+            await asyncio.wait_for(
+                record.websocket.close(code=code, reason=reason),
+                timeout=settings.ws_fanout_send_timeout,
+            )
+        except Exception as e:
+            logger.debug(f"Error closing websocket: {e}")
 
         # Remove from user connections
-        user_id = conn_info.user_id
+        user_id = record.user_id
         if user_id in self.user_connections:
             self.user_connections[user_id].discard(connection_id)
             if not self.user_connections[user_id]:
                 del self.user_connections[user_id]
+                await self.user_routes.unregister(user_id)
+
+        if settings.ws_presence_enabled and not self._has_tenant_connection(
+            user_id, record.tenant_id
+        ):
+            self.presence.mark_offline(record.tenant_id, user_id)
+        await self._remove_presence_subscriber(record.tenant_id, connection_id)
+
+        # Leave all joined rooms
+        for room_id in record.rooms or ():
+            await self._remove_room_member(room_id, connection_id)
+        record.rooms = None
 
         # Remove from tenant connections
-        tenant_id = conn_info.tenant_id
-        if tenant_id in self.tenant_connections:
-            self.tenant_connections[tenant_id].discard(connection_id)
-            if not self.tenant_connections[tenant_id]:
-                del self.tenant_connections[tenant_id]
-                # Unsubscribe from tenant channel if no more connections
-                await self._unsubscribe_from_tenant(tenant_id)
+        tenant_id = record.tenant_id
+        if self._remove_tenant_connection(tenant_id, connection_id):
+            # Release the tenant channel; the last release unsubscribes after a grace period
+            await self._unsubscribe_from_tenant(tenant_id)
 
         logger.info(
             f"WebSocket disconnected: connection_id={connection_id}, "
@@ -160,6 +378,22 @@ class ConnectionManager:
             f"total_connections={len(self.active_connections)}"
         )
 
+    def _remove_tenant_connection(self, tenant_id: str, connection_id: str) -> bool:
+        """
+        Drop a connection from its tenant's connection set.
+
+        Returns:
+            True if the connection was registered under the tenant
+        """
+        connection_ids = self.tenant_connections.get(tenant_id)
+        if not connection_ids or connection_id not in connection_ids:
+            return False
+
+        connection_ids.discard(connection_id)
+        if not connection_ids:
+            del self.tenant_connections[tenant_id]
+        return True
+
     async def send_message(self, connection_id: str, message: WSMessage):
         """
         Send message to a specific connection.
@@ -168,56 +402,317 @@ class ConnectionManager:
             connection_id: Target connection ID
             message: Message to send
         """
-        websocket = self.active_connections.get(connection_id)
-        if not websocket:
+        await self.send_frame(connection_id, message.encode().decode())
+
+    async def send_frame(
+        self, connection_id: str, frame: str | Frame, coalesce_key: str | None = None
+    ):
+        """
+        Send an already-serialized frame to a specific connection, in the
+        connection's wire encoding.
+        When outbound queues are enabled the frame is queued for the
+        connection's writer task instead of being written inline.
+
+        Args:
+            connection_id: Target connection ID
+            frame: JSON text frame, or a Frame shared by several recipients
+            coalesce_key: Optional key used by the coalesce overflow policy
+        """
+        record = self.active_connections.get(connection_id)
+        if not record:
             logger.warning(f"Connection {connection_id} not found")
             return
 
-        try:
-            # Serialize message
-            message_json = orjson.dumps(message.model_dump()).decode()
+        if not isinstance(frame, Frame):
+            frame = Frame(frame)
+
+        if record.queue is not None:
+            # Encoded by the writer, which may combine it with other frames
+            record.queue.put(frame, coalesce_key)
+            return
 
+        try:
             # Send to WebSocket
-            await websocket.send_text(message_json)
+            await send_encoded(record.websocket, frame.encode(record.encoding))
 
             # Update statistics
             self.total_messages_sent += 1
-
-            # Update last activity
-            if connection_id in self.connection_info:
-                self.connection_info[connection_id].last_activity = datetime.utcnow()
+            self.total_socket_writes += 1
 
         except Exception as e:
             logger.error(f"Error sending message to {connection_id}: {e}")
+            send_failures.inc("error")
             await self.disconnect(connection_id)
 
-    async def broadcast_to_tenant(self, tenant_id: str, message: WSMessage):
+    async def _drain_connection(self, connection_id: str):
+        """
+        Ask a client to reconnect elsewhere, then close its connection.
+
+        Args:
+            connection_id: Connection to drain
+        """
+        record = self.active_connections.get(connection_id)
+        if not record:
+            return
+
+        notice = WSMessage(
+            type=WSMessageType.SYSTEM,
+            payload={"message": "Server is shutting down, reconnect", "reconnect": True},
+        )
+        await self.send_message(connection_id, notice)
+        if record.queue:
+            # Let the writer deliver the notice before the queue is discarded
+            await record.queue.flush(settings.ws_fanout_send_timeout)
+
+        await self.disconnect(connection_id, code=DRAIN_CLOSE_CODE, reason="Server draining")
+
+    async def _send_heartbeat(self, connection_id: str):
+        """
+        Ping a connection that has been quiet for a heartbeat interval.
+        Clients answer with a ``pong`` message.
+
+        Args:
+            connection_id: Target connection ID
+        """
+        await self.send_message(connection_id, WSMessage(type=WSMessageType.PING))
+
+    async def broadcast_to_tenant(self, tenant_id: str, message: WSMessage) -> int:
         """
         Broadcast message to all connections in a tenant.
-        Uses Redis Pub/Sub to reach connections on other instances.
+        Local connections are served directly; Redis Pub/Sub reaches
+        connections on other instances.
 
         Args:
             tenant_id: Target tenant ID
             message: Message to broadcast
+
+        Returns:
+            Number of Redis subscribers that received the message
         """
-        # Publish to Redis channel for cross-instance fanout
         channel = get_tenant_channel(tenant_id)
-        message_dict = message.model_dump()
+        frame = message.encode()
+
+        if self.event_log.enabled:
+            (event_id,) = await self.event_log.append_many([(get_stream_key(channel), frame)])
+            frame = with_event_id(frame, event_id)
+
+        frame = await self._deliver_locally(self.tenant_connections.get(tenant_id), frame)
+        return await redis_client.publish_raw(channel, frame)
 
-        await redis_client.publish(channel, message_dict)
+    async def broadcast_to_room(self, room_id: str, message: WSMessage) -> int:
+        """
+        Broadcast message to all connections subscribed to a room.
+        Local members are served directly; Redis Pub/Sub reaches members on
+        other instances.
+
+        Args:
+            room_id: Target room ID
+            message: Message to broadcast
 
-    async def broadcast_to_user(self, user_id: str, message: WSMessage):
+        Returns:
+            Number of Redis subscribers that received the message
+        """
+        channel = get_room_channel(room_id)
+        frame = await self._deliver_locally(self.room_connections.get(room_id), message.encode())
+
+        return await redis_client.publish_raw(channel, frame)
+
+    async def broadcast_to_user(self, user_id: str, message: WSMessage) -> dict:
         """
         Broadcast message to all connections of a specific user.
+        Local connections are served directly; other instances holding the
+        user are reached through their instance channels.
 
         Args:
             user_id: Target user ID
             message: Message to send
+
+        Returns:
+            Delivery summary (see publish_batch)
+        """
+        return await self.publish_batch([(MessageTarget.USER, user_id, message)])
+
+    async def publish_batch(self, messages: list[tuple[MessageTarget, str, WSMessage]]) -> dict:
+        """
+        Deliver many targeted messages with one route lookup pipeline and
+        one publish pipeline, instead of a Redis round trip per message.
+        With the event log enabled, tenant and user messages are appended
+        in one more pipeline first.
+
+        Args:
+            messages: List of (target, target_id, message) tuples
+
+        Returns:
+            Dictionary with channels_published, subscribers_reached and
+            local_connections counts
+        """
+        user_ids = [target_id for target, target_id, _ in messages if target == MessageTarget.USER]
+        routes = await self.user_routes.get_instances_many(user_ids) if user_ids else {}
+
+        frames = [message.encode() for _, _, message in messages]
+        if self.event_log.enabled:
+            frames = await self._log_frames(messages, frames)
+
+        publishes: list[tuple[str, bytes]] = []
+        local_connections = 0
+
+        for (target, target_id, message), frame in zip(messages, frames, strict=True):
+            messages_published.inc(target.value, message.type.value)
+            if target == MessageTarget.USER:
+                # Serve local sockets directly, then only the instances that hold the user
+                connection_ids = self.user_connections.get(target_id)
+                if connection_ids:
+                    local_connections += len(connection_ids)
+                    await self._fanout(connection_ids, frame.decode())
+
+                remote_instances = [
+                    instance_id
+                    for instance_id in routes.get(target_id, [])
+                    if instance_id != settings.instance_id
+                ]
+                if remote_instances:
+                    envelope = self._user_envelope(target_id, frame)
+                    publishes.extend(
+                        (get_instance_channel(instance_id), envelope)
+                        for instance_id in remote_instances
+                    )
+
+            elif target == MessageTarget.TENANT:
+                connection_ids = self.tenant_connections.get(target_id)
+                local_connections += len(connection_ids or ())
+                published = await self._deliver_locally(connection_ids, frame)
+                publishes.append((get_tenant_channel(target_id), published))
+
+            elif target == MessageTarget.ROOM:
+                connection_ids = self.room_connections.get(target_id)
+                local_connections += len(connection_ids or ())
+                published = await self._deliver_locally(connection_ids, frame)
+                publishes.append((get_room_channel(target_id), published))
+
+        results = await redis_client.publish_many(publishes)
+
+        return {
+            "channels_published": len(publishes),
+            "subscribers_reached": sum(results),
+            "local_connections": local_connections,
+        }
+
+    async def _deliver_locally(self, connection_ids, frame: bytes) -> bytes:
         """
-        connection_ids = self.user_connections.get(user_id, set())
+        Serve a tenant or room frame to local sockets before it is published.
+
+        The returned frame carries this instance's origin tag, so its echo
+        from Redis is skipped here while other instances strip the tag and
+        deliver it. With ``ws_local_delivery`` off the frame is published
+        untagged and local sockets get it through the echo.
 
-        for connection_id in list(connection_ids):
-            await self.send_message(connection_id, message)
+        Args:
+            connection_ids: Local recipients
+            frame: Encoded frame
+
+        Returns:
+            Frame to publish
+        """
+        if not settings.ws_local_delivery:
+            return frame
+
+        if connection_ids:
+            self.total_local_deliveries += 1
+            await self._fanout(connection_ids, frame.decode(), self._coalesce_key(frame))
+        return tag_origin(settings.instance_id, frame)
+
+    async def _log_frames(
+        self, messages: list[tuple[MessageTarget, str, WSMessage]], frames: list[bytes]
+    ) -> list[bytes]:
+        """
+        Append tenant and user frames to the event log and stamp their event IDs.
+
+        Args:
+            messages: List of (target, target_id, message) tuples
+            frames: Encoded frames, one per message
+
+        Returns:
+            Frames with event IDs set where they were logged
+        """
+        positions: list[int] = []
+        entries: list[tuple[str, bytes]] = []
+
+        for index, (target, target_id, _) in enumerate(messages):
+            if target == MessageTarget.USER:
+                channel = get_user_channel(target_id)
+            elif target == MessageTarget.TENANT:
+                channel = get_tenant_channel(target_id)
+            else:
+                continue
+            positions.append(index)
+            entries.append((get_stream_key(channel), frames[index]))
+
+        event_ids = await self.event_log.append_many(entries)
+
+        stamped = list(frames)
+        for index, event_id in zip(positions, event_ids, strict=True):
+            stamped[index] = with_event_id(frames[index], event_id)
+        return stamped
+
+    async def replay_events(self, connection_id: str, last_event_id: str):
+        """
+        Send a reconnecting client the tenant and user events it missed,
+        followed by a system message saying whether the gap was covered.
+
+        Args:
+            connection_id: Reconnected connection ID
+            last_event_id: Last event ID the client received
+        """
+        record = self.active_connections.get(connection_id)
+        if not record:
+            return
+
+        frames: list[bytes] = []
+        complete = False
+
+        if self.event_log.enabled:
+            try:
+                frames, complete = await self.event_log.replay(
+                    [
+                        get_stream_key(get_tenant_channel(record.tenant_id)),
+                        get_stream_key(get_user_channel(record.user_id)),
+                    ],
+                    last_event_id,
+                )
+            except Exception as e:
+                logger.error(f"Event replay failed for {connection_id}: {e!s}")
+
+        for frame in frames:
+            await self.send_frame(connection_id, frame.decode())
+
+        # An incomplete replay tells the client to fall back to a full reload
+        await self.send_message(
+            connection_id,
+            WSMessage(
+                type=WSMessageType.SYSTEM,
+                payload={
+                    "message": "Replay finished",
+                    "replayed": len(frames),
+                    "complete": complete,
+                },
+            ),
+        )
+
+    @staticmethod
+    def _user_envelope(user_id: str, frame: bytes) -> bytes:
+        """
+        Wrap an encoded frame for delivery through an instance channel.
+        A one-line JSON routing header precedes the untouched frame, so the
+        receiving instance forwards the frame without decoding it.
+
+        Args:
+            user_id: Target user ID
+            frame: Encoded message frame
+
+        Returns:
+            Serialized envelope bytes
+        """
+        return orjson.dumps({"user_id": user_id}) + b"\n" + frame
 
     async def broadcast_global(self, message: WSMessage) -> int:
         """
@@ -233,42 +728,210 @@ class ConnectionManager:
         """
         # Publish to Redis global channel for cross-instance fanout
         channel = get_global_channel()
-        message_dict = message.model_dump()
+        messages_published.inc("global", message.type.value)
 
-        subscribers = await redis_client.publish(channel, message_dict)
+        subscribers = await redis_client.publish_raw(channel, message.encode())
         return subscribers
 
     async def _subscribe_to_tenant(self, tenant_id: str):
         """
-        Subscribe to Redis pub/sub channel for a tenant.
+        Take a reference on the Redis pub/sub channel for a tenant.
 
         Args:
             tenant_id: Tenant ID to subscribe to
         """
-        if tenant_id in self.subscribed_tenants:
-            return
-
-        channel = get_tenant_channel(tenant_id)
-        await redis_client.subscribe(channel, self._handle_redis_message)
-        self.subscribed_tenants.add(tenant_id)
-
-        logger.info(f"Subscribed to tenant channel: {channel}")
+        # Raw, since frames may carry an origin tag; see _from_peer
+        await redis_client.acquire(
+            get_tenant_channel(tenant_id), self._handle_redis_message, raw=True
+        )
 
     async def _unsubscribe_from_tenant(self, tenant_id: str):
         """
-        Unsubscribe from Redis pub/sub channel for a tenant.
+        Release a reference on the Redis pub/sub channel for a tenant.
 
         Args:
             tenant_id: Tenant ID to unsubscribe from
         """
-        if tenant_id not in self.subscribed_tenants:
+        try:
+            await redis_client.release(get_tenant_channel(tenant_id))
+        except Exception as e:
+            logger.error(f"Failed to release tenant channel for {tenant_id}: {e!s}")
+
+    async def join_rooms(self, connection_id: str, room_ids) -> tuple[list[str], list[str]]:
+        """
+        Add a connection to rooms, taking a reference on each room's
+        channel.
+
+        Args:
+            connection_id: Connection joining the rooms
+            room_ids: Room IDs to join
+
+        Returns:
+            Tuple of (joined room IDs, rejected room IDs)
+        """
+        record = self.active_connections.get(connection_id)
+        if not record:
+            return [], list(room_ids)
+
+        if record.rooms is None:
+            record.rooms = set()
+        rooms = record.rooms
+        joined: list[str] = []
+        failed: list[str] = []
+
+        for room_id in room_ids:
+            if not isinstance(room_id, str) or not room_id:
+                failed.append(str(room_id))
+                continue
+
+            if room_id in rooms:
+                joined.append(room_id)
+                continue
+
+            if len(rooms) >= settings.ws_max_rooms_per_connection:
+                failed.append(room_id)
+                continue
+
+            try:
+                await self._subscribe_to_room(room_id)
+            except Exception as e:
+                logger.error(f"Failed to subscribe to room {room_id}: {e!s}")
+                failed.append(room_id)
+                continue
+
+            # The connection may have closed while the subscription was in flight
+            if connection_id not in self.active_connections:
+                await self._unsubscribe_from_room(room_id)
+                failed.append(room_id)
+                continue
+
+            self.room_connections.setdefault(room_id, set()).add(connection_id)
+            rooms.add(room_id)
+            joined.append(room_id)
+
+        return joined, failed
+
+    async def leave_rooms(self, connection_id: str, room_ids) -> list[str]:
+        """
+        Remove a connection from rooms, releasing its reference on each
+        room's channel.
+
+        Args:
+            connection_id: Connection leaving the rooms
+            room_ids: Room IDs to leave
+
+        Returns:
+            Room IDs the connection actually left
+        """
+        record = self.active_connections.get(connection_id)
+        if not record or not record.rooms:
+            return []
+
+        left: list[str] = []
+        for room_id in list(room_ids):
+            if room_id not in record.rooms:
+                continue
+
+            record.rooms.discard(room_id)
+            await self._remove_room_member(room_id, connection_id)
+            left.append(room_id)
+
+        return left
+
+    async def _remove_room_member(self, room_id: str, connection_id: str):
+        """Drop a connection from a room index and release the room channel."""
+        members = self.room_connections.get(room_id)
+        if not members or connection_id not in members:
             return
 
-        channel = get_tenant_channel(tenant_id)
-        await redis_client.unsubscribe(channel)
-        self.subscribed_tenants.discard(tenant_id)
+        members.discard(connection_id)
+        if not members:
+            del self.room_connections[room_id]
+        await self._unsubscribe_from_room(room_id)
+
+    def _has_tenant_connection(
+        self, user_id: str, tenant_id: str, exclude: str | None = None
+    ) -> bool:
+        """Check whether a user has another local connection to a tenant."""
+        for connection_id in self.user_connections.get(user_id, ()):
+            record = self.active_connections.get(connection_id)
+            if connection_id != exclude and record and record.tenant_id == tenant_id:
+                return True
+        return False
+
+    def _presence_members(self) -> dict[str, set[str]]:
+        """Users with at least one local connection, per tenant."""
+        members: dict[str, set[str]] = {}
+        for record in self.active_connections.values():
+            members.setdefault(record.tenant_id, set()).add(record.user_id)
+        return members
+
+    async def subscribe_presence(self, connection_id: str) -> dict | None:
+        """
+        Start sending a connection its tenant's presence diffs.
+
+        The presence channel is subscribed before the snapshot is read, so
+        no diff newer than the snapshot is missed.
+
+        Args:
+            connection_id: Subscribing connection
+
+        Returns:
+            Presence snapshot of the connection's tenant, or None if the
+            connection is gone
+        """
+        record = self.active_connections.get(connection_id)
+        if not record:
+            return None
+
+        tenant_id = record.tenant_id
+        first = tenant_id not in self.presence_subscribers
+        self.presence_subscribers.setdefault(tenant_id, set()).add(connection_id)
+        if first:
+            try:
+                await redis_client.acquire(
+                    get_presence_channel(tenant_id), self._handle_presence_message, raw=True
+                )
+            except Exception:
+                self.presence_subscribers.pop(tenant_id, None)
+                raise
 
-        logger.info(f"Unsubscribed from tenant channel: {channel}")
+        return await self.presence.snapshot(tenant_id)
+
+    async def _remove_presence_subscriber(self, tenant_id: str, connection_id: str):
+        """Stop sending presence diffs to a connection, releasing the channel after the last."""
+        subscribers = self.presence_subscribers.get(tenant_id)
+        if not subscribers or connection_id not in subscribers:
+            return
+
+        subscribers.discard(connection_id)
+        if not subscribers:
+            del self.presence_subscribers[tenant_id]
+            try:
+                await redis_client.release(get_presence_channel(tenant_id))
+            except Exception as e:
+                logger.error(f"Failed to release presence channel for {tenant_id}: {e!s}")
+
+    async def _subscribe_to_room(self, room_id: str):
+        """
+        Take a reference on the Redis pub/sub channel for a room.
+
+        Args:
+            room_id: Room ID to subscribe to
+        """
+        await redis_client.acquire(get_room_channel(room_id), self._handle_room_message, raw=True)
+
+    async def _unsubscribe_from_room(self, room_id: str):
+        """
+        Release a reference on the Redis pub/sub channel for a room.
+
+        Args:
+            room_id: Room ID to unsubscribe from
+        """
+        try:
+            await redis_client.release(get_room_channel(room_id))
+        except Exception as e:
+            logger.error(f"Failed to release room channel for {room_id}: {e!s}")
 
     async def _subscribe_to_global_channel(self):
         """
@@ -279,22 +942,85 @@ class ConnectionManager:
             return
 
         channel = get_global_channel()
-        await redis_client.subscribe(channel, self._handle_global_message)
+        await redis_client.subscribe(
+            channel, self._handle_global_message, raw=settings.ws_forward_raw_frames
+        )
         self.global_channel_subscribed = True
 
         logger.info(f"Subscribed to global broadcast channel: {channel}")
 
-    async def _handle_redis_message(self, channel: str, message: dict):
+    def _from_peer(self, message: bytes | dict) -> bytes | dict | None:
+        """
+        Strip the origin tag off a tenant or room payload.
+
+        Args:
+            message: Published bytes or decoded message dictionary
+
+        Returns:
+            Untagged payload (decoded when raw forwarding is off), or None
+            for frames this instance published and already delivered
+        """
+        if not isinstance(message, bytes | bytearray):
+            return message
+
+        origin, frame = split_origin(message)
+        if origin == settings.instance_id:
+            self.total_echoes_skipped += 1
+            return None
+        if not settings.ws_forward_raw_frames:
+            return orjson.loads(frame)
+        return frame
+
+    @staticmethod
+    def _to_frame(message: bytes | dict) -> str:
+        """
+        Turn a pub/sub payload into a text frame, once per broadcast.
+        Raw payloads were validated at publish time and are forwarded as-is.
+
+        Args:
+            message: Published bytes or decoded message dictionary
+
+        Returns:
+            JSON text frame
+        """
+        if isinstance(message, bytes | bytearray):
+            return message.decode()
+        return WSMessage(**message).encode().decode()
+
+    @staticmethod
+    def _coalesce_key(message: bytes | dict) -> str | None:
+        """
+        Extract the optional ``payload.coalesce_key`` used by the coalesce
+        overflow policy. Raw frames are only parsed when they contain the key.
+
+        Args:
+            message: Published bytes or decoded message dictionary
+
+        Returns:
+            Coalesce key if present, None otherwise
+        """
+        if isinstance(message, bytes | bytearray):
+            if b'"coalesce_key"' not in message:
+                return None
+            message = orjson.loads(message)
+
+        payload = message.get("payload") or {}
+        key = payload.get("coalesce_key") if isinstance(payload, dict) else None
+        return str(key) if key is not None else None
+
+    async def _handle_redis_message(self, channel: str, message: bytes | dict):
         """
         Handle incoming message from Redis pub/sub.
 
         Args:
             channel: Redis channel name
-            message: Message dictionary
+            message: Published bytes or message dictionary
         """
         try:
-            # Parse message
-            ws_message = WSMessage(**message)
+            message = self._from_peer(message)
+            if message is None:
+                return
+            frame = self._to_frame(message)
 
             # Extract tenant_id from channel (format: "tenant:{tenant_id}")
             tenant_id = channel.split(":", 1)[1] if ":" in channel else None
@@ -305,61 +1031,184 @@ class ConnectionManager:
 
             # Send to all local connections for this tenant
             connection_ids = self.tenant_connections.get(tenant_id, set())
-
-            for connection_id in list(connection_ids):
-                await self.send_message(connection_id, ws_message)
+            result = await self._fanout(connection_ids, frame, self._coalesce_key(message))
 
             logger.debug(
-                f"Broadcasted Redis message to {len(connection_ids)} local connections "
-                f"for tenant {tenant_id}"
+                f"Broadcasted Redis message to {result['delivered']}/{result['recipients']} "
+                f"local connections for tenant {tenant_id} "
+                f"(p50={result['p50_ms']:.2f}ms, p99={result['p99_ms']:.2f}ms)"
             )
 
         except Exception as e:
             logger.error(f"Error handling Redis message from {channel}: {e}")
 
-    async def _handle_global_message(self, channel: str, message: dict):
+    async def _handle_room_message(self, channel: str, message: bytes | dict):
+        """
+        Handle incoming room message from Redis pub/sub.
+        Only connections that joined the room receive it.
+
+        Args:
+            channel: Redis channel name (format: "room:{room_id}")
+            message: Published bytes or message dictionary
+        """
+        try:
+            message = self._from_peer(message)
+            if message is None:
+                return
+            frame = self._to_frame(message)
+            room_id = channel.split(":", 1)[1]
+
+            connection_ids = self.room_connections.get(room_id, set())
+            result = await self._fanout(connection_ids, frame, self._coalesce_key(message))
+
+            logger.debug(
+                f"Broadcasted Redis message to {result['delivered']}/{result['recipients']} "
+                f"local connections for room {room_id}"
+            )
+
+        except Exception as e:
+            logger.error(f"Error handling room message from {channel}: {e}")
+
+    async def _handle_instance_message(self, channel: str, message: bytes):
+        """
+        Handle a message routed to this instance for one of its users.
+
+        Args:
+            channel: Redis channel name (format: "instance:{instance_id}")
+            message: Serialized envelope bytes
+        """
+        try:
+            header, separator, frame = message.partition(b"\n")
+            if separator:
+                user_id = orjson.loads(header)["user_id"]
+            else:
+                # Single-document envelope published by an older instance
+                envelope = orjson.loads(message)
+                user_id = envelope["user_id"]
+                frame = orjson.dumps(envelope["message"])
+
+            connection_ids = self.user_connections.get(user_id)
+            if not connection_ids:
+                logger.debug(f"Routed message for user {user_id} has no local connections")
+                return
+
+            await self._fanout(connection_ids, frame.decode())
+
+        except Exception as e:
+            logger.error(f"Error handling instance message from {channel}: {e}")
+
+    async def _handle_presence_message(self, channel: str, message: bytes):
+        """
+        Forward a tenant's presence diff to the local connections subscribed to it.
+
+        Args:
+            channel: Redis channel name (format: "presence:{tenant_id}")
+            message: Pre-encoded presence frame
+        """
+        try:
+            tenant_id = channel.split(":", 1)[1]
+            connection_ids = self.presence_subscribers.get(tenant_id)
+            if connection_ids:
+                await self._fanout(connection_ids, message.decode())
+
+        except Exception as e:
+            logger.error(f"Error handling presence message from {channel}: {e}")
+
+    async def _handle_global_message(self, channel: str, message: bytes | dict):
         """
         Handle incoming global broadcast message from Redis pub/sub.
         Sends message to ALL local connections regardless of tenant.
 
         Args:
             channel: Redis channel name (should be "global:broadcast")
-            message: Message dictionary
+            message: Published bytes or message dictionary
         """
         try:
-            # Parse message
-            ws_message = WSMessage(**message)
+            frame = self._to_frame(message)
 
             # Send to all local connections
-            connection_ids = list(self.active_connections.keys())
-
-            for connection_id in connection_ids:
-                await self.send_message(connection_id, ws_message)
+            result = await self._fanout(
+                self.active_connections.keys(), frame, self._coalesce_key(message)
+            )
 
-            logger.info(f"Broadcasted global message to {len(connection_ids)} local connections")
+            logger.info(
+                f"Broadcasted global message to {result['delivered']}/{result['recipients']} "
+                f"local connections (p50={result['p50_ms']:.2f}ms, p99={result['p99_ms']:.2f}ms)"
+            )
 
         except Exception as e:
             logger.error(f"Error handling global message from {channel}: {e}")
 
-    async def handle_client_message(self, connection_id: str, message_text: str):
+    async def _fanout(self, connection_ids, frame: str, coalesce_key: str | None = None) -> dict:
+        """
+        Send a serialized frame to many local connections concurrently.
+        Connections whose send timed out are disconnected afterwards.
+
+        Args:
+            connection_ids: Target connection IDs
+            frame: JSON text frame; each wire encoding of it is computed once
+                and shared by every recipient using that encoding
+            coalesce_key: Optional key used by the coalesce overflow policy
+
+        Returns:
+            Fanout result from the fanout engine
+        """
+        shared = Frame(frame)
+        result = await self.fanout_engine.fanout(
+            list(connection_ids),
+            lambda connection_id: self.send_frame(connection_id, shared, coalesce_key),
+        )
+
+        if result["timed_out"]:
+            logger.warning(
+                f"Disconnecting {len(result['timed_out'])} connections that timed out during fanout"
+            )
+            await asyncio.gather(
+                *(self.disconnect(connection_id) for connection_id in result["timed_out"])
+            )
+
+        return result
+
+    @staticmethod
+    def _parse_client_message(record: ConnectionRecord | None, data: str | bytes) -> WSMessage:
+        """
+        Parse a client frame: text frames are JSON, binary frames use the
+        connection's wire encoding.
+
+        Args:
+            record: Source connection record, if still registered
+            data: Frame payload
+
+        Returns:
+            Validated message
+        """
+        if isinstance(data, str) or record is None:
+            return WSMessage(**orjson.loads(data))
+        return WSMessage(**decode_inbound(record.encoding, data))
+
+    async def handle_client_message(self, connection_id: str, message_text: str | bytes):
         """
         Process incoming message from WebSocket client.
 
         Args:
             connection_id: Source connection ID
-            message_text: Raw message text from client
+            message_text: Raw text frame (JSON), or binary frame in the
+                connection's wire encoding
         """
         try:
+            record = self.active_connections.get(connection_id)
+
+            # Any inbound frame, even one that fails to parse, is activity
+            # (inbound only; also feeds the heartbeat reaper)
+            if record:
+                record.touch()
+
             # Parse message
-            message_data = orjson.loads(message_text)
-            ws_message = WSMessage(**message_data)
+            ws_message = self._parse_client_message(record, message_text)
 
             # Update statistics
             self.total_messages_received += 1
-
-            # Update last activity
-            if connection_id in self.connection_info:
-                self.connection_info[connection_id].last_activity = datetime.utcnow()
+            messages_received.inc(ws_message.type.value)
 
             # Handle different message types
             if ws_message.type == WSMessageType.PING:
@@ -370,20 +1219,52 @@ class ConnectionManager:
                 )
                 await self.send_message(connection_id, pong_message)
 
+            elif ws_message.type == WSMessageType.PONG:
+                # Reply to a server heartbeat; the activity is already recorded
+                pass
+
             elif ws_message.type == WSMessageType.MESSAGE:
                 # Handle regular message
-                conn_info = self.connection_info.get(connection_id)
-                if conn_info:
-                    ws_message.from_user = conn_info.user_id
+                if record:
+                    ws_message.from_user = record.user_id
                     # Broadcast to tenant
-                    await self.broadcast_to_tenant(conn_info.tenant_id, ws_message)
+                    await self.broadcast_to_tenant(record.tenant_id, ws_message)
 
             elif ws_message.type == WSMessageType.BROADCAST:
                 # Broadcast to entire tenant
-                conn_info = self.connection_info.get(connection_id)
-                if conn_info:
-                    ws_message.from_user = conn_info.user_id
-                    await self.broadcast_to_tenant(conn_info.tenant_id, ws_message)
+                if record:
+                    ws_message.from_user = record.user_id
+                    await self.broadcast_to_tenant(record.tenant_id, ws_message)
+
+            elif ws_message.type == WSMessageType.SUBSCRIBE:
+                rooms = ws_message.payload.get("rooms") or []
+                joined, failed = await self.join_rooms(connection_id, rooms)
+                await self.send_message(
+                    connection_id,
+                    WSMessage(
+                        type=WSMessageType.SYSTEM,
+                        payload={
+                            "message": "Subscribed to rooms",
+                            "subscribed": joined,
+                            "failed": failed,
+                            "total": len(rooms),
+                        },
+                    ),
+                )
+
+            elif ws_message.type == WSMessageType.UNSUBSCRIBE:
+                rooms = ws_message.payload.get("rooms") or []
+                left = await self.leave_rooms(connection_id, rooms)
+                await self.send_message(
+                    connection_id,
+                    WSMessage(
+                        type=WSMessageType.SYSTEM,
+                        payload={"message": "Unsubscribed from rooms", "rooms": left},
+                    ),
+                )
+
+            elif ws_message.type == WSMessageType.PRESENCE:
+                await self._handle_presence_request(connection_id, ws_message)
 
             else:
                 logger.warning(f"Unknown message type: {ws_message.type}")
@@ -396,6 +1277,42 @@ class ConnectionManager:
             )
             await self.send_message(connection_id, error_message)
 
+    async def _handle_presence_request(self, connection_id: str, ws_message: WSMessage):
+        """
+        Handle a client ``presence`` message.
+
+        ``{"action": "subscribe"}`` replies with a snapshot and then streams
+        diffs, ``{"action": "snapshot"}`` replies with a snapshot only (e.g.
+        after a version gap) and ``{"action": "unsubscribe"}`` stops the
+        diffs.
+
+        Args:
+            connection_id: Source connection ID
+            ws_message: Parsed client message
+        """
+        record = self.active_connections.get(connection_id)
+        if not record:
+            return
+
+        if not settings.ws_presence_enabled:
+            raise ValueError("Presence is disabled")
+
+        action = ws_message.payload.get("action", "subscribe")
+        if action == "subscribe":
+            snapshot = await self.subscribe_presence(connection_id)
+        elif action == "snapshot":
+            snapshot = await self.presence.snapshot(record.tenant_id)
+        elif action == "unsubscribe":
+            await self._remove_presence_subscriber(record.tenant_id, connection_id)
+            return
+        else:
+            raise ValueError(f"Unknown presence action: {action}")
+
+        if snapshot is not None:
+            await self.send_message(
+                connection_id, WSMessage(type=WSMessageType.PRESENCE, payload=snapshot)
+            )
+
     def get_stats(self) -> dict:
         """
         Get current connection statistics.
@@ -403,33 +1320,145 @@ class ConnectionManager:
         Returns:
             Dictionary with connection stats
         """
+        queues = [record.queue for record in self.active_connections.values() if record.queue]
+        depths = [queue.depth for queue in queues]
+        encodings: dict[str, int] = {}
+        for record in self.active_connections.values():
+            encodings[record.encoding.value] = encodings.get(record.encoding.value, 0) + 1
+
         return {
             "active_connections": len(self.active_connections),
             "unique_users": len(self.user_connections),
             "unique_tenants": len(self.tenant_connections),
-            "subscribed_channels": len(self.subscribed_tenants),
-            "total_messages_sent": self.total_messages_sent,
+            "active_rooms": len(self.room_connections),
+            "presence_subscribers": sum(map(len, self.presence_subscribers.values())),
+            "subscribed_channels": len(self.tenant_connections) + len(self.room_connections),
+            "total_messages_sent": self.total_messages_sent + sum(queue.sent for queue in queues),
+            "total_socket_writes": self.total_socket_writes + sum(queue.writes for queue in queues),
             "total_messages_received": self.total_messages_received,
+            "outbound_queue_depth": sum(depths),
+            "outbound_queue_max_depth": max(depths, default=0),
+            "total_dropped_frames": self.total_dropped_frames
+            + sum(queue.dropped for queue in queues),
+            "total_slow_consumer_evictions": self.total_slow_consumer_evictions,
+            "total_local_deliveries": self.total_local_deliveries,
+            "total_echoes_skipped": self.total_echoes_skipped,
+            "encodings": encodings,
+            "admission": self.admission.get_stats(),
+            "drain": self.drainer.get_stats(),
+            "fanout": self.fanout_engine.get_stats(),
+            "event_log": self.event_log.get_stats(),
+            "heartbeat": self.heartbeat.get_stats(),
+            "presence": self.presence.get_stats(),
+            "cluster_stats": self.cluster_stats.get_stats(),
         }
 
+    def get_instance_snapshot(self) -> dict:
+        """
+        Compact per-instance stats for the cluster heartbeat.
+
+        Returns:
+            Connection, per-tenant, queue and message totals of this instance
+        """
+        depths = [record.queue.depth for record in self.active_connections.values() if record.queue]
+        sent = self.total_messages_sent + sum(
+            record.queue.sent for record in self.active_connections.values() if record.queue
+        )
+
+        return {
+            "active_connections": len(self.active_connections),
+            "unique_users": len(self.user_connections),
+            "tenants": {
+                tenant_id: len(connection_ids)
+                for tenant_id, connection_ids in self.tenant_connections.items()
+            },
+            "outbound_queue_depth": sum(depths),
+            "outbound_queue_max_depth": max(depths, default=0),
+            "total_messages_sent": sent,
+            "total_messages_received": self.total_messages_received,
+            "draining": self.drainer.draining,
+        }
+
+    def collect_metrics(self) -> list[MetricFamily]:
+        """
+        Connection metric families for the Prometheus registry.
+
+        Returns:
+            Gauges and totals derived from get_stats()
+        """
+        stats = self.get_stats()
+        return [
+            (
+                "realtime_active_connections",
+                "gauge",
+                "Open WebSocket connections",
+                [({}, stats["active_connections"])],
+            ),
+            (
+                "realtime_active_rooms",
+                "gauge",
+                "Rooms with local members",
+                [({}, stats["active_rooms"])],
+            ),
+            (
+                "realtime_frames_sent_total",
+                "counter",
+                "Messages delivered to WebSocket connections",
+                [({}, stats["total_messages_sent"])],
+            ),
+            (
+                "realtime_socket_writes_total",
+                "counter",
+                "WebSocket frames written (a batch frame carries several messages)",
+                [({}, stats["total_socket_writes"])],
+            ),
+            (
+                "realtime_outbound_queue_depth",
+                "gauge",
+                "Frames waiting in outbound queues",
+                [({}, stats["outbound_queue_depth"])],
+            ),
+            (
+                "realtime_dropped_frames_total",
+                "counter",
+                "Frames dropped by outbound queue overflow",
+                [({}, stats["total_dropped_frames"])],
+            ),
+            (
+                "realtime_idle_reaped_total",
+                "counter",
+                "Connections closed by the heartbeat reaper",
+                [({}, stats["heartbeat"]["total_reaped"])],
+            ),
+        ]
+
 
 # Global connection manager instance
 connection_manager = ConnectionManager()
+registry.register_collector(connection_manager.collect_metrics)
 
 
-async def websocket_endpoint(websocket: WebSocket, token: str):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    token: str,
+    last_event_id: str | None = None,
+    encoding: str | None = None,
+):
     """
     Main WebSocket endpoint handler.
 
     Args:
         websocket: FastAPI WebSocket connection
         token: JWT authentication token
+        last_event_id: Last event ID seen before a reconnect, if any
+        encoding: Requested wire encoding (json, json+deflate or msgpack)
     """
     connection_id = None
 
     try:
         # Authenticate and connect
-        connection_id, token_payload = await connection_manager.connect(websocket, token)
+        connection_id, token_payload = await connection_manager.connect(websocket, token, encoding)
+        record = connection_manager.active_connections[connection_id]
 
         # Send welcome message
         welcome_message = WSMessage(
@@ -439,23 +1468,33 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
                 "connection_id": connection_id,
                 "user_id": token_payload.sub,
                 "tenant_id": token_payload.tenant_id,
+                "encoding": record.encoding.value,
             },
         )
         await connection_manager.send_message(connection_id, welcome_message)
 
+        # Catch up on events missed while the client was disconnected
+        if last_event_id:
+            await connection_manager.replay_events(connection_id, last_event_id)
+
         # Message handling loop
         while True:
-            try:
-                # Receive message from client
-                message_text = await websocket.receive_text()
-
-                # Process message
-                await connection_manager.handle_client_message(connection_id, message_text)
-
-            except WebSocketDisconnect:
+            # Receive message from client: JSON text, or binary in the negotiated encoding
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
                 logger.info(f"WebSocket client disconnected: {connection_id}")
                 break
 
+            text = message.get("text")
+            data = text if text is not None else message.get("bytes") or b""
+
+            # Process message
+            await connection_manager.handle_client_message(connection_id, data)
+
+    except AdmissionRejected:
+        # Already closed with a retry hint; logging every rejection would amplify a storm
+        pass
+
     except Exception as e:
         logger.error(f"WebSocket error for connection {connection_id}: {e}")
 
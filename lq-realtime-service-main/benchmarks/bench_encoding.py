@@ -0,0 +1,101 @@
+"""
+Frame encoding benchmark.
+
+Measures, per wire encoding, the bytes a frame takes on the wire and the CPU
+spent serializing it, for small, medium and large messages. Encodings are
+computed once per broadcast and shared by every recipient, so the fanout cost
+is compared with compressing per socket (what protocol-level
+permessage-deflate does: one compressor per connection, one compression per
+recipient).
+
+Usage:
+    python -m benchmarks.bench_encoding [--recipients 1000] [--iterations 2000]
+"""
+
+import argparse
+import os
+import time
+import zlib
+
+os.environ.setdefault("TESTING", "true")
+
+from app.encoding import Encoding, Frame, available_encodings
+from app.schemas import WSMessage, WSMessageType
+
+PAYLOADS = {
+    "chat": {"text": "See you at the next lesson!", "room": "class-42"},
+    "notification": {
+        "title": "Assignment graded",
+        "body": "Your essay on irregular verbs was graded. " * 8,
+        "items": [{"id": i, "score": i * 7 % 100, "status": "graded"} for i in range(10)],
+    },
+    "scoreboard": {
+        "rows": [
+            {"user_id": f"user-{i}", "name": f"Student {i}", "score": i * 13 % 1000, "rank": i}
+            for i in range(120)
+        ]
+    },
+}
+
+
+def encode_cost(data: bytes, encoding: Encoding, iterations: int) -> tuple[int, float]:
+    """
+    Serialize a fresh frame repeatedly.
+
+    Returns:
+        Tuple of (encoded size in bytes, microseconds per encode)
+    """
+    size = len(Frame(data).encode(encoding))
+    start = time.process_time()
+    for _ in range(iterations):
+        Frame(data).encode(encoding)
+    elapsed = time.process_time() - start
+    return size, elapsed / iterations * 1e6
+
+
+def per_socket_deflate_cost(data: bytes, recipients: int) -> float:
+    """
+    Compress a frame once per recipient, as permessage-deflate does.
+
+    Returns:
+        Milliseconds for the whole fanout
+    """
+    start = time.process_time()
+    for _ in range(recipients):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressor.compress(data)
+        compressor.flush(zlib.Z_SYNC_FLUSH)
+    return (time.process_time() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--recipients", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    encodings = available_encodings()
+    if Encoding.MSGPACK not in encodings:
+        print("msgpack is not installed; MessagePack is skipped\n")
+
+    print(f"{'message':>13} {'encoding':>13} {'bytes':>7} {'ratio':>6} {'us/encode':>10}")
+    for name, payload in PAYLOADS.items():
+        data = WSMessage(type=WSMessageType.NOTIFICATION, payload=payload).encode()
+        for encoding in encodings:
+            size, micros = encode_cost(data, encoding, args.iterations)
+            print(
+                f"{name:>13} {encoding.value:>13} {size:>7} "
+                f"{size / len(data):>6.0%} {micros:>10.1f}"
+            )
+
+    print(f"\nDeflate CPU for one broadcast to {args.recipients} recipients:")
+    print(f"{'message':>13} {'shared ms':>10} {'per-socket ms':>14}")
+    for name, payload in PAYLOADS.items():
+        data = WSMessage(type=WSMessageType.NOTIFICATION, payload=payload).encode()
+        _, micros = encode_cost(data, Encoding.JSON_DEFLATE, args.iterations)
+        per_socket = per_socket_deflate_cost(data, args.recipients)
+        print(f"{name:>13} {micros / 1e3:>10.3f} {per_socket:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
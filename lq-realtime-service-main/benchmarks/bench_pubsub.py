@@ -0,0 +1,102 @@
+"""
+Pub/sub listener sharding benchmark.
+
+Measures how many pub/sub messages per second the Redis client receives,
+decodes and dispatches with 1, 2, 4 and 8 listener shards. Messages are
+published (pipelined, from a separate connection) round-robin over a set of
+tenant channels; the handler awaits once per message to stand in for the
+local fanout. Needs a local Redis (``docker compose up -d redis``).
+
+Usage:
+    python -m benchmarks.bench_pubsub [--shards 1 2 4 8] [--channels 64] [--messages 50000]
+"""
+
+import argparse
+import asyncio
+import time
+
+import orjson
+import redis.asyncio as aioredis
+
+from app.config import get_settings
+from app.redis_client import RedisClient, get_tenant_channel
+
+settings = get_settings()
+
+# Published messages per pipeline round trip
+_PUBLISH_BATCH = 1000
+
+MESSAGE = {
+    "type": "notification",
+    "payload": {"title": "Assignment graded", "score": 87, "items": list(range(20))},
+    "from_user": "backend",
+    "timestamp": "2025-01-01T00:00:00",
+}
+
+
+async def measure(shards: int, channels: list[str], messages: int, handler_delay: float) -> float:
+    """
+    Publish ``messages`` messages and time until all have been dispatched.
+
+    Returns:
+        Messages dispatched per second
+    """
+    client = RedisClient(shards=shards)
+    await client.connect()
+    received = 0
+    done = asyncio.Event()
+
+    async def handler(channel, message):
+        nonlocal received
+        # Stand-in for fanout: yield (or wait) like a send to local sockets would
+        await asyncio.sleep(handler_delay)
+        received += 1
+        if received == messages:
+            done.set()
+
+    for channel in channels:
+        await client.subscribe(channel, handler)
+    # Let every shard's SUBSCRIBE reach the server before publishing
+    await asyncio.sleep(0.5)
+
+    publisher = aioredis.from_url(settings.redis_url)
+    data = orjson.dumps(MESSAGE)
+    started = time.perf_counter()
+    try:
+        for start in range(0, messages, _PUBLISH_BATCH):
+            pipe = publisher.pipeline(transaction=False)
+            for index in range(start, min(start + _PUBLISH_BATCH, messages)):
+                pipe.publish(channels[index % len(channels)], data)
+            await pipe.execute()
+
+        await asyncio.wait_for(done.wait(), timeout=120)
+        return messages / (time.perf_counter() - started)
+    finally:
+        await publisher.aclose()
+        await client.disconnect()
+
+
+async def run(args):
+    channels = [get_tenant_channel(f"bench-{index}") for index in range(args.channels)]
+
+    print(f"{'shards':>7} {'msg/s':>12} {'vs 1 shard':>11}")
+    baseline = None
+    for shards in args.shards:
+        rate = await measure(shards, channels, args.messages, args.handler_delay_ms / 1000)
+        baseline = baseline or rate
+        print(f"{shards:>7} {rate:>12,.0f} {rate / baseline:>10.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--channels", type=int, default=64)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument(
+        "--handler-delay-ms", type=float, default=0.0, help="Await per message in the handler"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Connection registry memory benchmark.
+
+Measures the bytes of Python heap held per connection by the connection
+manager's bookkeeping (everything except the socket object itself), for the
+slotted ConnectionRecord registry and for the previous layout of a pydantic
+WSConnectionInfo plus per-connection dict entries.
+
+Usage:
+    python -m benchmarks.bench_registry [--connections 10000 50000] [--tenants 200]
+"""
+
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+os.environ.setdefault("TESTING", "true")
+
+from app.registry import ConnectionRecord
+from app.schemas import WSConnectionInfo
+
+
+def build_legacy(ids, sockets, tenants):
+    """Previous layout: pydantic info model and one dict entry per concern."""
+    active_connections, connection_info, last_seen = {}, {}, {}
+    user_connections, tenant_connections = {}, {}
+
+    for index, (connection_id, websocket) in enumerate(zip(ids, sockets, strict=True)):
+        user_id, tenant_id = f"user-{index}", f"tenant-{index % tenants}"
+        now = datetime.utcnow()
+        active_connections[connection_id] = websocket
+        connection_info[connection_id] = WSConnectionInfo(
+            user_id=user_id,
+            tenant_id=tenant_id,
+            connection_id=connection_id,
+            connected_at=now,
+            last_activity=now,
+            metadata={},
+        )
+        last_seen[connection_id] = time.monotonic()
+        user_connections.setdefault(user_id, set()).add(connection_id)
+        tenant_connections.setdefault(tenant_id, set()).add(connection_id)
+
+    return active_connections, connection_info, last_seen, user_connections, tenant_connections
+
+
+def build_registry(ids, sockets, tenants):
+    """Current layout: one slotted record per connection."""
+    active_connections = {}
+    user_connections, tenant_connections = {}, {}
+
+    for index, (connection_id, websocket) in enumerate(zip(ids, sockets, strict=True)):
+        user_id, tenant_id = f"user-{index}", f"tenant-{index % tenants}"
+        active_connections[connection_id] = ConnectionRecord(
+            connection_id, user_id, tenant_id, websocket
+        )
+        user_connections.setdefault(user_id, set()).add(connection_id)
+        tenant_connections.setdefault(tenant_id, set()).add(connection_id)
+
+    return active_connections, user_connections, tenant_connections
+
+
+def measure(build, count: int, tenants: int) -> float:
+    """
+    Measure heap bytes per connection for a registry layout.
+
+    Returns:
+        Bytes allocated per connection
+    """
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    sockets = [object() for _ in range(count)]
+
+    gc.collect()
+    tracemalloc.start()
+    state = build(ids, sockets, tenants)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del state
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--connections", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--tenants", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'connections':>12} {'legacy B/conn':>15} {'registry B/conn':>17} {'saved':>8}")
+    for count in args.connections:
+        legacy = measure(build_legacy, count, args.tenants)
+        registry = measure(build_registry, count, args.tenants)
+        saved = 1 - registry / legacy
+        print(f"{count:>12} {legacy:>15.0f} {registry:>17.0f} {saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+WebSocket load test.
+
+Opens N connections across M tenants with tokens minted locally from the
+configured JWT key, publishes through ``/api/broadcast/global`` and
+``/api/messages/tenant/{tenant_id}`` at fixed rates, and reports end-to-end
+delivery latency percentiles, server memory per connection and server CPU
+per delivered message. By default the service is started as a subprocess
+against the local Redis (``docker compose up -d redis``), so its process can
+be measured; ``--url`` targets an already running instance instead (pass
+``--server-pid`` to still measure it).
+
+The ``ci`` profile is sized for a CI runner and fails (exit code 1) when a
+latency or delivery SLO is missed; ``full`` is a capacity run. Any profile
+value can be overridden on the command line.
+
+Usage:
+    python -m benchmarks.loadtest --profile ci
+    python -m benchmarks.loadtest --profile full [--connections 50000] [--json report.json]
+    python -m benchmarks.loadtest --url http://host:8082 --server-pid 1234
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import resource
+import subprocess
+import sys
+import time
+from array import array
+
+import httpx
+import orjson
+import psutil
+import websockets
+from redis import asyncio as aioredis
+
+from app.auth import jwt_manager
+from app.config import get_settings
+from app.utils.metrics import percentile
+
+settings = get_settings()
+
+PROFILES = {
+    "ci": {
+        "connections": 500,
+        "tenants": 10,
+        "global_rate": 2.0,
+        "tenant_rate": 20.0,
+        "duration": 20.0,
+        "ramp_rate": 250.0,
+        "slo_p99_ms": 250.0,
+        "slo_delivery": 0.999,
+    },
+    "full": {
+        "connections": 20000,
+        "tenants": 200,
+        "global_rate": 1.0,
+        "tenant_rate": 200.0,
+        "duration": 120.0,
+        "ramp_rate": 500.0,
+        "slo_p99_ms": 500.0,
+        "slo_delivery": 0.999,
+    },
+}
+
+# Seconds to wait for in-flight deliveries after the last publish
+_SETTLE_SECONDS = 3.0
+
+
+class LoadStats:
+    """Counters and latency samples shared by the client swarm."""
+
+    def __init__(self, tenants: int):
+        self.connected = 0
+        self.failed = 0
+        self.disconnected = 0
+        self.tenant_connections = [0] * tenants
+        self.published = 0
+        self.publish_errors = 0
+        self.expected = 0
+        self.delivered = 0
+        # Delivery latencies in milliseconds
+        self.latencies = array("d")
+
+    def record(self, message: dict):
+        """Record a received message if it was published by the load test."""
+        sent_at = (message.get("payload") or {}).get("loadtest_sent_at")
+        if sent_at is not None:
+            self.latencies.append((time.time() - sent_at) * 1000)
+            self.delivered += 1
+
+
+async def run_client(ws_url: str, token: str, tenant: int, stats: LoadStats, stop: asyncio.Event):
+    """
+    One simulated client: stay connected until stopped, answering server
+    pings and timing every load-test message it receives.
+    """
+    try:
+        connection = await websockets.connect(
+            f"{ws_url}?token={token}", max_size=None, ping_interval=None, open_timeout=30
+        )
+    except Exception:
+        stats.failed += 1
+        return
+
+    stats.connected += 1
+    stats.tenant_connections[tenant] += 1
+
+    async def receive():
+        async for raw in connection:
+            frame = orjson.loads(raw)
+            messages = frame["payload"]["messages"] if frame.get("type") == "batch" else (frame,)
+            for message in messages:
+                if message.get("type") == "ping":
+                    await connection.send('{"type":"pong"}')
+                else:
+                    stats.record(message)
+
+    receiver = asyncio.create_task(receive())
+    stopped = asyncio.create_task(stop.wait())
+    try:
+        await asyncio.wait((receiver, stopped), return_when=asyncio.FIRST_COMPLETED)
+        if receiver.done():
+            stats.disconnected += 1
+    finally:
+        receiver.cancel()
+        stopped.cancel()
+        stats.tenant_connections[tenant] -= 1
+        with contextlib.suppress(Exception):
+            await connection.close()
+
+
+async def publish_loop(
+    http: httpx.AsyncClient, rate: float, duration: float, build, stats: LoadStats
+):
+    """
+    Publish at a fixed rate for ``duration`` seconds.
+
+    Each publish runs as its own task, so a slow response does not delay the
+    schedule. ``build`` returns (path, payload, expected recipients).
+    """
+    if rate <= 0:
+        return
+
+    interval = 1 / rate
+    pending = set()
+    started = time.monotonic()
+    sequence = 0
+
+    async def publish(path: str, payload: dict):
+        try:
+            response = await http.post(path, json={"payload": payload})
+            response.raise_for_status()
+        except Exception:
+            stats.publish_errors += 1
+
+    while (elapsed := time.monotonic() - started) < duration:
+        path, payload, recipients = build(sequence)
+        payload["loadtest_sent_at"] = time.time()
+        stats.published += 1
+        stats.expected += recipients
+        task = asyncio.create_task(publish(path, payload))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+        sequence += 1
+        await asyncio.sleep(max(0.0, (sequence * interval) - elapsed))
+
+    if pending:
+        await asyncio.gather(*pending)
+
+
+def server_usage(process: psutil.Process | None) -> tuple[float, float]:
+    """Resident memory (bytes) and CPU seconds of the server and its children."""
+    if process is None:
+        return 0.0, 0.0
+
+    rss, cpu = 0.0, 0.0
+    for proc in (process, *process.children(recursive=True)):
+        with contextlib.suppress(psutil.Error):
+            times = proc.cpu_times()
+            rss += proc.memory_info().rss
+            cpu += times.user + times.system
+    return rss, cpu
+
+
+def raise_fd_limit(needed: int):
+    """Raise the open-file soft limit (inherited by a spawned server) if possible."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        with contextlib.suppress(ValueError, OSError):
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+async def check_redis():
+    """Fail early with a hint when the local Redis is not running."""
+    client = aioredis.from_url(settings.redis_url)
+    try:
+        await client.ping()
+    except Exception as e:
+        raise SystemExit(
+            f"Redis is not reachable at {settings.redis_url} ({e}); "
+            "start one with `docker compose up -d redis`"
+        ) from e
+    finally:
+        await client.aclose()
+
+
+def spawn_server(port: int, connections: int) -> subprocess.Popen:
+    """Start the service with admission limits sized for the run."""
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "LOG_LEVEL": "WARNING",
+        "WS_MAX_CONNECTIONS_PER_INSTANCE": str(connections + 100),
+        "WS_HANDSHAKE_RATE": "0",
+        "WS_TENANT_HANDSHAKE_RATE": "0",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+
+
+async def wait_ready(http: httpx.AsyncClient, timeout: float = 30.0):
+    """Wait until the service reports healthy."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(httpx.HTTPError):
+            if (await http.get(settings.health_check_path)).status_code == 200:
+                return
+        await asyncio.sleep(0.25)
+    raise SystemExit(f"Service did not become healthy within {timeout:.0f}s")
+
+
+async def run(args) -> dict:
+    """
+    Run one load test.
+
+    Returns:
+        Report with configuration, connection, latency and resource figures
+    """
+    await check_redis()
+    raise_fd_limit(args.connections * 2 + 1024)
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+        process = psutil.Process(args.server_pid) if args.server_pid else None
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = spawn_server(args.port, args.connections)
+        process = psutil.Process(server.pid)
+
+    ws_url = base_url.replace("http", "ws", 1) + "/ws"
+    stats = LoadStats(args.tenants)
+    stop = asyncio.Event()
+    clients: list[asyncio.Task] = []
+
+    try:
+        async with httpx.AsyncClient(
+            base_url=base_url,
+            headers={"x-api-key": settings.system_api_key},
+            timeout=30,
+            limits=httpx.Limits(max_connections=64),
+        ) as http:
+            await wait_ready(http)
+            base_rss, _ = server_usage(process)
+
+            # Ramp up at a fixed handshake rate
+            ramp_started = time.monotonic()
+            for index in range(args.connections):
+                tenant = index % args.tenants
+                token = jwt_manager.create_access_token(f"load-user-{index}", f"load-{tenant}")
+                clients.append(asyncio.create_task(run_client(ws_url, token, tenant, stats, stop)))
+                await asyncio.sleep(
+                    max(0.0, (index + 1) / args.ramp_rate - (time.monotonic() - ramp_started))
+                )
+            while stats.connected + stats.failed < args.connections:
+                await asyncio.sleep(0.1)
+            ramp_seconds = time.monotonic() - ramp_started
+
+            # Let the welcome messages and registrations settle before measuring
+            await asyncio.sleep(1.0)
+            connected_rss, cpu_before = server_usage(process)
+
+            def build_global(sequence: int):
+                return "/api/broadcast/global", {"seq": sequence}, stats.connected
+
+            def build_tenant(sequence: int):
+                tenant = sequence % args.tenants
+                return (
+                    f"/api/messages/tenant/load-{tenant}",
+                    {"seq": sequence},
+                    stats.tenant_connections[tenant],
+                )
+
+            await asyncio.gather(
+                publish_loop(http, args.global_rate, args.duration, build_global, stats),
+                publish_loop(http, args.tenant_rate, args.duration, build_tenant, stats),
+            )
+            await asyncio.sleep(_SETTLE_SECONDS)
+            _, cpu_after = server_usage(process)
+    finally:
+        stop.set()
+        await asyncio.gather(*clients, return_exceptions=True)
+        if server is not None:
+            server.terminate()
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                server.wait(timeout=60)
+
+    latencies = stats.latencies
+    delivered = max(stats.delivered, 1)
+    return {
+        "profile": args.profile,
+        "connections": args.connections,
+        "tenants": args.tenants,
+        "connected": stats.connected,
+        "connect_failures": stats.failed,
+        "disconnected": stats.disconnected,
+        "ramp_seconds": round(ramp_seconds, 2),
+        "published": stats.published,
+        "publish_errors": stats.publish_errors,
+        "expected_deliveries": stats.expected,
+        "delivered": stats.delivered,
+        "delivery_ratio": round(stats.delivered / stats.expected, 5) if stats.expected else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies, default=0.0), 2),
+        },
+        "memory_per_connection_bytes": (
+            round((connected_rss - base_rss) / stats.connected)
+            if process and stats.connected
+            else None
+        ),
+        "cpu_us_per_delivery": (
+            round((cpu_after - cpu_before) / delivered * 1e6, 2) if process else None
+        ),
+    }
+
+
+def check_slo(report: dict, p99_ms: float, min_delivery: float) -> list[str]:
+    """
+    Compare a report with the profile's service level objectives.
+
+    Returns:
+        Descriptions of the objectives that were missed
+    """
+    violations = []
+    if report["connect_failures"]:
+        violations.append(f"{report['connect_failures']} connections failed")
+    if report["latency_ms"]["p99"] > p99_ms:
+        violations.append(f"p99 latency {report['latency_ms']['p99']}ms > {p99_ms}ms")
+    if report["delivery_ratio"] < min_delivery:
+        violations.append(f"delivery ratio {report['delivery_ratio']} < {min_delivery}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="ci")
+    parser.add_argument("--connections", type=int)
+    parser.add_argument("--tenants", type=int)
+    parser.add_argument("--global-rate", type=float, help="Global broadcasts per second")
+    parser.add_argument(
+        "--tenant-rate", type=float, help="Tenant messages per second (all tenants)"
+    )
+    parser.add_argument("--duration", type=float, help="Seconds of publishing")
+    parser.add_argument("--ramp-rate", type=float, help="Handshakes per second while connecting")
+    parser.add_argument("--url", help="Target a running service instead of spawning one")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url service, for memory/CPU")
+    parser.add_argument("--port", type=int, default=8090, help="Port of the spawned service")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    for name in ("connections", "tenants", "global_rate", "tenant_rate", "duration", "ramp_rate"):
+        if getattr(args, name) is None:
+            setattr(args, name, profile[name])
+
+    report = asyncio.run(run(args))
+
+    print(f"profile            {report['profile']}")
+    print(
+        f"connections        {report['connected']}/{report['connections']} "
+        f"({report['connect_failures']} failed, ramp {report['ramp_seconds']}s)"
+    )
+    print(f"published          {report['published']} ({report['publish_errors']} errors)")
+    print(
+        f"delivered          {report['delivered']}/{report['expected_deliveries']} "
+        f"({report['delivery_ratio']:.3%})"
+    )
+    latency = report["latency_ms"]
+    print(
+        f"latency ms         p50 {latency['p50']}  p95 {latency['p95']}  "
+        f"p99 {latency['p99']}  max {latency['max']}"
+    )
+    print(f"memory/connection  {report['memory_per_connection_bytes']} B")
+    print(f"cpu/delivery       {report['cpu_us_per_delivery']} us")
+
+    if args.json:
+        with open(args.json, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+
+    violations = check_slo(report, profile["slo_p99_ms"], profile["slo_delivery"])
+    for violation in violations:
+        print(f"SLO missed: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
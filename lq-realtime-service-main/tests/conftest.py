@@ -2,8 +2,9 @@
 Pytest configuration and fixtures.
 """
 
+import asyncio
 import os
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -28,18 +29,60 @@ def mock_redis():
         mock.is_connected = AsyncMock(return_value=True)
         mock.ping = AsyncMock(return_value=True)
         mock.publish = AsyncMock(return_value=0)
+        mock.publish_raw = AsyncMock(return_value=0)
         mock.subscribe = AsyncMock()
         mock.unsubscribe = AsyncMock()
+        mock.acquire = AsyncMock()
+        mock.release = AsyncMock()
+        mock.get_subscription_stats = MagicMock(
+            return_value={
+                "subscribed_channels": 0,
+                "referenced_channels": 0,
+                "pending_unsubscribes": 0,
+                "total_subscribes": 0,
+                "total_unsubscribes": 0,
+                "total_unsubscribes_avoided": 0,
+            }
+        )
+        mock.get_listener_stats = MagicMock(
+            return_value={
+                "state": "listening",
+                "healthy": True,
+                "last_message_age_seconds": None,
+                "total_listener_errors": 0,
+                "total_reconnects": 0,
+            }
+        )
         mock.get = AsyncMock(return_value=None)
         mock.set = AsyncMock()
         mock.delete = AsyncMock()
         mock.redis = AsyncMock()
         mock.redis.ping = AsyncMock(return_value=True)
+        mock.redis.zrangebyscore = AsyncMock(return_value=[])
+        mock.redis.zrem = AsyncMock(return_value=0)
+        mock.redis.pipeline = MagicMock()
+        mock.redis.pipeline.return_value.execute = AsyncMock(return_value=[])
+        mock.publish_many = AsyncMock(return_value=[])
+
+        async def xreadgroup(*args, **kwargs):
+            # Stand in for a blocking read so the webhook consumer does not spin
+            await asyncio.sleep(0.05)
+            return []
+
+        mock.redis.xreadgroup = AsyncMock(side_effect=xreadgroup)
+        mock.redis.xpending_range = AsyncMock(return_value=[])
+        mock.redis.hgetall = AsyncMock(return_value={})
 
         # Patch in all modules that import redis_client
         with (
             patch("app.main.redis_client", mock),
             patch("app.websocket_handler.redis_client", mock),
+            patch("app.routing.redis_client", mock),
+            patch("app.event_log.redis_client", mock),
+            patch("app.webhook_queue.redis_client", mock),
+            patch("app.webhooks.redis_client", mock),
+            patch("app.cluster_stats.redis_client", mock),
+            patch("app.presence.redis_client", mock),
         ):
             yield mock
 
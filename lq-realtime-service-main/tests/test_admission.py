@@ -0,0 +1,110 @@
+"""
+Tests for handshake admission control.
+"""
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+def controller(**overrides) -> AdmissionController:
+    """Admission controller with generous defaults."""
+    options = {
+        "max_connections": 100,
+        "instance_rate": 0,
+        "instance_burst": 10,
+        "tenant_rate": 0,
+        "tenant_burst": 10,
+        "retry_after": 2.0,
+        "retry_jitter": 3.0,
+    }
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket class."""
+
+    def test_allows_burst_then_waits(self):
+        """Test a full bucket admits its capacity and then reports the wait."""
+        bucket = TokenBucket(rate=10, capacity=3)
+        now = bucket.updated
+
+        assert [bucket.try_acquire(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.try_acquire(now) == pytest.approx(0.1)
+
+    def test_refills_over_time(self):
+        """Test tokens are earned back at the configured rate."""
+        bucket = TokenBucket(rate=10, capacity=1)
+        now = bucket.updated
+        bucket.try_acquire(now)
+
+        assert bucket.try_acquire(now + 0.05) > 0
+        assert bucket.try_acquire(now + 0.2) == 0.0
+
+
+class TestAdmissionController:
+    """Tests for AdmissionController class."""
+
+    def test_rejects_over_capacity(self):
+        """Test a full instance turns handshakes away with a jittered hint."""
+        admission = controller(max_connections=5)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            admission.check_instance(5)
+
+        assert rejected.value.reason == "capacity"
+        assert 2.0 <= rejected.value.retry_after <= 5.0
+        assert "retry_after=" in str(rejected.value)
+        assert admission.total_rejected == 1
+
+    def test_pending_handshakes_count_against_capacity(self):
+        """Test admitted handshakes hold a slot until they are released."""
+        admission = controller(max_connections=2)
+
+        admission.check_instance(0)
+        admission.check_instance(0)
+        with pytest.raises(AdmissionRejected, match="capacity"):
+            admission.check_instance(0)
+
+        # One handshake registers, the other is still in flight
+        admission.release()
+        with pytest.raises(AdmissionRejected, match="capacity"):
+            admission.check_instance(1)
+
+        # The pending handshake fails and gives its slot back
+        admission.release()
+        admission.check_instance(1)
+        assert admission.get_stats()["reserved"] == 1
+
+    def test_instance_rate_limits_handshakes(self):
+        """Test the instance bucket sheds handshakes beyond its burst."""
+        admission = controller(instance_rate=1, instance_burst=2)
+
+        admission.check_instance(0)
+        admission.check_instance(0)
+        with pytest.raises(AdmissionRejected, match="instance_rate"):
+            admission.check_instance(0)
+
+    def test_tenant_buckets_are_independent(self):
+        """Test one tenant's storm does not consume another tenant's budget."""
+        admission = controller(tenant_rate=1, tenant_burst=1)
+
+        admission.check_tenant("noisy")
+        with pytest.raises(AdmissionRejected, match="tenant_rate"):
+            admission.check_tenant("noisy")
+        admission.check_tenant("quiet")
+
+        assert admission.total_admitted == 2
+
+    def test_retry_hints_are_spread(self):
+        """Test rejected clients are told to come back at different times."""
+        admission = controller(max_connections=0, retry_jitter=10.0)
+        hints = set()
+
+        for _ in range(20):
+            with pytest.raises(AdmissionRejected) as rejected:
+                admission.check_instance(0)
+            hints.add(round(rejected.value.retry_after, 3))
+
+        assert len(hints) > 1
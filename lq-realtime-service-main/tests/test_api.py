@@ -2,8 +2,20 @@
 Tests for API endpoints.
 """
 
+import hashlib
+import hmac
+from unittest.mock import AsyncMock, patch
+
 from fastapi import status
 
+from app import webhooks
+from app.config import get_settings
+from app.drain import Drainer
+from app.schemas import WebhookProvider, WebhookRegistration
+from app.websocket_handler import connection_manager
+
+settings = get_settings()
+
 
 class TestHealthCheck:
     """Tests for health check endpoint."""
@@ -17,6 +29,51 @@ class TestHealthCheck:
         assert "status" in data
         assert "version" in data
         assert "active_connections" in data
+        assert data["pubsub_listener"] == "listening"
+
+    def test_health_check_fails_while_listener_reconnects(self, client, mock_redis):
+        """Test readiness fails while the pub/sub listener is down."""
+        mock_redis.get_listener_stats.return_value = {
+            "state": "reconnecting",
+            "healthy": False,
+            "last_message_age_seconds": 42.0,
+            "total_listener_errors": 3,
+            "total_reconnects": 0,
+        }
+
+        response = client.get("/health")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        data = response.json()
+        assert data["status"] == "unhealthy"
+        assert data["pubsub_listener"] == "reconnecting"
+        assert data["pubsub_last_message_age_seconds"] == 42.0
+
+
+class TestDrain:
+    """Tests for the drain endpoint and readiness while draining."""
+
+    def test_drain_requires_api_key(self, client):
+        """Test the drain endpoint rejects a wrong API key."""
+        response = client.post("/api/admin/drain", headers={"x-api-key": "wrong"})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_drain_fails_readiness(self, client):
+        """Test draining starts once and makes /health return 503."""
+        drainer = Drainer(window=0, list_connections=list, close=AsyncMock())
+
+        with patch.object(connection_manager, "drainer", drainer):
+            headers = {"x-api-key": settings.system_api_key}
+            first = client.post("/api/admin/drain", headers=headers)
+            second = client.post("/api/admin/drain", headers=headers)
+            health = client.get("/health")
+
+        assert first.status_code == status.HTTP_202_ACCEPTED
+        assert first.json()["success"] is True
+        assert second.json()["success"] is False
+        assert health.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert health.json()["status"] == "draining"
 
 
 class TestRootEndpoint:
@@ -48,6 +105,26 @@ class TestMetrics:
         assert "uptime_seconds" in data
         assert "memory_usage_mb" in data
 
+    def test_metrics_prometheus_format(self, client):
+        """Test ?format=prometheus returns the text exposition format."""
+        response = client.get("/metrics", params={"format": "prometheus"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE realtime_connections_opened_total counter" in response.text
+        assert "# TYPE realtime_fanout_duration_seconds histogram" in response.text
+        assert "realtime_active_connections 0" in response.text
+        assert "process_resident_memory_bytes" in response.text
+
+    def test_metrics_prometheus_accept_header(self, client):
+        """Test a scraper's Accept header selects the text format."""
+        response = client.get(
+            "/metrics", headers={"Accept": "text/plain;version=0.0.4;q=0.9,*/*;q=0.1"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text.startswith("# HELP")
+
 
 class TestWebhooks:
     """Tests for webhook endpoints."""
@@ -87,6 +164,92 @@ class TestWebhooks:
 
         assert response.status_code == status.HTTP_200_OK
 
+    def test_webhook_duplicate_delivery(self, client, mock_redis, webhook_payload):
+        """Test a redelivered GitHub webhook is acknowledged without queueing."""
+        mock_redis.redis.set.return_value = None
+
+        response = client.post(
+            "/webhooks/github",
+            json=webhook_payload,
+            headers={"x-tenant-id": "test-tenant-456", "x-github-delivery": "abc-123"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "duplicate"
+        mock_redis.redis.xadd.assert_not_called()
+
+    def test_webhook_queue_unavailable(self, client, mock_redis, webhook_payload):
+        """Test the provider gets a 503 (and retries) when the delivery cannot be stored."""
+        mock_redis.redis.xadd.side_effect = ConnectionError("down")
+
+        response = client.post("/webhooks/custom", json=webhook_payload)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def test_dead_letters(self, client, mock_redis):
+        """Test dead-lettered deliveries can be inspected with the system API key."""
+        mock_redis.redis.xrevrange.return_value = [
+            (
+                b"9-0",
+                {
+                    b"provider": b"stripe",
+                    b"body": b'{"id":"evt_1"}',
+                    b"tenant_id": b"t1",
+                    b"attempts": b"4",
+                    b"error": b"timeout",
+                    b"failed_at": b"1700000000.5",
+                },
+            )
+        ]
+
+        response = client.get(
+            "/api/admin/webhooks/dead-letters", headers={"x-api-key": settings.system_api_key}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        (entry,) = response.json()["entries"]
+        assert entry["id"] == "9-0"
+        assert entry["attempts"] == 4
+        assert entry["body"] == '{"id":"evt_1"}'
+
+    def test_webhook_body_too_large(self, client, mock_redis):
+        """Test an oversized webhook body is refused with 413 and not queued."""
+        with patch.object(webhooks.settings, "webhook_max_body_size", 64):
+            response = client.post("/webhooks/custom", content=b'{"data": "' + b"x" * 100 + b'"}')
+
+        assert response.status_code == status.HTTP_413_CONTENT_TOO_LARGE
+        mock_redis.redis.xadd.assert_not_called()
+
+    def test_webhook_signature_streamed(self, client, mock_redis):
+        """Test the signature is verified whether the tenant comes from a header or the body."""
+        body = b'{"type": "charge.succeeded", "tenant_id": "t-sig"}'
+        signature = "sha256=" + hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+        registration = WebhookRegistration(
+            provider=WebhookProvider.STRIPE, tenant_id="t-sig", secret="s3cret"
+        )
+
+        with patch.dict(
+            webhooks.webhook_registry._registrations, {"stripe": {"t-sig": registration}}
+        ):
+            from_header = client.post(
+                "/webhooks/stripe",
+                content=body,
+                headers={"x-signature": signature, "x-tenant-id": "t-sig"},
+            )
+            from_body = client.post(
+                "/webhooks/stripe", content=body, headers={"x-signature": signature}
+            )
+            forged = client.post(
+                "/webhooks/stripe",
+                content=body.replace(b"succeeded", b"refunded"),
+                headers={"x-signature": signature, "x-tenant-id": "t-sig"},
+            )
+
+        assert from_header.status_code == status.HTTP_200_OK
+        assert from_body.status_code == status.HTTP_200_OK
+        assert forged.status_code == status.HTTP_401_UNAUTHORIZED
+        assert mock_redis.redis.xadd.call_args.args[1]["body"] == body
+
     def test_webhook_invalid_json(self, client):
         """Test webhook with invalid JSON returns 400."""
         response = client.post(
@@ -96,3 +259,96 @@ class TestWebhooks:
         )
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestMessagesAPI:
+    """Tests for targeted message endpoints."""
+
+    def test_send_user_message(self, client, mock_redis):
+        """Test user messages are routed through the batch publisher."""
+        mock_redis.redis.pipeline.return_value.execute.return_value = [[b"pod-b"]]
+        mock_redis.publish_many.return_value = [1]
+
+        response = client.post(
+            "/api/messages/user/user-1",
+            json={"payload": {"text": "hello"}},
+            headers={"x-api-key": settings.system_api_key},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["subscribers_reached"] == 1
+        ((channel, _),) = mock_redis.publish_many.call_args.args[0]
+        assert channel == "instance:pod-b"
+
+    def test_send_room_message(self, client, mock_redis):
+        """Test room messages are published to the room channel."""
+        response = client.post(
+            "/api/messages/room/room-1",
+            json={"payload": {"text": "hello"}},
+            headers={"x-api-key": settings.system_api_key},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        ((channel, _),) = mock_redis.publish_many.call_args.args[0]
+        assert channel == "room:room-1"
+
+    def test_send_message_requires_api_key(self, client):
+        """Test targeted messages reject an invalid API key."""
+        response = client.post(
+            "/api/messages/tenant/tenant-1",
+            json={"payload": {"text": "hello"}},
+            headers={"x-api-key": "wrong"},
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_send_batch(self, client, mock_redis):
+        """Test batches publish every message in one pipeline."""
+        mock_redis.publish_many.return_value = [2, 1]
+
+        response = client.post(
+            "/api/messages/batch",
+            json={
+                "messages": [
+                    {"target": "tenant", "target_id": "tenant-1", "payload": {"n": 1}},
+                    {"target": "room", "target_id": "room-1", "payload": {"n": 2}},
+                ]
+            },
+            headers={"x-api-key": settings.system_api_key},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["messages_accepted"] == 2
+        assert data["subscribers_reached"] == 3
+        mock_redis.publish_many.assert_awaited_once()
+
+    def test_send_message_rejects_control_frames(self, client, mock_redis):
+        """Test protocol frame types cannot be injected into client streams."""
+        for message_type in ("ping", "subscribe", "batch"):
+            response = client.post(
+                "/api/messages/tenant/tenant-1",
+                json={"message_type": message_type, "payload": {"text": "hello"}},
+                headers={"x-api-key": settings.system_api_key},
+            )
+
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = client.post(
+            "/api/messages/batch",
+            json={
+                "messages": [
+                    {"target": "room", "target_id": "room-1", "payload": {"n": 1}},
+                    {
+                        "target": "room",
+                        "target_id": "room-1",
+                        "message_type": "pong",
+                        "payload": {"n": 2},
+                    },
+                ]
+            },
+            headers={"x-api-key": settings.system_api_key},
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        mock_redis.publish_many.assert_not_called()
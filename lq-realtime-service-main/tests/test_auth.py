@@ -2,16 +2,69 @@
 Tests for authentication module.
 """
 
+import json
+import os
+import time
+from unittest.mock import patch
+
+import jwt
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
 
 from app.auth import (
     AuthenticationError,
     JWTManager,
+    KeyStore,
+    VerifiedTokenCache,
     verify_webhook_signature,
 )
 from app.schemas import TokenPayload
 
 
+def pem(private_key, public: bool = False) -> str:
+    """Serialize a generated key to PEM text."""
+    if public:
+        return (
+            private_key.public_key()
+            .public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+            .decode()
+        )
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def write_jwks(path, keys: dict, algorithm: str = "ES256"):
+    """Write a JWKS file holding the public halves of {kid: private_key}."""
+    implementation = jwt.algorithms.get_default_algorithms()[algorithm]
+    document = {"keys": []}
+    for kid, private_key in keys.items():
+        jwk = json.loads(implementation.to_jwk(private_key.public_key()))
+        jwk.update({"kid": kid, "alg": algorithm})
+        document["keys"].append(jwk)
+    path.write_text(json.dumps(document))
+    # Guarantee a new mtime even on coarse-grained filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def mint(private_key, kid: str, algorithm: str = "ES256", **claims) -> str:
+    """Mint a ws:connect token signed with the given key."""
+    payload = {
+        "sub": "user123",
+        "tenant_id": "tenant456",
+        "scope": "ws:connect",
+        "exp": int(time.time()) + 300,
+        **claims,
+    }
+    return jwt.encode(payload, private_key, algorithm=algorithm, headers={"kid": kid})
+
+
 class TestJWTManager:
     """Tests for JWTManager class."""
 
@@ -113,6 +166,136 @@ class TestJWTManager:
             jwt_manager.verify_scope(payload, "admin:write")
 
 
+class TestAsymmetricKeys:
+    """Tests for RS256/ES256 verification and JWKS rotation."""
+
+    def test_rs256_public_key_round_trip(self):
+        """Test tokens minted with the private key verify against the public key."""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        keys = KeyStore(
+            "RS256", public_key=pem(private_key, public=True), private_key=pem(private_key)
+        )
+        manager = JWTManager(keys)
+
+        payload = manager.decode_token(manager.create_access_token("user123", "tenant456"))
+
+        assert payload.sub == "user123"
+
+    def test_rs256_rejects_hs256_token(self):
+        """Test an HMAC token cannot pass as an RS256 one."""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        manager = JWTManager(KeyStore("RS256", public_key=pem(private_key, public=True)))
+        forged = jwt.encode(
+            {"sub": "u", "tenant_id": "t", "exp": int(time.time()) + 60},
+            "x" * 32,
+            algorithm="HS256",
+        )
+
+        with pytest.raises(AuthenticationError):
+            manager.decode_token(forged)
+
+    def test_minting_without_private_key_fails(self):
+        """Test an asymmetric key store without a private key cannot mint."""
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        manager = JWTManager(KeyStore("ES256", public_key=pem(private_key, public=True)))
+
+        with pytest.raises(AuthenticationError, match="No private key"):
+            manager.create_access_token("user123", "tenant456")
+
+    def test_jwks_selects_key_by_kid(self, tmp_path):
+        """Test each token is verified with the JWKS key named by its kid."""
+        first, second = (
+            ec.generate_private_key(ec.SECP256R1()),
+            ec.generate_private_key(ec.SECP256R1()),
+        )
+        jwks_file = tmp_path / "jwks.json"
+        write_jwks(jwks_file, {"k1": first, "k2": second})
+        manager = JWTManager(KeyStore("ES256", jwks_file=str(jwks_file)))
+
+        assert manager.decode_token(mint(first, "k1")).sub == "user123"
+        assert manager.decode_token(mint(second, "k2")).sub == "user123"
+        with pytest.raises(AuthenticationError, match="Unknown signing key"):
+            manager.decode_token(mint(first, "k3"))
+
+    def test_jwks_rotation_picks_up_new_keys_and_drops_cache(self, tmp_path):
+        """Test replacing the JWKS file rotates keys and invalidates cached tokens."""
+        old, new = ec.generate_private_key(ec.SECP256R1()), ec.generate_private_key(ec.SECP256R1())
+        jwks_file = tmp_path / "jwks.json"
+        write_jwks(jwks_file, {"old": old})
+        manager = JWTManager(KeyStore("ES256", jwks_file=str(jwks_file), refresh_interval=0))
+        old_token = mint(old, "old")
+        manager.decode_token(old_token)
+
+        write_jwks(jwks_file, {"new": new})
+
+        assert manager.decode_token(mint(new, "new")).sub == "user123"
+        with pytest.raises(AuthenticationError):
+            manager.decode_token(old_token)
+
+
+class TestVerifiedTokenCache:
+    """Tests for the verified-token LRU."""
+
+    def test_repeat_tokens_skip_signature_check(self):
+        """Test a token presented again is served from the cache."""
+        manager = JWTManager(cache_size=10)
+        token = manager.create_access_token("user123", "tenant456")
+        manager.decode_token(token)
+
+        with patch("app.auth.jwt.decode") as decode:
+            payload = manager.decode_token(token)
+
+        decode.assert_not_called()
+        assert payload.sub == "user123"
+        assert manager.cache.hits == 1
+
+    def test_expired_entries_are_not_served(self):
+        """Test a cached token is re-verified once its exp has passed."""
+        cache = VerifiedTokenCache(maxsize=10)
+        payload = TokenPayload(sub="u", tenant_id="t", exp=int(time.time()) - 1)
+        cache.put("token", payload)
+
+        assert cache.get("token") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays bounded and keeps recently used tokens."""
+        cache = VerifiedTokenCache(maxsize=2)
+        payload = TokenPayload(sub="u", tenant_id="t", exp=int(time.time()) + 60)
+        cache.put("a", payload)
+        cache.put("b", payload)
+        cache.get("a")
+        cache.put("c", payload)
+
+        assert cache.get("a") == payload
+        assert cache.get("b") is None
+        assert cache.get("c") == payload
+
+    def test_hits_do_not_share_metadata(self):
+        """Test mutating one connection's payload does not leak to the next."""
+        manager = JWTManager(cache_size=10)
+        token = manager.create_access_token(
+            "user123", "tenant456", additional_claims={"metadata": {"role": "viewer"}}
+        )
+
+        first = manager.decode_token(token)
+        first.metadata["role"] = "admin"
+        second = manager.decode_token(token)
+        second.metadata["extra"] = True
+
+        assert manager.cache.hits == 1
+        assert manager.decode_token(token).metadata == {"role": "viewer"}
+
+    def test_rejected_tokens_are_not_cached(self):
+        """Test failed verifications are not remembered."""
+        manager = JWTManager(cache_size=10)
+
+        with pytest.raises(AuthenticationError):
+            manager.decode_token("invalid.token.here")
+
+        assert len(manager.cache) == 0
+
+
 class TestWebhookSignature:
     """Tests for webhook signature verification."""
 
@@ -0,0 +1,168 @@
+"""
+Tests for cluster statistics.
+"""
+
+import time
+from unittest.mock import AsyncMock
+
+import orjson
+import pytest
+from fakeredis.aioredis import FakeRedis
+from fastapi import status
+
+from app.cluster_stats import ClusterStats
+from app.config import get_settings
+from app.redis_client import get_cluster_stats_key, get_instance_stats_key
+
+settings = get_settings()
+
+
+def snapshot(connections: int = 3, sent: int = 0, tenants: dict | None = None) -> dict:
+    """Build an instance snapshot as ConnectionManager.get_instance_snapshot does."""
+    return {
+        "active_connections": connections,
+        "unique_users": connections,
+        "tenants": tenants if tenants is not None else {"t1": connections},
+        "outbound_queue_depth": 1,
+        "outbound_queue_max_depth": 1,
+        "total_messages_sent": sent,
+        "total_messages_received": 0,
+        "draining": False,
+    }
+
+
+def heartbeat(instance_id: str, age: float, **kwargs) -> bytes:
+    """Encode a stored heartbeat entry written ``age`` seconds ago."""
+    entry = {**snapshot(**kwargs), "instance_id": instance_id, "reported_at": time.time() - age}
+    entry.pop("total_messages_sent")
+    entry.pop("total_messages_received")
+    return orjson.dumps({**entry, "send_rate": 10.0, "receive_rate": 1.0})
+
+
+class TestClusterStats:
+    """Tests for ClusterStats."""
+
+    def test_report_computes_rates(self):
+        """Test send rates are derived from the totals of consecutive reports."""
+        totals = iter([100, 400])
+        stats = ClusterStats(
+            instance_id="pod-a",
+            interval=10,
+            stale_after=30,
+            snapshot=lambda: snapshot(sent=next(totals)),
+        )
+
+        first = stats.build_report(now=1000.0)
+        second = stats.build_report(now=1010.0)
+
+        assert first["send_rate"] == 0.0
+        assert second["send_rate"] == 30.0
+        assert second["instance_id"] == "pod-a"
+        assert "total_messages_sent" not in second
+
+    @pytest.mark.asyncio
+    async def test_report_writes_own_key(self, mock_redis):
+        """Test the heartbeat is stored under this instance's expiring key and indexed."""
+        pipe = mock_redis.redis.pipeline.return_value
+        stats = ClusterStats(instance_id="pod-a", interval=10, stale_after=30, snapshot=snapshot)
+
+        await stats.report()
+
+        (key, value), options = pipe.set.call_args
+        assert key == get_instance_stats_key("pod-a")
+        assert options == {"ex": 30}
+        assert orjson.loads(value)["tenants"] == {"t1": 3}
+        key, scores = pipe.zadd.call_args.args
+        assert key == get_cluster_stats_key()
+        assert list(scores) == ["pod-a"]
+
+    @pytest.mark.asyncio
+    async def test_collect_merges_and_expires(self, mock_redis):
+        """Test live heartbeats are merged and stale index entries are pruned by score."""
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.execute = AsyncMock(return_value=[2, [b"pod-a", b"pod-b", b"pod-d", b"pod-e"]])
+        mock_redis.redis.mget = AsyncMock(
+            return_value=[
+                heartbeat("pod-a", 2, connections=3, tenants={"t1": 2, "t2": 1}),
+                heartbeat("pod-b", 5, connections=5, tenants={"t1": 5}),
+                b"not json",
+                None,
+            ]
+        )
+        stats = ClusterStats(instance_id="pod-a", interval=10, stale_after=30, snapshot=snapshot)
+
+        merged = await stats.collect(tenant_limit=1)
+
+        assert merged["total_instances"] == 2
+        assert merged["total_connections"] == 8
+        assert merged["total_tenants"] == 2
+        assert merged["send_rate"] == 20.0
+        assert merged["tenants"] == {"t1": 7}
+        assert [entry["instance_id"] for entry in merged["instances"]] == ["pod-b", "pod-a"]
+        assert merged["instances"][1]["unique_tenants"] == 2
+        key, low, high = pipe.zremrangebyscore.call_args.args
+        assert (key, low) == (get_cluster_stats_key(), "-inf")
+        assert time.time() - 31 < high < time.time() - 29
+        assert merged["stale_instances_removed"] == 2
+        assert stats.get_stats()["total_stale_removed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_collect_keeps_concurrent_reports(self, mock_redis):
+        """Test pruning on a real Redis only drops entries whose last report is stale."""
+        mock_redis.redis = FakeRedis()
+        reporter_a = ClusterStats(
+            instance_id="pod-a", interval=10, stale_after=30, snapshot=snapshot
+        )
+        reporter_b = ClusterStats(
+            instance_id="pod-b", interval=10, stale_after=30, snapshot=snapshot
+        )
+        await reporter_a.report()
+        # pod-b's previous report is stale; it reports again before a reader prunes
+        await mock_redis.redis.zadd(get_cluster_stats_key(), {"pod-b": time.time() - 120})
+        await reporter_b.report()
+        await mock_redis.redis.zadd(get_cluster_stats_key(), {"pod-c": time.time() - 120})
+
+        merged = await reporter_a.collect()
+
+        assert sorted(e["instance_id"] for e in merged["instances"]) == ["pod-a", "pod-b"]
+        assert merged["stale_instances_removed"] == 1
+        assert await mock_redis.redis.zrange(get_cluster_stats_key(), 0, -1) == [
+            b"pod-a",
+            b"pod-b",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stop_removes_entry(self, mock_redis):
+        """Test a clean shutdown deletes this instance's heartbeat."""
+        stats = ClusterStats(instance_id="pod-a", interval=10, stale_after=30, snapshot=snapshot)
+        stats.start()
+
+        await stats.stop()
+
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.zrem.assert_called_once_with(get_cluster_stats_key(), "pod-a")
+        pipe.delete.assert_called_once_with(get_instance_stats_key("pod-a"))
+
+
+class TestClusterStatsAPI:
+    """Tests for the /stats/cluster endpoint."""
+
+    def test_requires_api_key(self, client):
+        """Test cluster stats are not served without the system API key."""
+        response = client.get("/stats/cluster", headers={"x-api-key": "wrong"})
+
+        assert response.status_code != status.HTTP_200_OK
+
+    def test_cluster_stats(self, client, mock_redis):
+        """Test the endpoint merges the stored heartbeats."""
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.execute = AsyncMock(return_value=[0, [b"pod-a"]])
+        mock_redis.redis.mget = AsyncMock(return_value=[heartbeat("pod-a", 1, connections=4)])
+
+        response = client.get("/stats/cluster", headers={"x-api-key": settings.system_api_key})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total_connections"] == 4
+        assert data["instances"][0]["instance_id"] == "pod-a"
+        assert data["tenants"] == {"t1": 4}
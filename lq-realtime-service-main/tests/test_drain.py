@@ -0,0 +1,114 @@
+"""
+Tests for connection draining.
+"""
+
+import asyncio
+import os
+import signal
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import uvicorn
+
+from app.drain import Drainer
+
+
+def make_drainer(connection_ids, window: float = 0.0):
+    """Drainer over a fixed list of connections that records closes."""
+    closed = []
+
+    async def close(connection_id):
+        closed.append((connection_id, time.monotonic()))
+
+    drainer = Drainer(window=window, list_connections=lambda: list(connection_ids), close=close)
+    return drainer, closed
+
+
+class TestDrainer:
+    """Tests for Drainer class."""
+
+    @pytest.mark.asyncio
+    async def test_closes_every_connection(self):
+        """Test a drain closes all connections open when it started."""
+        drainer, closed = make_drainer([f"conn-{i}" for i in range(50)])
+
+        assert drainer.start() is True
+        await drainer.wait()
+
+        assert sorted(cid for cid, _ in closed) == sorted(f"conn-{i}" for i in range(50))
+        assert drainer.get_stats()["total_drained"] == 50
+        assert drainer.draining is True
+
+    @pytest.mark.asyncio
+    async def test_spreads_closes_over_window(self):
+        """Test closes are spread over the drain window instead of all at once."""
+        drainer, closed = make_drainer([f"conn-{i}" for i in range(20)], window=0.3)
+
+        started = time.monotonic()
+        drainer.start()
+        await drainer.wait()
+
+        first, last = closed[0][1] - started, closed[-1][1] - started
+        assert first < 0.05
+        assert last >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_start_is_idempotent_and_notifies_late_callers(self):
+        """Test a second start joins the running drain."""
+        drainer, _ = make_drainer(["conn-1"], window=0.1)
+        first_done, second_done = MagicMock(), MagicMock()
+
+        assert drainer.start(first_done) is True
+        assert drainer.start(second_done) is False
+        await drainer.wait()
+        await asyncio.sleep(0)
+
+        first_done.assert_called_once()
+        second_done.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_sigterm_drains_before_chaining(self):
+        """Test SIGTERM drains first and then calls the previous handler."""
+        drainer, closed = make_drainer(["conn-1", "conn-2"])
+        chained = []
+
+        def previous(signum, frame):
+            chained.append((signum, len(closed)))
+
+        original = signal.signal(signal.SIGTERM, previous)
+        try:
+            drainer.install_signal_handler()
+            handler = signal.getsignal(signal.SIGTERM)
+
+            handler(signal.SIGTERM, None)
+            await asyncio.sleep(0)
+            await drainer.wait()
+            await asyncio.sleep(0)
+        finally:
+            signal.signal(signal.SIGTERM, original)
+
+        assert chained == [(signal.SIGTERM, 2)]
+
+    @pytest.mark.asyncio
+    async def test_sigterm_drains_before_uvicorn_exits(self):
+        """Test uvicorn's exit handler only runs once the drain has finished."""
+        drainer, _ = make_drainer(["conn-1", "conn-2"], window=0.5)
+        server = uvicorn.Server(uvicorn.Config(app=None))
+
+        # uvicorn re-raises captured signals on exit; keep the test process alive
+        original = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+        try:
+            with server.capture_signals():
+                drainer.install_signal_handler()
+
+                os.kill(os.getpid(), signal.SIGTERM)
+                await asyncio.sleep(0.01)
+                assert drainer.draining is True
+                assert server.should_exit is False
+
+                await drainer.wait()
+                await asyncio.sleep(0)
+                assert server.should_exit is True
+        finally:
+            signal.signal(signal.SIGTERM, original)
@@ -0,0 +1,105 @@
+"""
+Tests for per-connection frame encodings.
+"""
+
+import zlib
+from unittest.mock import patch
+
+import orjson
+import pytest
+
+from app.encoding import Encoding, Frame, decode_inbound, deflate, negotiate_encoding, settings
+from app.utils.metrics import frames_encoded
+
+
+def inflate(data: bytes) -> bytes:
+    """Decompress a raw deflate payload the way a browser client would."""
+    return zlib.decompress(data, -zlib.MAX_WBITS)
+
+
+class TestNegotiation:
+    """Tests for encoding negotiation."""
+
+    def test_defaults_to_json(self):
+        """Test clients that ask for nothing get JSON text."""
+        assert negotiate_encoding([], None) == (Encoding.JSON, None)
+
+    def test_subprotocol_wins_and_is_echoed(self):
+        """Test the first supported subprotocol is selected over the query parameter."""
+        encoding, subprotocol = negotiate_encoding(["chat.v2", "json+deflate", "json"], "json")
+
+        assert encoding == Encoding.JSON_DEFLATE
+        assert subprotocol == "json+deflate"
+
+    def test_query_parameter(self):
+        """Test the query parameter is used when no subprotocol matches."""
+        assert negotiate_encoding(["chat.v2"], "json+deflate") == (Encoding.JSON_DEFLATE, None)
+
+    def test_unknown_falls_back_to_json(self):
+        """Test unknown encodings fall back to JSON text."""
+        assert negotiate_encoding([], "xml") == (Encoding.JSON, None)
+
+    def test_msgpack_unavailable_falls_back(self):
+        """Test MessagePack is not offered when the package is missing."""
+        with patch("app.encoding.msgpack", None):
+            assert negotiate_encoding(["msgpack"], "msgpack") == (Encoding.JSON, None)
+
+
+class TestFrame:
+    """Tests for shared frame encoding."""
+
+    def test_json_is_text(self):
+        """Test JSON frames are sent as text unchanged."""
+        frame = Frame(b'{"type":"message"}')
+
+        assert frame.encode(Encoding.JSON) == '{"type":"message"}'
+
+    def test_deflate_roundtrip(self):
+        """Test large frames are deflated into binary frames."""
+        data = orjson.dumps({"type": "notification", "payload": {"items": ["x" * 20] * 50}})
+        encoded = Frame(data).encode(Encoding.JSON_DEFLATE)
+
+        assert isinstance(encoded, bytes)
+        assert len(encoded) < len(data)
+        assert inflate(encoded) == data
+
+    def test_small_deflate_frame_stays_text(self):
+        """Test frames below the deflate threshold are sent as plain text."""
+        with patch.object(settings, "ws_deflate_min_size", 1024):
+            assert Frame('{"type":"ping"}').encode(Encoding.JSON_DEFLATE) == '{"type":"ping"}'
+
+    def test_encoded_once_per_encoding(self):
+        """Test every recipient of an encoding reuses the first encoding's result."""
+        frame = Frame(orjson.dumps({"payload": "y" * 1000}))
+        before = frames_encoded.value("json+deflate")
+
+        first = frame.encode(Encoding.JSON_DEFLATE)
+        assert all(frame.encode(Encoding.JSON_DEFLATE) is first for _ in range(100))
+        assert frames_encoded.value("json+deflate") == before + 1
+
+    def test_msgpack(self):
+        """Test MessagePack frames decode to the same message."""
+        msgpack = pytest.importorskip("msgpack")
+        encoded = Frame(b'{"type":"message","payload":{"n":1}}').encode(Encoding.MSGPACK)
+
+        assert msgpack.unpackb(encoded) == {"type": "message", "payload": {"n": 1}}
+
+
+class TestDecodeInbound:
+    """Tests for binary client frames."""
+
+    def test_deflated_json(self):
+        """Test deflated client frames are inflated and parsed."""
+        data = deflate(b'{"type":"ping"}')
+
+        assert decode_inbound(Encoding.JSON_DEFLATE, data) == {"type": "ping"}
+
+    def test_inflate_is_bounded(self):
+        """Test a frame that inflates beyond the message size limit is refused."""
+        data = deflate(b'{"a":"' + b"0" * 100_000 + b'"}')
+
+        with (
+            patch.object(settings, "ws_message_max_size", 1024),
+            pytest.raises(ValueError, match="too large"),
+        ):
+            decode_inbound(Encoding.JSON_DEFLATE, data)
@@ -0,0 +1,95 @@
+"""
+Tests for the Redis Streams event log.
+"""
+
+import orjson
+import pytest
+
+from app.event_log import EventLog, parse_event_id, with_event_id
+from app.schemas import WSMessage, WSMessageType
+
+
+def make_log(replay_limit: int = 10) -> EventLog:
+    """Create an enabled event log."""
+    return EventLog(enabled=True, maxlen=100, ttl=60, replay_limit=replay_limit)
+
+
+def frame(n: int) -> bytes:
+    """Encode a numbered message frame."""
+    return WSMessage(type=WSMessageType.NOTIFICATION, payload={"n": n}).encode()
+
+
+class TestEventIds:
+    """Tests for event ID helpers."""
+
+    def test_parse_event_id(self):
+        """Test stream IDs parse into comparable tuples."""
+        assert parse_event_id("1700000000000-2") == (1700000000000, 2)
+        assert parse_event_id("1700000000000") == (1700000000000, 0)
+        assert parse_event_id("not-an-id") is None
+
+    def test_with_event_id_splices_encoded_frame(self):
+        """Test the event ID is stamped without changing other fields."""
+        stamped = with_event_id(frame(1), "1-0")
+
+        data = orjson.loads(stamped)
+        assert data["event_id"] == "1-0"
+        assert data["payload"] == {"n": 1}
+
+
+class TestEventLog:
+    """Tests for EventLog class."""
+
+    @pytest.mark.asyncio
+    async def test_append_many_returns_ids(self, mock_redis):
+        """Test appends return the stream IDs assigned to each frame."""
+        mock_redis.redis.pipeline.return_value.execute.return_value = [b"1-0", 1, b"2-0", 1]
+
+        event_ids = await make_log().append_many(
+            [("stream:tenant:t1", frame(1)), ("stream:user:u1", frame(2))]
+        )
+
+        assert event_ids == ["1-0", "2-0"]
+        pipe = mock_redis.redis.pipeline.return_value
+        assert pipe.xadd.call_args.kwargs == {"maxlen": 100, "approximate": True}
+
+    @pytest.mark.asyncio
+    async def test_replay_merges_streams_in_id_order(self, mock_redis):
+        """Test entries from tenant and user streams are merged by ID."""
+        mock_redis.redis.pipeline.return_value.execute.return_value = [
+            [(b"3-0", {b"f": frame(3)}), (b"5-0", {b"f": frame(5)})],
+            {"max-deleted-entry-id": b"0-0"},
+            [(b"4-0", {b"f": frame(4)})],
+            Exception("no such key"),
+        ]
+
+        frames, complete = await make_log().replay(["stream:tenant:t1", "stream:user:u1"], "2-0")
+
+        assert [orjson.loads(f)["event_id"] for f in frames] == ["3-0", "4-0", "5-0"]
+        assert complete
+
+    @pytest.mark.asyncio
+    async def test_replay_reports_trimmed_gap(self, mock_redis):
+        """Test a gap older than the retained entries is reported as incomplete."""
+        mock_redis.redis.pipeline.return_value.execute.return_value = [
+            [(b"9-0", {b"f": frame(9)})],
+            {"max-deleted-entry-id": b"8-0"},
+        ]
+
+        frames, complete = await make_log().replay(["stream:tenant:t1"], "2-0")
+
+        assert len(frames) == 1
+        assert not complete
+
+    @pytest.mark.asyncio
+    async def test_replay_limit_keeps_oldest(self, mock_redis):
+        """Test an oversized gap is cut at the limit, oldest first."""
+        mock_redis.redis.pipeline.return_value.execute.return_value = [
+            [(f"{n}-0".encode(), {b"f": frame(n)}) for n in range(3, 6)],
+            {},
+        ]
+
+        frames, complete = await make_log(replay_limit=2).replay(["stream:tenant:t1"], "2-0")
+
+        assert [orjson.loads(f)["event_id"] for f in frames] == ["3-0", "4-0"]
+        assert not complete
@@ -0,0 +1,106 @@
+"""
+Tests for the fanout engine.
+"""
+
+import asyncio
+
+import pytest
+
+from app.fanout import FanoutEngine
+from app.utils.metrics import percentile
+
+
+class TestFanoutEngine:
+    """Tests for FanoutEngine class."""
+
+    @pytest.mark.asyncio
+    async def test_delivers_to_all_connections(self):
+        """Test every target connection receives the message."""
+        engine = FanoutEngine(concurrency=8, send_timeout=1.0, yield_every=4)
+        delivered = []
+
+        async def send(connection_id):
+            delivered.append(connection_id)
+
+        result = await engine.fanout([f"conn-{i}" for i in range(100)], send)
+
+        assert sorted(delivered) == sorted(f"conn-{i}" for i in range(100))
+        assert result["recipients"] == 100
+        assert result["delivered"] == 100
+        assert result["failed"] == []
+        assert result["timed_out"] == []
+
+    @pytest.mark.asyncio
+    async def test_respects_concurrency_cap(self):
+        """Test no more than `concurrency` sends are in flight at once."""
+        engine = FanoutEngine(concurrency=5, send_timeout=1.0, yield_every=64)
+        in_flight = 0
+        peak = 0
+
+        async def send(connection_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+
+        await engine.fanout([f"conn-{i}" for i in range(50)], send)
+
+        assert peak == 5
+
+    @pytest.mark.asyncio
+    async def test_slow_connection_does_not_block_others(self):
+        """Test a stalled socket times out without delaying other recipients."""
+        engine = FanoutEngine(concurrency=4, send_timeout=0.05, yield_every=64)
+        delivered = []
+
+        async def send(connection_id):
+            if connection_id == "slow":
+                await asyncio.sleep(10)
+            delivered.append(connection_id)
+
+        result = await engine.fanout(["slow", "a", "b", "c"], send)
+
+        assert result["timed_out"] == ["slow"]
+        assert sorted(delivered) == ["a", "b", "c"]
+        assert engine.get_stats()["total_timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_sends_are_reported(self):
+        """Test sends that raise are reported as failed."""
+        engine = FanoutEngine(concurrency=2, send_timeout=1.0, yield_every=64)
+
+        async def send(connection_id):
+            if connection_id == "broken":
+                raise RuntimeError("socket closed")
+
+        result = await engine.fanout(["ok", "broken"], send)
+
+        assert result["failed"] == ["broken"]
+        assert result["delivered"] == 1
+
+    @pytest.mark.asyncio
+    async def test_empty_fanout(self):
+        """Test fanout to no connections is a no-op."""
+        engine = FanoutEngine(concurrency=2, send_timeout=1.0, yield_every=64)
+
+        result = await engine.fanout([], None)
+
+        assert result["recipients"] == 0
+        assert engine.get_stats()["total_broadcasts"] == 0
+
+
+class TestPercentile:
+    """Tests for percentile helper."""
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+
+    def test_percentile_empty(self):
+        """Test percentile of an empty sample."""
+        assert percentile([], 99) == 0.0
@@ -0,0 +1,93 @@
+"""
+Tests for the heartbeat reaper.
+"""
+
+import time
+
+import pytest
+
+from app.heartbeat import HeartbeatReaper
+from app.registry import ConnectionRecord
+
+
+def make_reaper(pings: list, reaped: list, interval=3.0, idle_timeout=9.0) -> HeartbeatReaper:
+    """Create a reaper recording pings and reaps."""
+
+    async def send_ping(connection_id):
+        pings.append(connection_id)
+
+    async def reap(connection_id):
+        reaped.append(connection_id)
+
+    return HeartbeatReaper(
+        interval=interval, idle_timeout=idle_timeout, tick=1.0, send_ping=send_ping, reap=reap
+    )
+
+
+def make_record(connection_id: str) -> ConnectionRecord:
+    """Create a connection record without a socket."""
+    return ConnectionRecord(connection_id, "user-1", "tenant-1", websocket=None)
+
+
+class TestHeartbeatReaper:
+    """Tests for HeartbeatReaper class."""
+
+    @pytest.mark.asyncio
+    async def test_each_connection_checked_once_per_interval(self):
+        """Test every tracked connection is visited once per lap of the wheel."""
+        pings, reaped = [], []
+        reaper = make_reaper(pings, reaped)
+        for i in range(9):
+            reaper.add(make_record(f"conn-{i}"))
+
+        later = time.monotonic() + 4
+        for _ in range(3):
+            await reaper.run_tick(now=later)
+
+        assert sorted(pings) == sorted(f"conn-{i}" for i in range(9))
+        assert reaped == []
+
+    @pytest.mark.asyncio
+    async def test_recent_traffic_skips_ping(self):
+        """Test a connection with recent inbound traffic is not pinged."""
+        pings, reaped = [], []
+        reaper = make_reaper(pings, reaped)
+        reaper.add(make_record("conn-1"))
+
+        for _ in range(3):
+            await reaper.run_tick()
+
+        assert pings == []
+
+    @pytest.mark.asyncio
+    async def test_silent_connection_reaped(self):
+        """Test connections silent past the idle timeout are reaped and untracked."""
+        pings, reaped = [], []
+        reaper = make_reaper(pings, reaped)
+        dead = make_record("dead")
+        reaper.add(dead)
+        reaper.add(make_record("alive"))
+        dead.last_seen -= 10
+
+        for _ in range(3):
+            await reaper.run_tick()
+
+        assert reaped == ["dead"]
+        assert dead.heartbeat_slot == -1
+        assert reaper.get_stats()["total_reaped"] == 1
+        assert reaper.get_stats()["tracked_connections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_touch_defers_reaping(self):
+        """Test inbound traffic resets the idle deadline."""
+        pings, reaped = [], []
+        reaper = make_reaper(pings, reaped)
+        record = make_record("conn-1")
+        reaper.add(record)
+        record.last_seen -= 10
+
+        record.touch()
+        for _ in range(3):
+            await reaper.run_tick()
+
+        assert reaped == []
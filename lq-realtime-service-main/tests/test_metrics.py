@@ -0,0 +1,97 @@
+"""
+Tests for metrics utilities.
+"""
+
+import asyncio
+import time
+
+from app.utils.metrics import MetricsCollector, MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Tests for MetricsRegistry and its instruments."""
+
+    def test_counter_renders_labelled_samples(self):
+        """Test counters render one sample per label combination."""
+        registry = MetricsRegistry()
+        counter = registry.counter("messages_total", "Messages", ["type"])
+        counter.inc("ping")
+        counter.inc("ping")
+        counter.inc("message", amount=3)
+
+        text = registry.render()
+
+        assert "# HELP messages_total Messages" in text
+        assert "# TYPE messages_total counter" in text
+        assert 'messages_total{type="message"} 3' in text
+        assert 'messages_total{type="ping"} 2' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets count observations at or below each bound."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.01, 0.1))
+        for value in (0.005, 0.01, 0.05, 0.5):
+            histogram.observe(value)
+
+        text = registry.render()
+
+        assert 'latency_seconds_bucket{le="0.01"} 2' in text
+        assert 'latency_seconds_bucket{le="0.1"} 3' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+        assert "latency_seconds_count 4" in text
+        assert "latency_seconds_sum 0.565" in text
+        assert histogram.count() == 4
+
+    def test_label_values_are_escaped(self):
+        """Test quotes and backslashes in label values are escaped."""
+        registry = MetricsRegistry()
+        registry.counter("errors_total", "Errors", ["reason"]).inc('bad "frame"\\')
+
+        assert 'errors_total{reason="bad \\"frame\\"\\\\"} 1' in registry.render()
+
+    def test_collectors_render_at_scrape_time(self):
+        """Test collector families are rendered and failing collectors are skipped."""
+        registry = MetricsRegistry()
+        value = {"depth": 1}
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.register_collector(broken)
+        registry.register_collector(
+            lambda: [("queue_depth", "gauge", "Depth", [({"queue": "a"}, value["depth"])])]
+        )
+        value["depth"] = 7
+
+        text = registry.render()
+
+        assert "# TYPE queue_depth gauge" in text
+        assert 'queue_depth{queue="a"} 7' in text
+
+
+class TestMetricsCollector:
+    """Tests for MetricsCollector class."""
+
+    def test_reads_are_served_from_cache(self):
+        """Test CPU and memory reads never touch psutil."""
+        collector = MetricsCollector(sample_interval=5.0)
+        collector.sample()
+
+        started = time.perf_counter()
+        for _ in range(100):
+            collector.get_metrics()
+        elapsed = time.perf_counter() - started
+
+        assert collector.get_memory_usage() > 0
+        assert elapsed < 0.05
+
+    async def test_background_sampling(self):
+        """Test the sampler refreshes stats periodically and stops cleanly."""
+        collector = MetricsCollector(sample_interval=0.01)
+        collector.start()
+        first = collector.last_sampled_at
+
+        await asyncio.sleep(0.05)
+        await collector.stop()
+
+        assert collector.last_sampled_at > first
@@ -0,0 +1,201 @@
+"""
+Tests for per-connection outbound queues.
+"""
+
+import asyncio
+
+import orjson
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.outbound import SLOW_CONSUMER_CLOSE_CODE, OutboundQueue, OverflowPolicy
+
+
+class BlockingWebSocket:
+    """WebSocket whose sends block until released."""
+
+    def __init__(self):
+        self.sent: list[str] = []
+        self.release = asyncio.Event()
+
+    async def send_text(self, data: str):
+        await self.release.wait()
+        self.sent.append(data)
+
+
+def make_queue(websocket, policy, maxsize=3, send_timeout=1.0, failures=None, **options):
+    """Create an outbound queue recording failure callbacks."""
+
+    async def on_failure(connection_id, code, reason):
+        if failures is not None:
+            failures.append((connection_id, code, reason))
+
+    return OutboundQueue(
+        connection_id="conn-1",
+        websocket=websocket,
+        maxsize=maxsize,
+        policy=policy,
+        send_timeout=send_timeout,
+        on_failure=on_failure,
+        **options,
+    )
+
+
+class TestOutboundQueue:
+    """Tests for OutboundQueue class."""
+
+    @pytest.mark.asyncio
+    async def test_writer_drains_in_order(self):
+        """Test queued frames are written in order by the writer task."""
+        websocket = BlockingWebSocket()
+        websocket.release.set()
+        queue = make_queue(websocket, OverflowPolicy.DROP_OLDEST)
+        queue.start()
+
+        for frame in ("a", "b", "c"):
+            queue.put(frame)
+        await asyncio.sleep(0.01)
+
+        assert websocket.sent == ["a", "b", "c"]
+        assert queue.sent == 3
+        queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_put_does_not_wait_for_socket(self):
+        """Test producers are not blocked by a stalled socket."""
+        websocket = BlockingWebSocket()
+        queue = make_queue(websocket, OverflowPolicy.DROP_OLDEST, maxsize=100)
+        queue.start()
+
+        for i in range(50):
+            queue.put(f"frame-{i}")
+
+        assert queue.depth >= 49
+        queue.stop()
+
+    def test_drop_oldest(self):
+        """Test the oldest frame is dropped on overflow."""
+        queue = make_queue(BlockingWebSocket(), OverflowPolicy.DROP_OLDEST)
+
+        for frame in ("a", "b", "c", "d"):
+            queue.put(frame)
+
+        assert [frame for frame, _ in queue._frames] == ["b", "c", "d"]
+        assert queue.dropped == 1
+
+    def test_coalesce_supersedes_same_key(self):
+        """Test a newer frame replaces queued frames with the same key."""
+        queue = make_queue(BlockingWebSocket(), OverflowPolicy.COALESCE)
+
+        queue.put("progress-1", "progress")
+        queue.put("other", None)
+        queue.put("progress-2", "progress")
+        queue.put("progress-3", "progress")
+
+        assert [frame for frame, _ in queue._frames] == ["other", "progress-3"]
+        assert queue.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_disconnect_policy_evicts(self):
+        """Test overflow evicts the connection with close code 1013."""
+        failures = []
+        queue = make_queue(BlockingWebSocket(), OverflowPolicy.DISCONNECT, failures=failures)
+
+        for frame in ("a", "b", "c", "d"):
+            queue.put(frame)
+        await asyncio.sleep(0)
+
+        assert queue.closed
+        assert failures == [("conn-1", SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")]
+
+    @pytest.mark.asyncio
+    async def test_send_timeout_evicts(self):
+        """Test a send that exceeds the timeout evicts the connection."""
+        failures = []
+        queue = make_queue(
+            BlockingWebSocket(), OverflowPolicy.DROP_OLDEST, send_timeout=0.01, failures=failures
+        )
+        queue.start()
+
+        queue.put("a")
+        await asyncio.sleep(0.05)
+
+        assert failures == [("conn-1", SLOW_CONSUMER_CLOSE_CODE, "Slow consumer")]
+
+    def test_policy_setting_is_validated(self):
+        """Test an unknown overflow policy is rejected when settings load."""
+        with pytest.raises(ValidationError):
+            Settings(ws_outbound_overflow_policy="drop_newest")
+
+        settings = Settings(ws_outbound_overflow_policy="coalesce")
+        assert OverflowPolicy(settings.ws_outbound_overflow_policy) is OverflowPolicy.COALESCE
+
+
+class TestCoalescing:
+    """Tests for the outbound coalescing window."""
+
+    @pytest.mark.asyncio
+    async def test_burst_sent_as_one_batch(self):
+        """Test messages queued within the window share one batch frame."""
+        websocket = BlockingWebSocket()
+        websocket.release.set()
+        queue = make_queue(
+            websocket,
+            OverflowPolicy.DROP_OLDEST,
+            maxsize=100,
+            coalesce_window=0.02,
+            coalesce_max_batch=64,
+        )
+        queue.start()
+
+        for i in range(10):
+            queue.put(orjson.dumps({"type": "notification", "payload": {"n": i}}).decode())
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+
+        assert len(websocket.sent) == 1
+        batch = orjson.loads(websocket.sent[0])
+        assert batch["type"] == "batch"
+        assert [m["payload"]["n"] for m in batch["payload"]["messages"]] == list(range(10))
+        assert (queue.sent, queue.writes) == (10, 1)
+        queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_lone_frame_unwrapped_within_window(self):
+        """Test a single message is sent as-is once the window closes."""
+        websocket = BlockingWebSocket()
+        websocket.release.set()
+        queue = make_queue(
+            websocket, OverflowPolicy.DROP_OLDEST, coalesce_window=0.01, coalesce_max_batch=64
+        )
+        queue.start()
+
+        queue.put('{"type":"ping"}')
+        await asyncio.sleep(0.03)
+
+        assert websocket.sent == ['{"type":"ping"}']
+        queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size(self):
+        """Test batches never exceed the maximum size."""
+        websocket = BlockingWebSocket()
+        websocket.release.set()
+        queue = make_queue(
+            websocket,
+            OverflowPolicy.DROP_OLDEST,
+            maxsize=100,
+            coalesce_window=0.01,
+            coalesce_max_batch=4,
+        )
+
+        for i in range(10):
+            queue.put(orjson.dumps({"n": i}).decode())
+        queue.start()
+        await asyncio.sleep(0.05)
+
+        sizes = [len(orjson.loads(frame)["payload"]["messages"]) for frame in websocket.sent[:2]]
+        assert sizes == [4, 4]
+        assert orjson.loads(websocket.sent[2])["payload"]["messages"] == [{"n": 8}, {"n": 9}]
+        queue.stop()
@@ -0,0 +1,137 @@
+"""
+Tests for presence tracking.
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+import pytest
+from fastapi import status
+
+from app.config import get_settings
+from app.presence import PresenceTracker
+
+settings = get_settings()
+
+
+def make_tracker(members: dict | None = None, routes: dict | None = None) -> PresenceTracker:
+    """Create a tracker whose route lookups return ``routes``."""
+    route_table = MagicMock()
+    route_table.get_instances_many = AsyncMock(return_value=routes or {})
+    return PresenceTracker(
+        instance_id="pod-a",
+        ttl=60,
+        flush_interval=0.5,
+        routes=route_table,
+        get_members=lambda: members or {},
+    )
+
+
+def published(mock_redis) -> list[tuple[str, dict]]:
+    """Decode the presence frames queued on the pipeline mock."""
+    pipe = mock_redis.redis.pipeline.return_value
+    return [(call.args[0], orjson.loads(call.args[1])) for call in pipe.publish.call_args_list]
+
+
+class TestPresenceTracker:
+    """Tests for PresenceTracker."""
+
+    @pytest.mark.asyncio
+    async def test_flush_publishes_one_diff_per_tenant(self, mock_redis):
+        """Test batched transitions become one versioned diff of actual changes."""
+        pipe = mock_redis.redis.pipeline.return_value
+        # Holder ZADD + ZADD a (new), holder ZADD + ZADD b (already online),
+        # holder ZREM + ZREM c, two EXPIREs; then INCR; then PUBLISH
+        pipe.execute = AsyncMock(side_effect=[[1, 1, 1, 0, 1, 1, True, True], [7], [1]])
+        tracker = make_tracker()
+
+        tracker.mark_online("t1", "a")
+        tracker.mark_offline("t1", "b")
+        tracker.mark_online("t1", "b")
+        tracker.mark_offline("t1", "c")
+        await tracker.flush()
+
+        [(channel, frame)] = published(mock_redis)
+        assert channel == "presence:t1"
+        assert frame["type"] == "presence"
+        assert frame["payload"] == {"tenant_id": "t1", "joined": ["a"], "left": ["c"], "version": 7}
+        assert tracker.get_stats()["pending"] == 0
+        assert tracker.get_stats()["total_diffs_published"] == 1
+
+    @pytest.mark.asyncio
+    async def test_leave_skipped_while_online_elsewhere(self, mock_redis):
+        """Test a user another instance holds in the same tenant stays online."""
+        pipe = mock_redis.redis.pipeline.return_value
+        # ZSCORE of pod-b's holder entry; then holder ZREM and two EXPIREs
+        pipe.execute = AsyncMock(side_effect=[[time.time() + 60], [1, True, True]])
+        tracker = make_tracker(routes={"c": ["pod-a", "pod-b"]})
+
+        tracker.mark_offline("t1", "c")
+        await tracker.flush()
+
+        pipe.zscore.assert_called_once_with("presence:holders:t1", "c@pod-b")
+        pipe.zrem.assert_called_once_with("presence:holders:t1", "c@pod-a")
+        assert published(mock_redis) == []
+
+    @pytest.mark.asyncio
+    async def test_leave_published_while_online_in_other_tenant(self, mock_redis):
+        """Test a user routed elsewhere only for another tenant still leaves this one."""
+        pipe = mock_redis.redis.pipeline.return_value
+        # ZSCORE (pod-b does not hold c in t1); holder ZREM, ZREM, two EXPIREs; INCR; PUBLISH
+        pipe.execute = AsyncMock(side_effect=[[None], [1, 1, True, True], [4], [1]])
+        tracker = make_tracker(routes={"c": ["pod-a", "pod-b"]})
+
+        tracker.mark_offline("t1", "c")
+        await tracker.flush()
+
+        [(_, frame)] = published(mock_redis)
+        assert frame["payload"] == {"tenant_id": "t1", "joined": [], "left": ["c"], "version": 4}
+
+    @pytest.mark.asyncio
+    async def test_refresh_publishes_expired_users_as_leaves(self, mock_redis):
+        """Test entries left behind by a dead instance are pruned and announced."""
+        pipe = mock_redis.redis.pipeline.return_value
+        # ZADD a, holder ZADD, holder EXPIRE and prune, EXPIRE, ZRANGEBYSCORE expired;
+        # then ZREM x; then INCR; then PUBLISH
+        pipe.execute = AsyncMock(side_effect=[[0, 1, True, 0, True, [b"x"]], [1], [3], [1]])
+        tracker = make_tracker(members={"t1": {"a"}})
+
+        await tracker.refresh()
+
+        [(_, frame)] = published(mock_redis)
+        assert frame["payload"] == {"tenant_id": "t1", "joined": [], "left": ["x"], "version": 3}
+
+    @pytest.mark.asyncio
+    async def test_snapshot_includes_version(self, mock_redis):
+        """Test the snapshot reads members and version in one transaction."""
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.execute = AsyncMock(return_value=[[b"b", b"a"], b"12"])
+        tracker = make_tracker()
+
+        snapshot = await tracker.snapshot("t1")
+
+        assert snapshot == {"tenant_id": "t1", "users": ["a", "b"], "version": 12}
+        mock_redis.redis.pipeline.assert_called_with(transaction=True)
+
+
+class TestPresenceAPI:
+    """Tests for the presence snapshot endpoint."""
+
+    def test_requires_api_key(self, client):
+        """Test presence is not served without the system API key."""
+        response = client.get("/api/presence/t1", headers={"x-api-key": "wrong"})
+
+        assert response.status_code != status.HTTP_200_OK
+
+    def test_snapshot(self, client, mock_redis):
+        """Test the endpoint returns the online users and version."""
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.execute = AsyncMock(return_value=[[b"u1"], None])
+
+        response = client.get("/api/presence/t1", headers={"x-api-key": settings.system_api_key})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["users"] == ["u1"]
+        assert data["version"] == 0
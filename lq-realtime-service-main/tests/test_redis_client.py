@@ -0,0 +1,349 @@
+"""
+Tests for Redis client subscription management.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.redis_client import PubSubShard, RedisClient, shard_for
+
+
+async def handler(channel, message):
+    """No-op pub/sub handler."""
+
+
+def mock_pubsub() -> MagicMock:
+    """Pub/sub connection mock with awaitable (un)subscribe."""
+    pubsub = MagicMock()
+    pubsub.subscribe = AsyncMock()
+    pubsub.unsubscribe = AsyncMock()
+    return pubsub
+
+
+@pytest.fixture
+def client():
+    """Single-shard Redis client with a mocked pub/sub connection."""
+    client = RedisClient(shards=1)
+    shard = client.shards[0]
+    shard.pubsub = mock_pubsub()
+    shard._is_listening = True
+    return client
+
+
+def slow_subscribe(landed: asyncio.Event):
+    """SUBSCRIBE side effect that lands only once ``landed`` is set."""
+
+    async def subscribe(*channels):
+        await landed.wait()
+
+    return subscribe
+
+
+def grace_period(seconds: float):
+    """Override the unsubscribe grace period."""
+    return patch("app.redis_client.settings.redis_unsubscribe_grace_period", seconds)
+
+
+class TestSubscriptionRefCounting:
+    """Tests for ref-counted, debounced subscriptions."""
+
+    @pytest.mark.asyncio
+    async def test_subscribes_once_per_channel(self, client):
+        """Test several holders share one SUBSCRIBE."""
+        await client.acquire("tenant:t1", handler)
+        await client.acquire("tenant:t1", handler)
+
+        client.shards[0].pubsub.subscribe.assert_awaited_once_with("tenant:t1")
+        assert client.get_subscription_stats()["total_subscribes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unsubscribes_after_last_release_and_grace(self, client):
+        """Test the channel is dropped only after the last holder and the grace period."""
+        with grace_period(0.01):
+            await client.acquire("tenant:t1", handler)
+            await client.acquire("tenant:t1", handler)
+            await client.release("tenant:t1")
+            await client.release("tenant:t1")
+
+            client.shards[0].pubsub.unsubscribe.assert_not_called()
+            assert client.get_subscription_stats()["pending_unsubscribes"] == 1
+
+            await asyncio.sleep(0.05)
+
+        client.shards[0].pubsub.unsubscribe.assert_awaited_once_with("tenant:t1")
+        assert "tenant:t1" not in client.subscribed_channels
+
+    @pytest.mark.asyncio
+    async def test_reacquire_within_grace_avoids_churn(self, client):
+        """Test a quick reconnect cancels the pending UNSUBSCRIBE."""
+        with grace_period(0.05):
+            await client.acquire("tenant:t1", handler)
+            await client.release("tenant:t1")
+            await client.acquire("tenant:t1", handler)
+            await asyncio.sleep(0.1)
+
+        client.shards[0].pubsub.subscribe.assert_awaited_once()
+        client.shards[0].pubsub.unsubscribe.assert_not_called()
+        stats = client.get_subscription_stats()
+        assert stats["total_unsubscribes_avoided"] == 1
+        assert stats["pending_unsubscribes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_zero_grace_unsubscribes_immediately(self, client):
+        """Test a zero grace period restores immediate UNSUBSCRIBE."""
+        with grace_period(0):
+            await client.acquire("room:r1", handler, raw=True)
+            await client.release("room:r1")
+
+        client.shards[0].pubsub.unsubscribe.assert_awaited_once_with("room:r1")
+        assert "room:r1" not in client.raw_channels
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("grace", [0, 0.01])
+    async def test_release_during_subscribe_does_not_leak(self, client, grace):
+        """Test a release racing the first SUBSCRIBE still unsubscribes afterwards."""
+        landed = asyncio.Event()
+        pubsub = client.shards[0].pubsub
+        pubsub.subscribe = AsyncMock(side_effect=slow_subscribe(landed))
+
+        with grace_period(grace):
+            acquire = asyncio.create_task(client.acquire("tenant:t1", handler))
+            await asyncio.sleep(0)
+            release = asyncio.create_task(client.release("tenant:t1"))
+            await asyncio.sleep(0.05)
+
+            pubsub.unsubscribe.assert_not_called()
+
+            landed.set()
+            await asyncio.wait_for(asyncio.gather(acquire, release), timeout=1)
+            await asyncio.sleep(0.05)
+
+        pubsub.unsubscribe.assert_awaited_once_with("tenant:t1")
+        assert "tenant:t1" not in client.subscribed_channels
+        assert client.get_subscription_stats()["referenced_channels"] == 0
+
+    @pytest.mark.asyncio
+    async def test_reacquire_during_subscribe_keeps_channel(self, client):
+        """Test a holder arriving while the SUBSCRIBE is in flight shares it."""
+        landed = asyncio.Event()
+        pubsub = client.shards[0].pubsub
+        pubsub.subscribe = AsyncMock(side_effect=slow_subscribe(landed))
+
+        with grace_period(0):
+            first = asyncio.create_task(client.acquire("tenant:t1", handler))
+            await asyncio.sleep(0)
+            release = asyncio.create_task(client.release("tenant:t1"))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(client.acquire("tenant:t1", handler))
+            await asyncio.sleep(0)
+
+            landed.set()
+            await asyncio.wait_for(asyncio.gather(first, release, second), timeout=1)
+
+        pubsub.subscribe.assert_awaited_once_with("tenant:t1")
+        pubsub.unsubscribe.assert_not_called()
+        assert "tenant:t1" in client.subscribed_channels
+
+    @pytest.mark.asyncio
+    async def test_concurrent_acquire_retries_failed_subscribe(self, client):
+        """Test a holder waiting on a failed SUBSCRIBE subscribes itself."""
+        landed = asyncio.Event()
+        attempts = []
+
+        async def subscribe(*channels):
+            attempts.append(channels)
+            if len(attempts) == 1:
+                await landed.wait()
+                raise ConnectionError("Redis unavailable")
+
+        pubsub = client.shards[0].pubsub
+        pubsub.subscribe = AsyncMock(side_effect=subscribe)
+
+        first = asyncio.create_task(client.acquire("tenant:t1", handler))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(client.acquire("tenant:t1", handler))
+        await asyncio.sleep(0)
+        assert not second.done()
+
+        landed.set()
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(first, timeout=1)
+        await asyncio.wait_for(second, timeout=1)
+
+        assert len(attempts) == 2
+        assert "tenant:t1" in client.subscribed_channels
+        assert client._channel_refs == {"tenant:t1": 1}
+
+
+class FakePubSub:
+    """Pub/sub connection that replays scripted get_message results."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.connection = object()
+        self.subscribe = AsyncMock()
+        self.unsubscribe = AsyncMock()
+        self.ping = AsyncMock()
+        self.aclose = AsyncMock()
+
+    async def get_message(self, timeout):
+        await asyncio.sleep(0.001)
+        if not self.script:
+            return None
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+def listener_settings(ping_interval: float = 0):
+    """Shrink listener backoff and ping timings."""
+    return patch.multiple(
+        "app.redis_client.settings",
+        redis_pubsub_reconnect_initial_delay=0.01,
+        redis_pubsub_reconnect_max_delay=0.02,
+        redis_pubsub_ping_interval=ping_interval,
+    )
+
+
+async def wait_for_condition(condition, timeout: float = 1.0):
+    """Poll until a condition holds."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.005)
+
+
+class TestListenerSupervision:
+    """Tests for the self-healing pub/sub listener."""
+
+    @pytest.mark.asyncio
+    async def test_reconnects_and_resubscribes_after_failure(self):
+        """Test a failed connection is replaced and every held channel restored."""
+        received = []
+
+        async def record(channel, message):
+            received.append((channel, message))
+
+        client = RedisClient(shards=1)
+        shard = client.shards[0]
+        shard.pubsub = FakePubSub([ConnectionError("connection reset")])
+        replacement = FakePubSub(
+            [{"type": "message", "channel": b"tenant:t1", "data": b'{"n": 1}'}]
+        )
+        client.redis = MagicMock()
+        client.redis.pubsub = MagicMock(return_value=replacement)
+        shard.channels = {"tenant:t1", "global:broadcast"}
+        client.message_handlers = {"tenant:t1": record, "global:broadcast": record}
+
+        with listener_settings():
+            shard.start()
+            await wait_for_condition(lambda: received)
+            await client.disconnect()
+
+        replacement.subscribe.assert_awaited_once()
+        assert set(replacement.subscribe.await_args.args) == {"tenant:t1", "global:broadcast"}
+        assert received == [("tenant:t1", {"n": 1})]
+        assert client.total_reconnects == 1
+        assert client.total_listener_errors == 1
+        assert client.get_listener_stats()["last_message_age_seconds"] is not None
+
+    @pytest.mark.asyncio
+    async def test_reports_unhealthy_while_reconnecting(self):
+        """Test listener stats flag the outage until a reconnect succeeds."""
+        client = RedisClient(shards=1)
+        client.shards[0].pubsub = FakePubSub([ConnectionError("connection reset")])
+        client.redis = MagicMock()
+        client.redis.pubsub = MagicMock(side_effect=ConnectionError("refused"))
+
+        with listener_settings():
+            client.shards[0].start()
+            await wait_for_condition(lambda: client.total_listener_errors >= 2)
+            stats = client.get_listener_stats()
+            await client.disconnect()
+
+        assert stats["state"] == "reconnecting"
+        assert stats["healthy"] is False
+
+    @pytest.mark.asyncio
+    async def test_silent_connection_is_probed_and_replaced(self):
+        """Test a connection that stops answering pings is treated as dead."""
+        client = RedisClient(shards=1)
+        client.shards[0].pubsub = FakePubSub([])
+        client.redis = MagicMock()
+        client.redis.pubsub = MagicMock(return_value=FakePubSub([]))
+
+        with listener_settings(ping_interval=0.02):
+            client.shards[0].start()
+            await wait_for_condition(lambda: client.total_reconnects >= 1)
+            await client.disconnect()
+
+        assert client.total_listener_errors >= 1
+
+
+class TestPubSubSharding:
+    """Tests for channel subscriptions spread over several pub/sub shards."""
+
+    def test_shard_for_is_stable_and_spread(self):
+        """Test channels map to the same shard every time and use every shard."""
+        channels = [f"tenant:t{i}" for i in range(2000)]
+        shards = [shard_for(channel, 4) for channel in channels]
+
+        assert shards == [shard_for(channel, 4) for channel in channels]
+        counts = [shards.count(index) for index in range(4)]
+        assert min(counts) > 400
+
+    def test_growing_the_pool_moves_few_channels(self):
+        """Test adding a shard only moves channels onto the new shard."""
+        channels = [f"room:r{i}" for i in range(2000)]
+        moved = [c for c in channels if shard_for(c, 4) != shard_for(c, 5)]
+
+        assert all(shard_for(channel, 5) == 4 for channel in moved)
+        assert len(moved) < 2000 * 0.3
+
+    @pytest.mark.asyncio
+    async def test_subscriptions_go_to_owning_shard(self):
+        """Test each channel is subscribed on its own shard's connection."""
+        client = RedisClient(shards=4)
+        client.redis = MagicMock()
+        client.redis.pubsub = MagicMock(side_effect=mock_pubsub)
+
+        with patch.object(PubSubShard, "start"):
+            for index in range(20):
+                await client.subscribe(f"tenant:t{index}", handler)
+            await client.unsubscribe("tenant:t3")
+
+        for shard in client.shards:
+            for channel in shard.channels:
+                assert shard_for(channel, 4) == shard.index
+        owner = client.shards[shard_for("tenant:t3", 4)]
+        owner.pubsub.unsubscribe.assert_awaited_once_with("tenant:t3")
+        stats = client.get_listener_stats()["shards"]
+        assert sum(shard["channels"] for shard in stats) == 19
+
+    @pytest.mark.asyncio
+    async def test_shards_dispatch_independently(self):
+        """Test a failing shard does not stop another shard from delivering."""
+        received = []
+
+        async def record(channel, message):
+            received.append(channel)
+
+        client = RedisClient(shards=2)
+        client.redis = MagicMock()
+        client.redis.pubsub = MagicMock(side_effect=ConnectionError("refused"))
+        client.message_handlers = {"a": record, "b": record}
+        client.shards[0].pubsub = FakePubSub([ConnectionError("connection reset")])
+        client.shards[1].pubsub = FakePubSub([{"type": "message", "channel": b"b", "data": b"1"}])
+
+        with listener_settings():
+            for shard in client.shards:
+                shard.start()
+            await wait_for_condition(lambda: received)
+            stats = client.get_listener_stats()
+            await client.disconnect()
+
+        assert received == ["b"]
+        assert stats["state"] == "reconnecting"
+        assert stats["shards"][1]["total_messages"] == 1
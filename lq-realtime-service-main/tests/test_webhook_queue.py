@@ -0,0 +1,138 @@
+"""
+Tests for the Redis Streams webhook ingest queue.
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.webhook_queue import CONSUMER_GROUP, DEAD_LETTER_STREAM, WEBHOOK_STREAM, WebhookQueue
+
+
+def make_queue(process=None, max_retries: int = 2) -> WebhookQueue:
+    """Create a webhook queue around a processing callback."""
+    return WebhookQueue(
+        process=process or AsyncMock(),
+        consumer="pod-a",
+        max_retries=max_retries,
+        retry_delay=5,
+        timeout=1,
+        dedupe_ttl=60,
+        dead_letter_maxlen=100,
+    )
+
+
+ENTRY = {b"provider": b"custom", b"body": b'{"tenant_id":"t1"}', b"tenant_id": b"t1"}
+
+
+class TestEnqueue:
+    """Tests for webhook ingest."""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_stores_raw_body(self, mock_redis):
+        """Test an accepted delivery is appended with its raw body."""
+        mock_redis.redis.set = AsyncMock(return_value=True)
+        mock_redis.redis.xadd = AsyncMock(return_value=b"1-0")
+        queue = make_queue()
+
+        queued = await queue.enqueue("github", b"{}", {"tenant_id": "t1"}, "delivery-1")
+
+        assert queued
+        stream, entry = mock_redis.redis.xadd.call_args.args
+        assert stream == WEBHOOK_STREAM
+        assert entry["body"] == b"{}"
+        assert entry["delivery_id"] == "delivery-1"
+        assert mock_redis.redis.set.call_args.args[0] == "webhook:delivery:github:delivery-1"
+        assert queue.total_enqueued == 1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_delivery_not_queued(self, mock_redis):
+        """Test a delivery ID seen before is acknowledged without queueing."""
+        mock_redis.redis.set = AsyncMock(return_value=None)
+        mock_redis.redis.xadd = AsyncMock()
+        queue = make_queue()
+
+        assert not await queue.enqueue("github", b"{}", {}, "delivery-1")
+        mock_redis.redis.xadd.assert_not_called()
+        assert queue.total_duplicates == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_append_releases_delivery_id(self, mock_redis):
+        """Test the provider's retry is not mistaken for a duplicate after a failed append."""
+        mock_redis.redis.set = AsyncMock(return_value=True)
+        mock_redis.redis.xadd = AsyncMock(side_effect=ConnectionError("down"))
+        mock_redis.redis.delete = AsyncMock()
+
+        with pytest.raises(ConnectionError):
+            await make_queue().enqueue("github", b"{}", {}, "delivery-1")
+
+        mock_redis.redis.delete.assert_awaited_once_with("webhook:delivery:github:delivery-1")
+
+
+class TestConsumer:
+    """Tests for the consumer group processing."""
+
+    @pytest.mark.asyncio
+    async def test_success_acknowledges_and_deletes(self, mock_redis):
+        """Test a published entry is acknowledged and removed from the stream."""
+        process = AsyncMock()
+        mock_redis.redis.xreadgroup = AsyncMock(return_value=[(WEBHOOK_STREAM, [(b"1-0", ENTRY)])])
+        queue = make_queue(process)
+
+        assert await queue.run_once() == 1
+
+        fields = process.call_args.args[0]
+        assert fields["body"] == b'{"tenant_id":"t1"}'
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.xack.assert_called_once_with(WEBHOOK_STREAM, CONSUMER_GROUP, b"1-0")
+        pipe.xdel.assert_called_once_with(WEBHOOK_STREAM, b"1-0")
+        assert queue.total_published == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_left_pending_for_retry(self, mock_redis):
+        """Test a failed entry is neither acknowledged nor dead-lettered before its retries."""
+        mock_redis.redis.xreadgroup = AsyncMock(return_value=[(WEBHOOK_STREAM, [(b"1-0", ENTRY)])])
+        queue = make_queue(AsyncMock(side_effect=ConnectionError("redis slow")))
+
+        await queue.run_once()
+
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.xack.assert_not_called()
+        pipe.xadd.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_due_entries_are_retried(self, mock_redis):
+        """Test entries idle for the retry delay are reclaimed and processed again."""
+        process = AsyncMock()
+        mock_redis.redis.xpending_range = AsyncMock(
+            return_value=[{"message_id": b"1-0", "times_delivered": 1}]
+        )
+        mock_redis.redis.xclaim = AsyncMock(return_value=[(b"1-0", ENTRY)])
+        queue = make_queue(process)
+
+        await queue.run_once()
+
+        assert mock_redis.redis.xpending_range.call_args.kwargs["idle"] == 5000
+        process.assert_awaited_once()
+        assert queue.total_retries == 1
+        assert queue.total_published == 1
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_dead_lettered(self, mock_redis):
+        """Test an entry failing its last retry moves to the dead-letter stream."""
+        mock_redis.redis.xpending_range = AsyncMock(
+            return_value=[{"message_id": b"1-0", "times_delivered": 2}]
+        )
+        mock_redis.redis.xclaim = AsyncMock(return_value=[(b"1-0", ENTRY)])
+        queue = make_queue(AsyncMock(side_effect=ValueError("bad payload")), max_retries=2)
+
+        await queue.run_once()
+
+        pipe = mock_redis.redis.pipeline.return_value
+        stream, entry = pipe.xadd.call_args.args
+        assert stream == DEAD_LETTER_STREAM
+        assert entry[b"attempts"] == "3"
+        assert entry[b"error"] == "bad payload"
+        assert entry[b"body"] == ENTRY[b"body"]
+        pipe.xack.assert_called_once_with(WEBHOOK_STREAM, CONSUMER_GROUP, b"1-0")
+        assert queue.total_dead_lettered == 1
@@ -0,0 +1,116 @@
+"""
+Tests for the Redis-backed webhook registry.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.redis_client import RedisClient
+from app.schemas import WebhookProvider, WebhookRegistration
+from app.webhooks import REGISTRY_CHANNEL, REGISTRY_KEY, WebhookRegistry
+
+
+def registration(tenant_id: str = "t1", secret: str = "s3cret") -> WebhookRegistration:
+    """Build a Stripe registration."""
+    return WebhookRegistration(provider=WebhookProvider.STRIPE, tenant_id=tenant_id, secret=secret)
+
+
+class TestWebhookRegistry:
+    """Tests for WebhookRegistry against a mocked Redis."""
+
+    @pytest.mark.asyncio
+    async def test_register_stores_and_announces(self, mock_redis):
+        """Test a registration is written to the hash, announced and cached."""
+        registry = WebhookRegistry()
+
+        await registry.register(registration())
+
+        key, field, value = mock_redis.redis.hset.call_args.args
+        assert (key, field) == (REGISTRY_KEY, "stripe:t1")
+        assert WebhookRegistration.model_validate_json(value).secret == "s3cret"
+        mock_redis.redis.publish.assert_awaited_once_with(REGISTRY_CHANNEL, "stripe:t1")
+        assert registry.get_registration(WebhookProvider.STRIPE, "t1").secret == "s3cret"
+
+    @pytest.mark.asyncio
+    async def test_load_skips_invalid_entries(self, mock_redis):
+        """Test a full load replaces the cache and ignores malformed entries."""
+        mock_redis.redis.hgetall = AsyncMock(
+            return_value={b"stripe:t1": registration().model_dump_json(), b"bad": b"{"}
+        )
+        registry = WebhookRegistry()
+
+        await registry.load()
+
+        assert registry.get_registration(WebhookProvider.STRIPE, "t1") is not None
+        assert registry.get_stats()["registered_webhooks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_rereads_field(self, mock_redis):
+        """Test an invalidation updates or drops the cached entry."""
+        registry = WebhookRegistry()
+        mock_redis.redis.hget = AsyncMock(
+            return_value=registration(secret="rotated").model_dump_json()
+        )
+
+        await registry._handle_invalidation(REGISTRY_CHANNEL, b"stripe:t1")
+        assert registry.get_registration(WebhookProvider.STRIPE, "t1").secret == "rotated"
+
+        mock_redis.redis.hget = AsyncMock(return_value=None)
+        await registry._handle_invalidation(REGISTRY_CHANNEL, b"stripe:t1")
+        assert registry.get_registration(WebhookProvider.STRIPE, "t1") is None
+
+
+def fake_instance(server: FakeServer) -> RedisClient:
+    """Build a Redis client with its own connections to a shared fake server."""
+    client = RedisClient()
+    client.redis = FakeRedis(server=server)
+    return client
+
+
+async def eventually(condition, timeout: float = 2.0):
+    """Wait until a condition holds."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+class TestSharedRegistry:
+    """Two instances sharing one Redis server, each with its own client and cache."""
+
+    @pytest.mark.asyncio
+    async def test_registration_visible_on_other_instance(self):
+        """Test a registration on one instance reaches the other's cache, and removal too."""
+        server = FakeServer()
+        client_a = fake_instance(server)
+        client_b = fake_instance(server)
+        registry_a = WebhookRegistry(client_a, refresh_interval=0)
+        registry_b = WebhookRegistry(client_b, refresh_interval=0)
+
+        try:
+            await registry_a.start()
+            await registry_b.start()
+
+            await registry_a.register(registration("tenant-x"))
+            await eventually(
+                lambda: registry_b.get_registration(WebhookProvider.STRIPE, "tenant-x") is not None
+            )
+
+            # A third instance starting later loads it from the hash
+            registry_c = WebhookRegistry(fake_instance(server), refresh_interval=0)
+            await registry_c.load()
+            assert registry_c.get_registration(WebhookProvider.STRIPE, "tenant-x") is not None
+
+            assert await registry_b.unregister(WebhookProvider.STRIPE, "tenant-x")
+            await eventually(
+                lambda: registry_a.get_registration(WebhookProvider.STRIPE, "tenant-x") is None
+            )
+            assert registry_b.get_registration(WebhookProvider.STRIPE, "tenant-x") is None
+        finally:
+            await registry_a.stop()
+            await registry_b.stop()
+            await client_a.disconnect()
+            await client_b.disconnect()
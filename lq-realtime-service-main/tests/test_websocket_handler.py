@@ -0,0 +1,701 @@
+"""
+Tests for WebSocket connection handler.
+"""
+
+import asyncio
+import time
+import zlib
+from unittest.mock import patch
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.admission import AdmissionRejected
+from app.auth import jwt_manager, verify_websocket_token
+from app.config import get_settings
+from app.redis_client import split_origin, tag_origin
+from app.schemas import MessageTarget, WSMessage, WSMessageType
+from app.websocket_handler import ConnectionManager
+
+settings = get_settings()
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a FastAPI WebSocket."""
+
+    def __init__(self, subprotocols: list[str] | None = None):
+        self.scope = {"subprotocols": subprotocols or []}
+        self.sent: list[str | bytes] = []
+        self.accepted = False
+        self.subprotocol: str | None = None
+        self.closed = False
+        self.close_code: int | None = None
+        self.close_reason: str | None = None
+
+    async def accept(self, subprotocol: str | None = None):
+        self.accepted = True
+        self.subprotocol = subprotocol
+
+    async def send_text(self, data: str):
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        self.closed = True
+        self.close_code = code
+        self.close_reason = reason
+
+
+def make_token(user_id: str, tenant_id: str) -> str:
+    """Create a WebSocket token for tests."""
+    return jwt_manager.create_access_token(user_id=user_id, tenant_id=tenant_id)
+
+
+@pytest.fixture
+def manager():
+    """Fresh connection manager per test."""
+    manager = ConnectionManager()
+    yield manager
+    for record in manager.active_connections.values():
+        if record.queue:
+            record.queue.stop()
+
+
+async def flush():
+    """Let outbound writer tasks drain their queues."""
+    await asyncio.sleep(0.01)
+
+
+async def connect(manager, user_id: str, tenant_id: str) -> tuple[str, FakeWebSocket]:
+    """Register a fake WebSocket with the manager."""
+    websocket = FakeWebSocket()
+    connection_id, _ = await manager.connect(websocket, make_token(user_id, tenant_id))
+    await flush()
+    return connection_id, websocket
+
+
+class TestConnectFailures:
+    """Tests for cleanup when registering a connection fails."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("failing", ["acquire", "subscribe"])
+    async def test_subscribe_failure_unregisters_connection(self, manager, mock_redis, failing):
+        """Test a failed tenant or global subscribe leaves nothing registered behind."""
+        await connect(manager, "user-b", "tenant-1")
+        manager.global_channel_subscribed = False
+        getattr(mock_redis, failing).side_effect = ConnectionError("Redis unavailable")
+        websocket = FakeWebSocket()
+
+        with pytest.raises(ConnectionError):
+            await manager.connect(websocket, make_token("user-a", "tenant-1"))
+
+        assert [r.user_id for r in manager.active_connections.values()] == ["user-b"]
+        assert "user-a" not in manager.user_connections
+        assert len(manager.tenant_connections["tenant-1"]) == 1
+        assert manager.heartbeat.tracked == 1
+        assert (websocket.closed, websocket.close_code) == (True, 1011)
+        mock_redis.redis.zrem.assert_awaited_once()
+        # The tenant reference is released exactly once per successful acquire
+        assert mock_redis.release.await_count == (1 if failing == "subscribe" else 0)
+
+
+class TestTenantBroadcast:
+    """Tests for tenant broadcast delivery."""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_publishes_encoded_frame(self, manager, mock_redis):
+        """Test tenant broadcasts are validated and serialized once at publish time."""
+        message = WSMessage(type=WSMessageType.BROADCAST, payload={"text": "hi"})
+
+        await manager.broadcast_to_tenant("tenant-1", message)
+
+        mock_redis.publish_raw.assert_awaited_once_with("tenant:tenant-1", message.encode())
+
+    @pytest.mark.asyncio
+    async def test_raw_frame_forwarded_to_tenant_sockets(self, manager):
+        """Test raw pub/sub frames reach every socket without re-validation."""
+        _, ws_a = await connect(manager, "user-a", "tenant-1")
+        _, ws_b = await connect(manager, "user-b", "tenant-1")
+        _, ws_other = await connect(manager, "user-c", "tenant-2")
+        for ws in (ws_a, ws_b, ws_other):
+            ws.sent.clear()
+
+        frame = WSMessage(type=WSMessageType.NOTIFICATION, payload={"n": 1}).encode()
+
+        with patch("app.websocket_handler.WSMessage") as ws_message_cls:
+            await manager._handle_redis_message("tenant:tenant-1", frame)
+            ws_message_cls.assert_not_called()
+        await flush()
+
+        assert ws_a.sent == [frame.decode()]
+        assert ws_b.sent == [frame.decode()]
+        assert ws_other.sent == []
+
+    @pytest.mark.asyncio
+    async def test_decoded_message_still_supported(self, manager):
+        """Test dictionary payloads are validated and forwarded."""
+        _, ws = await connect(manager, "user-a", "tenant-1")
+        ws.sent.clear()
+
+        await manager._handle_redis_message(
+            "tenant:tenant-1", {"type": "notification", "payload": {"n": 2}}
+        )
+        await flush()
+
+        assert orjson.loads(ws.sent[0])["payload"] == {"n": 2}
+
+    @pytest.mark.asyncio
+    async def test_global_frame_reaches_all_tenants(self, manager):
+        """Test global frames are delivered to every local connection."""
+        _, ws_a = await connect(manager, "user-a", "tenant-1")
+        _, ws_b = await connect(manager, "user-b", "tenant-2")
+        ws_a.sent.clear()
+        ws_b.sent.clear()
+
+        frame = WSMessage(type=WSMessageType.SYSTEM, payload={"notice": "x"}).encode()
+        await manager._handle_global_message("global:broadcast", frame)
+        await flush()
+
+        assert ws_a.sent == ws_b.sent == [frame.decode()]
+        assert manager.get_stats()["fanout"]["total_broadcasts"] == 1
+
+
+class TestOutboundQueues:
+    """Tests for outbound queue integration."""
+
+    @pytest.mark.asyncio
+    async def test_stats_expose_queue_depth_and_drops(self, manager):
+        """Test queue depth and drop counters appear in stats."""
+        connection_id, _ = await connect(manager, "user-a", "tenant-1")
+        queue = manager.active_connections[connection_id].queue
+        queue.stop()
+        queue.closed = False
+
+        for i in range(settings.ws_outbound_queue_size + 5):
+            await manager.send_frame(connection_id, f"frame-{i}")
+
+        stats = manager.get_stats()
+        assert stats["outbound_queue_depth"] == settings.ws_outbound_queue_size
+        assert stats["total_dropped_frames"] == 5
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_eviction_closes_with_1013(self, manager):
+        """Test evicted connections are removed and closed with code 1013."""
+        connection_id, websocket = await connect(manager, "user-a", "tenant-1")
+
+        await manager.disconnect(connection_id, code=1013, reason="Slow consumer")
+
+        assert websocket.closed
+        assert connection_id not in manager.active_connections
+        assert manager.get_stats()["total_slow_consumer_evictions"] == 1
+
+
+class TestUserRouting:
+    """Tests for cross-instance user-targeted delivery."""
+
+    @pytest.mark.asyncio
+    async def test_connect_registers_user_route(self, manager, mock_redis):
+        """Test the first local connection registers a user route."""
+        await connect(manager, "user-a", "tenant-1")
+
+        pipe = mock_redis.redis.pipeline.return_value
+        pipe.zadd.assert_called_once()
+        key, mapping = pipe.zadd.call_args.args
+        assert key == "route:user:user-a"
+        assert settings.instance_id in mapping
+
+    @pytest.mark.asyncio
+    async def test_last_disconnect_unregisters_user_route(self, manager, mock_redis):
+        """Test the user's route is removed with its last local connection."""
+        connection_id, _ = await connect(manager, "user-a", "tenant-1")
+
+        await manager.disconnect(connection_id)
+
+        mock_redis.redis.zrem.assert_awaited_once_with("route:user:user-a", settings.instance_id)
+
+    @pytest.mark.asyncio
+    async def test_user_message_published_only_to_holding_instances(self, manager, mock_redis):
+        """Test user messages go to the instances that hold the user, not the tenant."""
+        _, websocket = await connect(manager, "user-a", "tenant-1")
+        websocket.sent.clear()
+        mock_redis.redis.pipeline.return_value.execute.return_value = [
+            [settings.instance_id.encode(), b"pod-b"]
+        ]
+        mock_redis.publish_many.return_value = [1]
+        message = WSMessage(type=WSMessageType.NOTIFICATION, payload={"n": 1})
+
+        result = await manager.broadcast_to_user("user-a", message)
+        await flush()
+
+        assert result == {"channels_published": 1, "subscribers_reached": 1, "local_connections": 1}
+        assert websocket.sent == [message.encode().decode()]
+        ((channel, envelope),) = mock_redis.publish_many.call_args.args[0]
+        assert channel == "instance:pod-b"
+        header, _, frame = envelope.partition(b"\n")
+        assert orjson.loads(header) == {"user_id": "user-a"}
+        assert frame == message.encode()
+        mock_redis.publish_raw.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_instance_message_delivered_to_local_user(self, manager):
+        """Test envelopes on the instance channel reach the user's local sockets undecoded."""
+        _, ws_a = await connect(manager, "user-a", "tenant-1")
+        _, ws_b = await connect(manager, "user-b", "tenant-1")
+        ws_a.sent.clear()
+        ws_b.sent.clear()
+        frame = WSMessage(type=WSMessageType.NOTIFICATION, payload={"n": 2}).encode()
+
+        envelope = manager._user_envelope("user-a", frame)
+
+        with patch("app.websocket_handler.orjson.loads", wraps=orjson.loads) as loads:
+            await manager._handle_instance_message("instance:pod-a", envelope)
+        await flush()
+
+        # Only the routing header is parsed; the frame is forwarded as published
+        loads.assert_called_once_with(b'{"user_id":"user-a"}')
+
+        assert ws_a.sent == [frame.decode()]
+        assert ws_b.sent == []
+
+
+class TestPublishBatch:
+    """Tests for pipelined targeted delivery."""
+
+    @pytest.mark.asyncio
+    async def test_batch_uses_one_lookup_and_one_publish_pipeline(self, manager, mock_redis):
+        """Test a mixed batch resolves routes and publishes in single round trips."""
+        mock_redis.redis.pipeline.return_value.execute.return_value = [[b"pod-b"], [b"pod-c"]]
+        mock_redis.publish_many.return_value = [1, 1, 3, 2]
+        message = WSMessage(type=WSMessageType.NOTIFICATION, payload={"n": 1})
+
+        result = await manager.publish_batch(
+            [
+                (MessageTarget.USER, "user-a", message),
+                (MessageTarget.USER, "user-b", message),
+                (MessageTarget.TENANT, "tenant-1", message),
+                (MessageTarget.ROOM, "room-1", message),
+            ]
+        )
+
+        mock_redis.redis.pipeline.return_value.execute.assert_awaited_once()
+        mock_redis.publish_many.assert_awaited_once()
+        channels = [channel for channel, _ in mock_redis.publish_many.call_args.args[0]]
+        assert channels == ["instance:pod-b", "instance:pod-c", "tenant:tenant-1", "room:room-1"]
+        assert result["channels_published"] == 4
+        assert result["subscribers_reached"] == 7
+
+
+class TestRooms:
+    """Tests for room subscriptions."""
+
+    @pytest.mark.asyncio
+    async def test_room_membership_holds_channel_reference(self, manager, mock_redis):
+        """Test each room member holds one reference on the room channel."""
+        conn_a, _ = await connect(manager, "user-a", "tenant-1")
+        conn_b, _ = await connect(manager, "user-b", "tenant-1")
+
+        await manager.join_rooms(conn_a, ["room-1"])
+        await manager.join_rooms(conn_a, ["room-1"])
+        await manager.join_rooms(conn_b, ["room-1"])
+        room_acquires = [
+            call for call in mock_redis.acquire.call_args_list if call.args[0] == "room:room-1"
+        ]
+        assert len(room_acquires) == 2
+
+        await manager.leave_rooms(conn_a, ["room-1"])
+        await manager.disconnect(conn_b)
+
+        room_releases = [
+            call for call in mock_redis.release.call_args_list if call.args[0] == "room:room-1"
+        ]
+        assert len(room_releases) == 2
+        assert manager.room_connections == {}
+
+    @pytest.mark.asyncio
+    async def test_room_message_reaches_members_only(self, manager):
+        """Test room frames wake only sockets that joined the room."""
+        conn_a, ws_a = await connect(manager, "user-a", "tenant-1")
+        _, ws_b = await connect(manager, "user-b", "tenant-1")
+        await manager.join_rooms(conn_a, ["room-1"])
+        ws_a.sent.clear()
+        ws_b.sent.clear()
+
+        frame = WSMessage(type=WSMessageType.MESSAGE, payload={"n": 1}).encode()
+        await manager._handle_room_message("room:room-1", frame)
+        await flush()
+
+        assert ws_a.sent == [frame.decode()]
+        assert ws_b.sent == []
+
+    @pytest.mark.asyncio
+    async def test_subscribe_message_joins_rooms(self, manager):
+        """Test clients join rooms with a subscribe message."""
+        connection_id, websocket = await connect(manager, "user-a", "tenant-1")
+        websocket.sent.clear()
+
+        await manager.handle_client_message(
+            connection_id, '{"type": "subscribe", "payload": {"rooms": ["room-1", ""]}}'
+        )
+        await flush()
+
+        reply = orjson.loads(websocket.sent[0])
+        assert reply["payload"]["subscribed"] == ["room-1"]
+        assert reply["payload"]["failed"] == [""]
+        assert manager.get_stats()["active_rooms"] == 1
+
+
+class TestLocalDelivery:
+    """Tests for delivering to local sockets before publishing."""
+
+    @pytest.mark.asyncio
+    async def test_exactly_once_locally_and_across_instances(self, manager, mock_redis):
+        """Test a client message reaches local and remote sockets exactly once."""
+        remote = ConnectionManager()
+        sender, ws_sender = await connect(manager, "user-a", "tenant-1")
+        _, ws_local = await connect(manager, "user-b", "tenant-1")
+        _, ws_remote = await connect(remote, "user-c", "tenant-1")
+        for ws in (ws_sender, ws_local, ws_remote):
+            ws.sent.clear()
+
+        async def publish_raw(channel, data):
+            # Redis delivers to every subscribed instance, the publisher included
+            await manager._handle_redis_message(channel, data)
+            with patch.object(settings, "instance_id", "pod-remote"):
+                await remote._handle_redis_message(channel, data)
+            return 2
+
+        mock_redis.publish_raw.side_effect = publish_raw
+        try:
+            with patch.object(settings, "ws_local_delivery", True):
+                await manager.handle_client_message(
+                    sender, '{"type": "message", "payload": {"text": "hi"}}'
+                )
+                await flush()
+        finally:
+            for record in remote.active_connections.values():
+                if record.queue:
+                    record.queue.stop()
+
+        for ws in (ws_sender, ws_local, ws_remote):
+            assert [orjson.loads(frame)["payload"] for frame in ws.sent] == [{"text": "hi"}]
+        assert manager.get_stats()["total_echoes_skipped"] == 1
+        assert remote.get_stats()["total_echoes_skipped"] == 0
+
+    @pytest.mark.asyncio
+    async def test_tagging_disabled_by_default(self, manager, mock_redis):
+        """Test frames stay untagged until local delivery is enabled, for rolling deploys."""
+        message = WSMessage(type=WSMessageType.BROADCAST, payload={"text": "hi"})
+
+        await manager.broadcast_to_tenant("tenant-1", message)
+        with patch.object(settings, "ws_local_delivery", True):
+            await manager.broadcast_to_tenant("tenant-1", message)
+
+        published = [call.args[1] for call in mock_redis.publish_raw.await_args_list]
+        assert published == [
+            message.encode(),
+            tag_origin(settings.instance_id, message.encode()),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_untagged_frames_still_delivered(self, manager):
+        """Test frames published without an origin tag reach local sockets."""
+        _, ws = await connect(manager, "user-a", "tenant-1")
+        ws.sent.clear()
+
+        frame = WSMessage(type=WSMessageType.NOTIFICATION, payload={"n": 1}).encode()
+        await manager._handle_redis_message("tenant:tenant-1", frame)
+        await manager._handle_redis_message("tenant:tenant-1", tag_origin("pod-b", frame))
+        await flush()
+
+        assert ws.sent == [frame.decode(), frame.decode()]
+
+
+class TestPresence:
+    """Tests for presence integration."""
+
+    @pytest.mark.asyncio
+    async def test_transitions_recorded_per_user_and_tenant(self, manager):
+        """Test only a user's first and last connection to a tenant are transitions."""
+        conn_1, _ = await connect(manager, "user-a", "tenant-1")
+        conn_2, _ = await connect(manager, "user-a", "tenant-1")
+        assert manager.presence._pending == {"tenant-1": {"user-a": True}}
+
+        await manager.disconnect(conn_1)
+        assert manager.presence._pending == {"tenant-1": {"user-a": True}}
+
+        await manager.disconnect(conn_2)
+        assert manager.presence._pending == {"tenant-1": {"user-a": False}}
+
+    @pytest.mark.asyncio
+    async def test_subscribe_replies_with_snapshot_and_streams_diffs(self, manager, mock_redis):
+        """Test subscribers get a snapshot, then diffs; other connections get nothing."""
+        mock_redis.redis.pipeline.return_value.execute.return_value = [[b"user-a"], b"5"]
+        conn_a, ws_a = await connect(manager, "user-a", "tenant-1")
+        _, ws_b = await connect(manager, "user-b", "tenant-1")
+        ws_a.sent.clear()
+        ws_b.sent.clear()
+
+        await manager.handle_client_message(conn_a, '{"type": "presence", "payload": {}}')
+        await flush()
+
+        reply = orjson.loads(ws_a.sent[0])
+        assert reply["type"] == "presence"
+        assert reply["payload"] == {"tenant_id": "tenant-1", "users": ["user-a"], "version": 5}
+        mock_redis.acquire.assert_any_await(
+            "presence:tenant-1", manager._handle_presence_message, raw=True
+        )
+
+        diff = WSMessage(
+            type=WSMessageType.PRESENCE, payload={"joined": ["user-b"], "left": [], "version": 6}
+        ).encode()
+        await manager._handle_presence_message("presence:tenant-1", diff)
+        await flush()
+
+        assert ws_a.sent[1] == diff.decode()
+        assert ws_b.sent == []
+
+        await manager.disconnect(conn_a)
+        mock_redis.release.assert_any_await("presence:tenant-1")
+        assert manager.presence_subscribers == {}
+
+
+class TestEventLogReplay:
+    """Tests for event log integration."""
+
+    @pytest.mark.asyncio
+    async def test_tenant_broadcast_stamps_event_id(self, manager, mock_redis):
+        """Test logged tenant broadcasts carry their stream ID."""
+        manager.event_log.enabled = True
+        mock_redis.redis.pipeline.return_value.execute.return_value = [b"7-0", 1]
+
+        await manager.broadcast_to_tenant(
+            "tenant-1", WSMessage(type=WSMessageType.BROADCAST, payload={"n": 1})
+        )
+
+        channel, data = mock_redis.publish_raw.call_args.args
+        assert channel == "tenant:tenant-1"
+        assert orjson.loads(split_origin(data)[1])["event_id"] == "7-0"
+
+    @pytest.mark.asyncio
+    async def test_replay_disabled_reports_incomplete(self, manager):
+        """Test clients are told to reload when the event log is off."""
+        connection_id, websocket = await connect(manager, "user-a", "tenant-1")
+        websocket.sent.clear()
+
+        await manager.replay_events(connection_id, "1-0")
+        await flush()
+
+        reply = orjson.loads(websocket.sent[-1])
+        assert reply["payload"]["replayed"] == 0
+        assert reply["payload"]["complete"] is False
+
+
+class TestHeartbeat:
+    """Tests for heartbeat integration."""
+
+    @pytest.mark.asyncio
+    async def test_idle_connection_reaped(self, manager):
+        """Test the reaper closes silent connections and frees their state."""
+        manager.heartbeat.idle_timeout = 90
+        connection_id, websocket = await connect(manager, "user-a", "tenant-1")
+        manager.active_connections[connection_id].last_seen -= 91
+
+        for _ in range(len(manager.heartbeat._slots)):
+            await manager.heartbeat.run_tick()
+
+        assert websocket.closed
+        assert connection_id not in manager.active_connections
+        assert manager.get_stats()["heartbeat"]["total_reaped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_listen_only_client_stays_connected(self, manager):
+        """Test a client that never sends, nor answers pings, is kept by default."""
+        connection_id, websocket = await connect(manager, "user-a", "tenant-1")
+        manager.active_connections[connection_id].last_seen -= 3600
+
+        for _ in range(len(manager.heartbeat._slots)):
+            await manager.heartbeat.run_tick()
+        frame = WSMessage(type=WSMessageType.NOTIFICATION, payload={"n": 1}).encode()
+        await manager._handle_redis_message("tenant:tenant-1", frame)
+        await flush()
+
+        assert not websocket.closed
+        assert connection_id in manager.active_connections
+        assert websocket.sent[-1] == frame.decode()
+        assert manager.get_stats()["heartbeat"]["total_pings_sent"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_frame_counts_as_activity(self, manager):
+        """Test frames that fail to parse still refresh the heartbeat deadline."""
+        connection_id, _ = await connect(manager, "user-a", "tenant-1")
+        record = manager.active_connections[connection_id]
+        record.last_seen -= 60
+
+        await manager.handle_client_message(connection_id, "not json")
+
+        assert record.last_seen > time.monotonic() - 1
+
+    @pytest.mark.asyncio
+    async def test_client_message_counts_as_activity(self, manager):
+        """Test inbound messages refresh the heartbeat deadline."""
+        connection_id, _ = await connect(manager, "user-a", "tenant-1")
+        record = manager.active_connections[connection_id]
+        record.last_seen -= 60
+
+        await manager.handle_client_message(connection_id, '{"type": "pong"}')
+
+        assert record.last_seen > time.monotonic() - 1
+
+
+class TestEncodings:
+    """Tests for per-connection wire encodings."""
+
+    @pytest.mark.asyncio
+    async def test_subprotocol_negotiated(self, manager):
+        """Test a supported subprotocol is echoed back and recorded."""
+        websocket = FakeWebSocket(subprotocols=["json+deflate"])
+        connection_id, _ = await manager.connect(websocket, make_token("user-1", "tenant-1"))
+
+        assert websocket.subprotocol == "json+deflate"
+        assert manager.active_connections[connection_id].encoding.value == "json+deflate"
+        assert manager.get_stats()["encodings"] == {"json+deflate": 1}
+
+    @pytest.mark.asyncio
+    async def test_fanout_serves_each_encoding(self, manager):
+        """Test one broadcast reaches text and deflate clients in their own encoding."""
+        _, ws_json = await connect(manager, "user-a", "tenant-1")
+        deflated = []
+        for user_id in ("user-b", "user-c"):
+            websocket = FakeWebSocket()
+            await manager.connect(websocket, make_token(user_id, "tenant-1"), "json+deflate")
+            deflated.append(websocket)
+        await flush()
+        for websocket in (ws_json, *deflated):
+            websocket.sent.clear()
+
+        message = WSMessage(type=WSMessageType.BROADCAST, payload={"text": "hello " * 100})
+        frame = message.encode()
+        await manager._handle_redis_message("tenant:tenant-1", frame)
+        await flush()
+
+        assert ws_json.sent == [frame.decode()]
+        assert deflated[0].sent[0] is deflated[1].sent[0]
+        assert zlib.decompress(deflated[0].sent[0], -zlib.MAX_WBITS) == frame
+
+    @pytest.mark.asyncio
+    async def test_binary_client_message(self, manager):
+        """Test deflated binary frames from a client are parsed."""
+        websocket = FakeWebSocket()
+        connection_id, _ = await manager.connect(
+            websocket, make_token("user-1", "tenant-1"), "json+deflate"
+        )
+        await flush()
+        websocket.sent.clear()
+
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        data = compressor.compress(b'{"type":"ping"}') + compressor.flush()
+        await manager.handle_client_message(connection_id, data)
+        await flush()
+
+        assert orjson.loads(websocket.sent[0])["type"] == "pong"
+
+
+class TestAdmission:
+    """Tests for handshake admission in the connection manager."""
+
+    @pytest.mark.asyncio
+    async def test_over_capacity_rejected_before_auth(self, manager):
+        """Test a full instance closes with 1013 without decoding the token."""
+        manager.admission.max_connections = 0
+        websocket = FakeWebSocket()
+
+        with (
+            patch("app.websocket_handler.verify_websocket_token") as verify,
+            pytest.raises(AdmissionRejected),
+        ):
+            await manager.connect(websocket, "any-token")
+
+        verify.assert_not_called()
+        assert websocket.close_code == 1013
+        assert websocket.close_reason.startswith("capacity; retry_after=")
+        assert manager.active_connections == {}
+
+    @pytest.mark.asyncio
+    async def test_tenant_rate_rejects_after_auth(self, manager):
+        """Test a tenant over its handshake budget is turned away before registering."""
+        manager.admission.tenant_rate = 0.001
+        manager.admission.tenant_burst = 1
+
+        await connect(manager, "user-1", "tenant-1")
+        websocket = FakeWebSocket()
+        with pytest.raises(AdmissionRejected, match="tenant_rate"):
+            await manager.connect(websocket, make_token("user-2", "tenant-1"))
+
+        assert websocket.close_code == 1013
+        assert len(manager.active_connections) == 1
+
+    @pytest.mark.asyncio
+    async def test_handshake_burst_cannot_overshoot_capacity(self, manager):
+        """Test handshakes still authenticating count against capacity."""
+        manager.admission.max_connections = 2
+        verified = asyncio.Event()
+
+        async def slow_verify(token):
+            await verified.wait()
+            return await verify_websocket_token(token)
+
+        sockets = [FakeWebSocket() for _ in range(4)]
+        with patch("app.websocket_handler.verify_websocket_token", side_effect=slow_verify):
+            handshakes = [
+                asyncio.create_task(manager.connect(ws, make_token(f"user-{i}", "tenant-1")))
+                for i, ws in enumerate(sockets)
+            ]
+            await asyncio.sleep(0)
+            verified.set()
+            results = await asyncio.gather(*handshakes, return_exceptions=True)
+
+        assert sum(isinstance(r, AdmissionRejected) for r in results) == 2
+        assert len(manager.active_connections) == 2
+        assert manager.admission.reserved == 0
+
+        # Failed handshakes give their slot back too
+        await manager.disconnect(results[0][0])
+        with pytest.raises(HTTPException):
+            await manager.connect(FakeWebSocket(), "not-a-token")
+        assert manager.admission.reserved == 0
+        await connect(manager, "user-9", "tenant-1")
+
+
+class TestDrain:
+    """Tests for draining connections before shutdown."""
+
+    @pytest.mark.asyncio
+    async def test_drain_notifies_and_closes_connections(self, manager):
+        """Test each connection gets a reconnect notice and a 1012 close."""
+        _, ws1 = await connect(manager, "user-1", "tenant-1")
+        _, ws2 = await connect(manager, "user-2", "tenant-1")
+        manager.drainer.window = 0
+
+        manager.drainer.start()
+        await manager.drainer.wait()
+
+        for websocket in (ws1, ws2):
+            notice = orjson.loads(websocket.sent[-1])
+            assert notice["type"] == "system"
+            assert notice["payload"]["reconnect"] is True
+            assert websocket.close_code == 1012
+        assert manager.active_connections == {}
+
+    @pytest.mark.asyncio
+    async def test_new_handshakes_rejected_while_draining(self, manager):
+        """Test a draining instance turns new connections away."""
+        manager.drainer.start()
+        websocket = FakeWebSocket()
+
+        with pytest.raises(AdmissionRejected, match="draining"):
+            await manager.connect(websocket, make_token("user-1", "tenant-1"))
+
+        assert websocket.close_code == 1013